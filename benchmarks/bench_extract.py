@@ -0,0 +1,82 @@
+"""
+Page extraction benchmark: the original serial path (PyPDFLoader.load() plus
+per-page regex cleaning) against src.tools.pdf_extract with 1..N processes.
+
+    python -m benchmarks.bench_extract --pages 400 --workers 1 2 4
+    python -m benchmarks.bench_extract --pdf manual.pdf
+
+Prints one JSON object with seconds, pages/s and speedup per configuration.
+"""
+import argparse
+import json
+import os
+import re
+import tempfile
+import time
+
+from benchmarks.synthetic_pdf import make_pdf
+from src import config
+from src.tools.pdf_extract import extract_pages
+
+
+def serial_baseline(pdf_path: str) -> int:
+    """The pre-pool extraction path from PDFTool._prepare_pdf."""
+    from langchain_community.document_loaders import PyPDFLoader
+
+    docs_list = PyPDFLoader(pdf_path).load()
+
+    def clean_page_text(txt: str) -> str:
+        txt = re.sub(r"Page\s*\d+\s*(of\s*\d+)?", "", txt, flags=re.IGNORECASE)
+        txt = re.sub(r"^\s*-+\s*$", "", txt, flags=re.MULTILINE)
+        return txt.strip()
+
+    for d in docs_list:
+        d.page_content = clean_page_text(d.page_content)
+    return len(docs_list)
+
+
+def timed(fn, repeat: int):
+    best = None
+    pages = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        pages = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, pages
+
+
+def main():
+    parser = argparse.ArgumentParser(description="PDF page extraction benchmark")
+    parser.add_argument("--pdf", help="PDF to benchmark; a synthetic one is generated if omitted")
+    parser.add_argument("--pages", type=int, default=400)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--pages-per-task", type=int, default=32)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    tmpdir = None
+    pdf_path = args.pdf
+    if pdf_path is None:
+        tmpdir = tempfile.mkdtemp(prefix="bench-extract-")
+        pdf_path = make_pdf(os.path.join(tmpdir, "synthetic.pdf"), args.pages)
+
+    # Always use the pool when workers > 1, whatever the PDF size.
+    config.EXTRACT_PARALLEL_MIN_PAGES = 0
+    results = {"pdf": pdf_path, "cpu_count": os.cpu_count(), "runs": []}
+    base_s, pages = timed(lambda: serial_baseline(pdf_path), args.repeat)
+    results["pages"] = pages
+    results["runs"].append({"name": "serial_baseline", "seconds": round(base_s, 4),
+                            "pages_per_s": round(pages / base_s, 1), "speedup": 1.0})
+    for workers in args.workers:
+        def run(workers=workers):
+            return sum(1 for _ in extract_pages(pdf_path, workers=workers, pages_per_task=args.pages_per_task))
+        seconds, _ = timed(run, args.repeat)
+        results["runs"].append({"name": f"pool_{workers}_workers", "seconds": round(seconds, 4),
+                                "pages_per_s": round(pages / seconds, 1),
+                                "speedup": round(base_s / seconds, 2)})
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Vector index mode benchmark: memory footprint, on-disk size, load time
+(memory-mapped vs. read into RAM), query latency and recall@10 against the
+exact flat index, for each mode in src.tools.vector_index.
+
+    python -m benchmarks.bench_index --chunks 50000 --dim 1024
+    python -m benchmarks.bench_index --modes flat sq8 ivf_pq
+
+Vectors are synthetic (clustered, L2-normalised) so no Ollama is needed.
+Prints one JSON object.
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+import faiss
+import numpy as np
+
+from src.tools.vector_index import INDEX_MODES, build_index, index_nbytes, read_index, recall_at_k
+
+
+def clustered_vectors(n: int, dim: int, clusters: int = 200, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dim)).astype("float32")
+    vectors = centers[rng.integers(0, clusters, size=n)] + rng.normal(scale=0.6, size=(n, dim)).astype("float32")
+    faiss.normalize_L2(vectors)
+    return vectors
+
+
+def query_ms(index, queries: np.ndarray, k: int = 20) -> float:
+    start = time.perf_counter()
+    for q in queries:
+        index.search(q[None, :], k)
+    return (time.perf_counter() - start) * 1000 / len(queries)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Vector index mode benchmark")
+    parser.add_argument("--chunks", type=int, default=20000)
+    parser.add_argument("--dim", type=int, default=1024)
+    parser.add_argument("--modes", nargs="+", default=list(INDEX_MODES))
+    parser.add_argument("--queries", type=int, default=100)
+    args = parser.parse_args()
+
+    vectors = clustered_vectors(args.chunks, args.dim)
+    queries = vectors[:args.queries]
+    tmpdir = tempfile.mkdtemp(prefix="bench-index-")
+    results = {"chunks": args.chunks, "dim": args.dim, "runs": []}
+    for mode in args.modes:
+        start = time.perf_counter()
+        index = build_index(vectors, mode)
+        build_s = time.perf_counter() - start
+        path = os.path.join(tmpdir, f"{mode}.faiss")
+        faiss.write_index(index, path)
+        loads = {}
+        for name, mmap in (("load_ms", False), ("mmap_load_ms", True)):
+            start = time.perf_counter()
+            loaded = read_index(path, mmap=mmap)
+            loads[name] = round((time.perf_counter() - start) * 1000, 2)
+        results["runs"].append({
+            "mode": mode,
+            "build_s": round(build_s, 3),
+            "memory_mb": round(index_nbytes(index) / 2**20, 2),
+            "file_mb": round(os.path.getsize(path) / 2**20, 2),
+            **loads,
+            "query_ms": round(query_ms(loaded, queries), 3),
+            "recall_at_10": round(recall_at_k(loaded, vectors, k=10), 4),
+        })
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
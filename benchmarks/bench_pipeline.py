@@ -0,0 +1,209 @@
+"""
+End-to-end pipeline benchmark against the local fake-Ollama stand-ins, on
+synthetic PDFs of increasing size. No Ollama daemon or microphone needed.
+
+For each PDF size it measures:
+  - ingestion: cold build (extract, split, embed, index) and warm index-cache load
+  - retrieval: per-query retriever latency
+  - nodes: retrieve, grade_docs, generate and transform_query from chat_with_pdf
+  - graph: full compiled Graph_builder graph per query
+
+    python -m benchmarks.bench_pipeline --pages 20 100 400 --queries 20
+    python -m benchmarks.bench_pipeline --llm-latency-ms 200 --out baseline.json
+
+Prints (or writes to --out) one JSON object with throughput, latency
+percentiles, LLM/embedding call counts and peak RSS, for diffing runs.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import shutil
+import tempfile
+import time
+
+from benchmarks.fake_ollama import FakeOllamaEmbeddings, FakeOllamaLLM
+from benchmarks.synthetic_pdf import make_pdf
+from src import config
+
+
+def percentiles(samples) -> dict:
+    """Latency summary in milliseconds."""
+    if not samples:
+        return {"n": 0}
+    ordered = sorted(samples)
+
+    def pct(p):
+        return round(ordered[min(len(ordered) - 1, int(round(p / 100.0 * (len(ordered) - 1))))] * 1000, 3)
+
+    return {
+        "n": len(ordered),
+        "mean_ms": round(sum(ordered) / len(ordered) * 1000, 3),
+        "p50_ms": pct(50),
+        "p90_ms": pct(90),
+        "p99_ms": pct(99),
+        "max_ms": round(ordered[-1] * 1000, 3),
+    }
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process so far, or None where unsupported."""
+    try:
+        import resource
+    except ImportError:
+        try:
+            import psutil
+
+            return round(psutil.Process().memory_info().peak_wset / 2**20, 1)
+        except (ImportError, AttributeError):
+            return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return round(peak / (2**20 if platform.system() == "Darwin" else 2**10), 1)
+
+
+def make_queries(pages: int, n: int):
+    """Questions about facts the synthetic PDF states on evenly spread pages."""
+    queries = []
+    for i in range(n):
+        p = 1 + (i * max(1, pages // max(1, n // 2))) % pages
+        if i % 2:
+            queries.append(f"Which section lists part number PN-{1000 + p * 7}?")
+        else:
+            queries.append(f"What is the torque value for clause {p}.{p % 5 + 1}?")
+    return queries
+
+
+def _timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def bench_size(pages: int, args, workdir: str) -> dict:
+    from src.Nodes.chat_with_pdf import generate, grade_docs, init_components, retrieve, transform_query
+    from src.graph.graph_builder import Graph_builder
+    from src.tools.index_cache import IndexCache
+    from src.tools.PDF_tool import PDFTool
+
+    size_dir = os.path.join(workdir, f"pages-{pages}")
+    os.makedirs(size_dir)
+    pdf_path = make_pdf(os.path.join(size_dir, "synthetic.pdf"), pages)
+    # Fresh caches per size so every cold build really embeds.
+    config.EMBED_CACHE_PATH = os.path.join(size_dir, "embeddings.sqlite3")
+    index_cache = IndexCache(os.path.join(size_dir, "indexes"))
+    embedding = FakeOllamaEmbeddings(
+        dim=args.dim, latency_s=args.embed_latency_ms / 1000, per_text_latency_s=args.embed_text_latency_ms / 1000
+    )
+    llm = FakeOllamaLLM(latency_s=args.llm_latency_ms / 1000, token_latency_s=args.token_latency_ms / 1000)
+    queries = make_queries(pages, args.queries)
+    result = {"pages": pages, "pdf_bytes": os.path.getsize(pdf_path)}
+
+    tool, cold_s = _timed(lambda: PDFTool(pdf_path, index_cache=index_cache, embedding=embedding))
+    chunks = tool.vectorstore.index.ntotal
+    _, warm_s = _timed(lambda: PDFTool(pdf_path, index_cache=index_cache, embedding=embedding))
+    result["ingestion"] = {
+        "chunks": chunks,
+        "cold_s": round(cold_s, 4),
+        "warm_load_s": round(warm_s, 4),
+        "pages_per_s": round(pages / cold_s, 2),
+        "chunks_per_s": round(chunks / cold_s, 2),
+        "embedding_calls": dict(embedding.calls),
+        "index": tool.index_report,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+    retriever = tool.get_retriever()
+    samples = [_timed(lambda q=q: retriever.invoke(q))[1] for q in queries]
+    result["retrieval"] = {**percentiles(samples), "queries_per_s": round(len(samples) / sum(samples), 2)}
+
+    components = init_components(llm=llm)
+    retrieval_grader, rag_chain, _, _, question_rewriter, batch_grader = components
+    node_samples = {"retrieve": [], "grade_docs": [], "generate": [], "transform_query": []}
+    node_calls = {name: 0 for name in node_samples}
+    for q in queries:
+        state = {"question": q}
+        steps = (
+            ("retrieve", lambda s: retrieve(s, retriever)),
+            ("grade_docs", lambda s: grade_docs(s, retrieval_grader, batch_grader)),
+            ("generate", lambda s: generate(s, rag_chain)),
+            ("transform_query", lambda s: transform_query(s, question_rewriter)),
+        )
+        for name, node in steps:
+            before = sum(llm.calls.values())
+            update, seconds = _timed(lambda: node(state))
+            node_samples[name].append(seconds)
+            node_calls[name] += sum(llm.calls.values()) - before
+            state = {**state, **update}
+    result["nodes"] = {
+        name: {**percentiles(samples), "llm_calls": node_calls[name]} for name, samples in node_samples.items()
+    }
+
+    graph = Graph_builder(components=components, retriever=retriever).build()
+    llm.calls.clear()
+    samples = []
+    for q in queries:
+        _, seconds = _timed(lambda q=q: graph.invoke({"question": q}))
+        samples.append(seconds)
+    result["graph"] = {
+        **percentiles(samples),
+        "queries_per_s": round(len(samples) / sum(samples), 2),
+        "llm_calls": dict(llm.calls),
+        "llm_calls_per_query": round(sum(llm.calls.values()) / len(samples), 2),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline pipeline benchmark (fake Ollama)")
+    parser.add_argument("--pages", type=int, nargs="+", default=[20, 100, 400])
+    parser.add_argument("--queries", type=int, default=20)
+    parser.add_argument("--dim", type=int, default=1024, help="fake embedding dimension (mxbai: 1024)")
+    parser.add_argument("--llm-latency-ms", type=float, default=50.0, help="fake LLM latency per call")
+    parser.add_argument("--token-latency-ms", type=float, default=2.0, help="fake LLM latency per token")
+    parser.add_argument("--embed-latency-ms", type=float, default=5.0, help="fake embedding latency per request")
+    parser.add_argument("--embed-text-latency-ms", type=float, default=0.5, help="fake embedding latency per text")
+    parser.add_argument("--out", help="write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench-pipeline-")
+    # Keep benchmark artifacts out of the real caches.
+    config.INDEX_CACHE_DIR = os.path.join(workdir, "indexes")
+    config.ANSWER_CACHE_DIR = os.path.join(workdir, "answers")
+    config.LIBRARY_DIR = os.path.join(workdir, "library")
+    report = {
+        "python": platform.python_version(),
+        "cpu_count": os.cpu_count(),
+        "settings": {k: v for k, v in vars(args).items() if k != "out"},
+        "config": {
+            "chunk_size": config.CHUNK_SIZE,
+            "retriever_k": config.RETRIEVER_K,
+            "hybrid_search": config.HYBRID_SEARCH,
+            "grading_mode": config.GRADING_MODE,
+            "index_mode": config.INDEX_MODE,
+            "context_token_budget": config.CONTEXT_TOKEN_BUDGET,
+        },
+        "sizes": [],
+    }
+    try:
+        for pages in args.pages:
+            # The pipeline logs progress with print(); keep stdout clean for the JSON.
+            with contextlib.redirect_stdout(io.StringIO()):
+                report["sizes"].append(bench_size(pages, args, workdir))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    report["peak_rss_mb"] = peak_rss_mb()
+
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Cold-start benchmark: how long a fresh process takes before the Streamlit
+page can render, and what is deferred to first use.
+
+Each scenario runs in a new interpreter, ``--runs`` times:
+  - app: ``import src.main`` as Streamlit does (lazy imports)
+  - eager: the imports ``src/main.py`` used to make at import time; the old
+    startup also paid ``stt_model`` on top
+  - pdf_stack: graph, FAISS and PDF modules, paid on the first upload
+  - stt_model: Vosk model load, paid on the first recording
+
+    python -m benchmarks.bench_startup --runs 5
+
+Prints one JSON object with min/median seconds per scenario (or the error
+that stopped it) and the slowest imports of ``src.main``.
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+SCENARIOS = {
+    "app": "import src.main",
+    "eager": (
+        "import streamlit, langchain_core.documents, src.graph.graph_cache, src.graph.graph_runner, "
+        "src.tools.PDF_tool, src.tracing"
+    ),
+    "pdf_stack": "import src.graph.graph_cache, src.graph.graph_runner, src.tools.PDF_tool",
+    "stt_model": "from src.voice.voice_input import get_stt_model\nget_stt_model()",
+}
+
+_TIMER = (
+    "import time\n"
+    "_start = time.perf_counter()\n"
+    "{body}\n"
+    "print(time.perf_counter() - _start)\n"
+)
+
+
+def run_once(body: str):
+    proc = subprocess.run(
+        [sys.executable, "-c", _TIMER.format(body=body)], capture_output=True, text=True
+    )
+    if proc.returncode:
+        return None, proc.stderr.strip().splitlines()[-1]
+    return float(proc.stdout.strip().splitlines()[-1]), None
+
+
+def slowest_imports(module: str, top: int = 5):
+    """Cumulative ``-X importtime`` microseconds of the slowest top-level imports under ``module``."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"], capture_output=True, text=True
+    )
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        # Direct imports of the module: three spaces of indentation.
+        if not name.startswith("   ") or name.startswith("     "):
+            continue
+        rows.append((int(cumulative), name.strip()))
+    rows.sort(reverse=True)
+    return [{"module": name, "seconds": round(us / 1e6, 3)} for us, name in rows[:top]]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold-start benchmark")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--scenario", nargs="*", choices=sorted(SCENARIOS), default=list(SCENARIOS))
+    args = parser.parse_args()
+
+    report = {"python": sys.version.split()[0], "runs": args.runs, "scenarios": {}}
+    for name in args.scenario:
+        samples, error = [], None
+        for _ in range(args.runs):
+            seconds, error = run_once(SCENARIOS[name])
+            if error:
+                break
+            samples.append(seconds)
+        report["scenarios"][name] = (
+            {"error": error} if error else
+            {"min_s": round(min(samples), 3), "median_s": round(statistics.median(samples), 3)}
+        )
+    report["slowest_app_imports"] = slowest_imports("src.main")
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+"""
+Speech-input benchmark on WAV files, no microphone needed.
+
+Without ``--model`` only voice-activity endpointing is measured, on a
+synthetic recording of speech-like bursts (with short pauses inside each
+utterance) separated by silence. It reports how many utterances were found
+and how long after the speech ended each endpoint fired:
+
+    python -m benchmarks.bench_stt --utterances 10
+
+With a Vosk model directory the full ``SpeechService`` runs on the WAV
+(synthetic or ``--wav`` recordings), and recognizer setup is compared with
+the reset used between utterances:
+
+    python -m benchmarks.bench_stt --model path/to/vosk-model --wav question.wav
+
+Prints one JSON object.
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+import wave
+
+import numpy as np
+
+from src import config
+from src.voice.audio import EnergyVAD, WavFileSource
+
+
+def make_wav(path: str, utterances: int = 10, rate: int = 16000, seed: int = 0):
+    """
+    Write a synthetic recording and return its ground truth.
+
+    Each utterance is 3-5 "words" of harmonic, amplitude-modulated noise with
+    150-400 ms pauses between words, followed by 1.5 s of background noise.
+
+    Returns:
+        List of ``(start_seconds, end_seconds)`` per utterance.
+    """
+    rng = np.random.default_rng(seed)
+    parts = [rng.normal(0, 40, int(rate * 1.0))]
+    truth, t = [], 1.0
+    for _ in range(utterances):
+        start = t
+        for w in range(int(rng.integers(3, 6))):
+            n = int(rate * rng.uniform(0.25, 0.6))
+            x = np.arange(n) / rate
+            f0 = rng.uniform(110, 220)
+            voiced = sum(np.sin(2 * np.pi * f0 * k * x) / k for k in range(1, 6))
+            envelope = np.sin(np.pi * np.arange(n) / n) ** 0.5
+            parts.append(3000 * voiced * envelope + rng.normal(0, 200, n))
+            t += n / rate
+            if w < 2:
+                gap = int(rate * rng.uniform(0.15, 0.4))
+                parts.append(rng.normal(0, 40, gap))
+                t += gap / rate
+        truth.append((round(start, 3), round(t, 3)))
+        tail = int(rate * 1.5)
+        parts.append(rng.normal(0, 40, tail))
+        t += tail / rate
+    pcm = np.clip(np.concatenate(parts), -32768, 32767).astype("<i2")
+    with wave.open(path, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(rate)
+        wav.writeframes(pcm.tobytes())
+    return truth
+
+
+def segment(path: str, block_ms: int):
+    """Run ``EnergyVAD`` over a WAV file; returns ``(start, end, endpoint)`` per utterance in seconds."""
+    source = WavFileSource(path)
+    vad = EnergyVAD(block_ms=block_ms, no_speech_seconds=1e9)
+    block = source.rate * block_ms // 1000
+    found, samples, opened = [], 0, None
+    try:
+        while True:
+            data = source.read(block)
+            if not data:
+                break
+            samples += len(data) // 2
+            state = vad.update(data)
+            now = samples / source.rate
+            if state == "start":
+                opened = now - vad.start_ms / 1000
+            elif state in ("end", "max"):
+                found.append((round(opened, 3), round(now, 3), state))
+                vad.reset()
+    finally:
+        source.close()
+    return found
+
+
+def bench_vad(path: str, truth, block_ms: int) -> dict:
+    start = time.perf_counter()
+    found = segment(path, block_ms)
+    seconds = time.perf_counter() - start
+    delays = [round((end - t_end) * 1000) for (_, t_end), (_, end, _) in zip(truth or [], found)]
+    with wave.open(path, "rb") as wav:
+        audio_s = wav.getnframes() / wav.getframerate()
+    return {
+        "expected_utterances": len(truth) if truth is not None else None,
+        "found_utterances": len(found),
+        "segments": found,
+        "endpoint_delay_ms": delays,
+        "end_silence_ms": config.VAD_END_SILENCE_MS,
+        "audio_seconds": round(audio_s, 2),
+        "vad_real_time_factor": round(seconds / audio_s, 5),
+    }
+
+
+def bench_recognizer(model_path: str, paths, block_ms: int, realtime: bool) -> dict:
+    from vosk import KaldiRecognizer, Model
+
+    from src.voice.stt_service import SpeechService
+
+    start = time.perf_counter()
+    model = Model(model_path)
+    load_s = time.perf_counter() - start
+
+    rec_setup, rec_reset = [], []
+    for _ in range(5):
+        t = time.perf_counter()
+        rec = KaldiRecognizer(model, config.STT_SAMPLE_RATE)
+        rec_setup.append(time.perf_counter() - t)
+        t = time.perf_counter()
+        rec.Reset()
+        rec_reset.append(time.perf_counter() - t)
+
+    service = SpeechService(model, block_ms=block_ms)
+    files = []
+    for path in paths:
+        source = WavFileSource(path, realtime=realtime)
+        start = time.perf_counter()
+        first_partial = []
+        results = list(service.utterances(
+            source, on_partial=lambda text: first_partial or first_partial.append(time.perf_counter() - start)))
+        seconds = time.perf_counter() - start
+        audio_s = source._wav.getnframes() / source.rate
+        source.close()
+        files.append({
+            "path": path,
+            "utterances": results,
+            "first_partial_ms": round(first_partial[0] * 1000, 1) if first_partial else None,
+            "real_time_factor": round(seconds / audio_s, 4),
+        })
+    return {
+        "model_load_s": round(load_s, 3),
+        "recognizer_setup_ms": round(1000 * sum(rec_setup) / len(rec_setup), 3),
+        "recognizer_reset_ms": round(1000 * sum(rec_reset) / len(rec_reset), 3),
+        "files": files,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Speech input (VAD + Vosk) benchmark")
+    parser.add_argument("--wav", nargs="*", default=[], help="16-bit PCM WAV recordings to transcribe")
+    parser.add_argument("--utterances", type=int, default=10, help="utterances in the synthetic recording")
+    parser.add_argument("--model", help="Vosk model directory; omit to benchmark endpointing only")
+    parser.add_argument("--block-ms", type=int, default=config.STT_BLOCK_MS)
+    parser.add_argument("--realtime", action="store_true", help="pace WAV input like a live microphone")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench-stt-")
+    synthetic = os.path.join(workdir, "synthetic.wav")
+    truth = make_wav(synthetic, args.utterances, rate=config.STT_SAMPLE_RATE)
+    report = {
+        "block_ms": args.block_ms,
+        "vad": {"synthetic": bench_vad(synthetic, truth, args.block_ms)},
+    }
+    for path in args.wav:
+        report["vad"][path] = bench_vad(path, None, args.block_ms)
+    if args.model:
+        report["recognizer"] = bench_recognizer(args.model, args.wav or [synthetic], args.block_ms, args.realtime)
+    os.remove(synthetic)
+    os.rmdir(workdir)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+Synthesis latency benchmark for spoken answers.
+
+An answer is streamed token by token (``--token-latency-ms``) and spoken three ways:
+  - whole: the old path, a new engine per answer synthesizing the full text
+    after generation has finished
+  - pipelined: ``SpeechStream`` on a long-lived ``TTSWorker``, synthesizing
+    each sentence as soon as it is complete
+  - cached: the same answer again, served from the sentence cache
+
+Latencies are measured from the first token: ``first_segment_ms`` until the
+first sentence is synthesized (when a streaming player could start),
+``all_audio_ms`` until the whole answer is. By default a fake engine models
+pyttsx3 (``--engine-init-ms`` to create, ``--synth-ms-per-char`` to speak);
+``--real`` uses pyttsx3 itself.
+
+    python -m benchmarks.bench_tts --answers 5
+"""
+import argparse
+import json
+import shutil
+import tempfile
+import time
+import wave
+
+from src.voice.tts_service import SpeechStream, TTSCache, TTSWorker, _default_engine
+
+ANSWER = (
+    "- The torque value for clause 4.2 is 35 Nm.\n"
+    "- Apply it with a calibrated wrench and recheck after the first service interval.\n"
+    "- Replace the seal if the housing shows any sign of leakage.\n"
+    "- Use the lubricant listed in section 7 for all threaded fasteners.\n"
+    "- Record the inspection in the maintenance log before returning the unit to service."
+)
+
+
+class FakeEngine:
+    """pyttsx3-shaped engine: sleeps like synthesis and writes a silent WAV of matching length."""
+
+    def __init__(self, init_s: float, per_char_s: float, rate: int = 16000):
+        time.sleep(init_s)
+        self.per_char_s = per_char_s
+        self.rate = rate
+        self._job = None
+
+    def setProperty(self, name, value):
+        pass
+
+    def save_to_file(self, text, path):
+        self._job = (text, path)
+
+    def runAndWait(self):
+        text, path = self._job
+        time.sleep(self.per_char_s * len(text))
+        with wave.open(path, "wb") as wav:
+            wav.setnchannels(1)
+            wav.setsampwidth(2)
+            wav.setframerate(self.rate)
+            wav.writeframes(b"\0\0" * int(self.rate * 0.06 * len(text.split())))
+
+
+def tokens(text: str):
+    parts = text.split(" ")
+    return [p if i == len(parts) - 1 else p + " " for i, p in enumerate(parts)]
+
+
+def run_whole(answer: str, engine_factory, token_latency_s: float) -> dict:
+    start = time.perf_counter()
+    for _ in tokens(answer):
+        time.sleep(token_latency_s)
+    engine = engine_factory()
+    TTSWorker._render(engine, answer)
+    elapsed = round((time.perf_counter() - start) * 1000, 1)
+    return {"first_segment_ms": elapsed, "all_audio_ms": elapsed}
+
+
+def run_stream(answer: str, worker: TTSWorker, token_latency_s: float) -> dict:
+    start = time.perf_counter()
+    stream = SpeechStream(worker)
+    for token in tokens(answer):
+        time.sleep(token_latency_s)
+        stream.feed(token)
+    for _ in stream.segments():
+        pass
+    return {**stream.stats, "all_audio_ms": round((time.perf_counter() - start) * 1000, 1)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Spoken answer latency benchmark")
+    parser.add_argument("--answers", type=int, default=5)
+    parser.add_argument("--token-latency-ms", type=float, default=30.0)
+    parser.add_argument("--engine-init-ms", type=float, default=300.0, help="fake engine creation time")
+    parser.add_argument("--synth-ms-per-char", type=float, default=2.0, help="fake synthesis time per character")
+    parser.add_argument("--real", action="store_true", help="use pyttsx3 instead of the fake engine")
+    args = parser.parse_args()
+
+    if args.real:
+        engine_factory = _default_engine
+    else:
+        def engine_factory():
+            return FakeEngine(args.engine_init_ms / 1000, args.synth_ms_per_char / 1000)
+
+    token_latency_s = args.token_latency_ms / 1000
+    cache_dir = tempfile.mkdtemp(prefix="bench-tts-")
+    try:
+        worker = TTSWorker(engine_factory=engine_factory, cache=TTSCache(cache_dir))
+        report = {"settings": vars(args), "whole": [], "pipelined": [], "cached": []}
+        for i in range(args.answers):
+            # A distinct answer per round, so only the "cached" runs hit the cache.
+            answer = ANSWER.replace("4.2", f"4.{i + 2}")
+            report["whole"].append(run_whole(answer, engine_factory, token_latency_s))
+            report["pipelined"].append(run_stream(answer, worker, token_latency_s))
+            report["cached"].append(run_stream(answer, worker, token_latency_s))
+        report["worker"] = worker.stats
+        report["summary"] = {
+            name: {
+                "first_segment_ms": round(sum(r["first_segment_ms"] for r in runs) / len(runs), 1),
+                "all_audio_ms": round(sum(r["all_audio_ms"] for r in runs) / len(runs), 1),
+            }
+            for name, runs in (("whole", report["whole"]), ("pipelined", report["pipelined"]),
+                               ("cached", report["cached"]))
+        }
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+"""
+Deterministic local stand-ins for ``OllamaLLM`` and ``OllamaEmbeddings``.
+
+Both sleep for a configurable latency to model the daemon, return fixed
+outputs for the same input, and count their calls, so the pipeline can be
+benchmarked without Ollama:
+
+    llm = FakeOllamaLLM(latency_s=0.05, token_latency_s=0.002)
+    components = init_components(llm=llm)
+    tool = PDFTool(pdf_path, embedding=FakeOllamaEmbeddings(latency_s=0.01))
+"""
+import hashlib
+import re
+import threading
+import time
+from collections import Counter
+from typing import Any, ClassVar, Dict, List
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.llms import LLM
+from langchain_core.outputs import GenerationChunk
+
+_WORD_RE = re.compile(r"[a-z0-9]+(?:[.\-][a-z0-9]+)*")
+_NUMBERED_RE = re.compile(r"^\s*\[(\d+)\]", re.MULTILINE)
+_FIELD_RE = {
+    "question": re.compile(r"User question:\s*(.*)$", re.DOTALL),
+    "document": re.compile(r"Retrieved documents?:\s*(.*?)\s*User question:", re.DOTALL),
+}
+
+ANSWER = (
+    "The torque value for the requested clause is listed in the service manual. "
+    "Apply it with a calibrated wrench and recheck after the first interval."
+)
+
+
+def _words(text: str):
+    return set(w for w in _WORD_RE.findall(text.lower()) if len(w) > 3)
+
+
+class FakeOllamaLLM(LLM):
+    """
+    Recognises the prompts built by ``init_components`` and answers each kind
+    deterministically: relevance graders say "yes" when the document shares
+    a word of 4+ letters with the question, the rewriter echoes a rephrased
+    question, the other graders say "yes" and generation streams ``ANSWER``.
+
+    ``latency_s`` is paid before the first token, ``token_latency_s`` per token.
+    """
+
+    model: str = "fake-llm"
+    latency_s: float = 0.0
+    token_latency_s: float = 0.0
+    calls: Any = None
+    _lock: ClassVar[threading.Lock] = threading.Lock()
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.calls = Counter()
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-ollama"
+
+    def _kind(self, prompt: str) -> str:
+        if "several numbered documents" in prompt:
+            return "batch_grade"
+        if "relevance grader" in prompt:
+            return "grade"
+        if "re-writer" in prompt:
+            return "rewrite"
+        if "grounded in / supported by" in prompt:
+            return "hallucination"
+        if "addresses / resolves" in prompt:
+            return "answer_grade"
+        return "generate"
+
+    def _reply(self, prompt: str, kind: str) -> str:
+        question = _FIELD_RE["question"].search(prompt)
+        question = question.group(1) if question else ""
+        if kind == "grade":
+            document = _FIELD_RE["document"].search(prompt)
+            document = document.group(1) if document else ""
+            return "yes" if _words(question) & _words(document) else "no"
+        if kind == "batch_grade":
+            return "\n".join(f"{n}: yes" for n in _NUMBERED_RE.findall(prompt))
+        if kind == "rewrite":
+            question = prompt.split("initial question:", 1)[-1].split("\n Formulate", 1)[0].strip()
+            return f"What does the manual say about {question.rstrip('?')}?"
+        if kind in ("hallucination", "answer_grade"):
+            return "yes"
+        return ANSWER
+
+    def _count(self, kind: str):
+        with self._lock:
+            self.calls[kind] += 1
+
+    def _call(self, prompt: str, stop=None, run_manager=None, **kwargs) -> str:
+        kind = self._kind(prompt)
+        self._count(kind)
+        reply = self._reply(prompt, kind)
+        time.sleep(self.latency_s + self.token_latency_s * len(reply.split()))
+        return reply
+
+    def _stream(self, prompt: str, stop=None, run_manager=None, **kwargs):
+        kind = self._kind(prompt)
+        self._count(kind)
+        time.sleep(self.latency_s)
+        words = self._reply(prompt, kind).split(" ")
+        for i, word in enumerate(words):
+            time.sleep(self.token_latency_s)
+            chunk = GenerationChunk(text=word if i == len(words) - 1 else word + " ")
+            if run_manager is not None:
+                run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+
+
+class FakeOllamaEmbeddings(Embeddings):
+    """
+    Hashed bag-of-words embeddings: texts sharing words get similar vectors,
+    so retrieval results are meaningful. Each request sleeps ``latency_s``
+    plus ``per_text_latency_s`` per text.
+    """
+
+    def __init__(self, dim: int = 1024, latency_s: float = 0.0, per_text_latency_s: float = 0.0):
+        self.dim = dim
+        self.latency_s = latency_s
+        self.per_text_latency_s = per_text_latency_s
+        self.calls = Counter()
+        self._lock = threading.Lock()
+        self._word_vectors: Dict[str, np.ndarray] = {}
+
+    def _word_vector(self, word: str) -> np.ndarray:
+        vec = self._word_vectors.get(word)
+        if vec is None:
+            seed = int.from_bytes(hashlib.sha1(word.encode("utf-8")).digest()[:8], "little")
+            vec = np.random.default_rng(seed).standard_normal(self.dim).astype("float32")
+            self._word_vectors[word] = vec
+        return vec
+
+    def _embed(self, text: str) -> List[float]:
+        vec = np.zeros(self.dim, dtype="float32")
+        for word in _WORD_RE.findall(text.lower()):
+            vec += self._word_vector(word)
+        norm = float(np.linalg.norm(vec))
+        return (vec / norm if norm else vec).tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        with self._lock:
+            self.calls["embed_documents"] += 1
+            self.calls["texts"] += len(texts)
+        time.sleep(self.latency_s + self.per_text_latency_s * len(texts))
+        return [self._embed(t) for t in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        with self._lock:
+            self.calls["embed_query"] += 1
+        time.sleep(self.latency_s + self.per_text_latency_s)
+        return self._embed(text)
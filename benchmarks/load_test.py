@@ -0,0 +1,165 @@
+"""
+Load test for the headless service (``src.api.server``) at increasing concurrency.
+
+Starts the service in-process on a free port with the fake-Ollama stand-ins,
+uploads a synthetic PDF, then for each concurrency level keeps that many
+clients issuing queries until ``--requests`` have completed. Clients ask
+from a small pool of questions (``--distinct-questions``), as real users
+do, with the semantic answer cache off, so identical LLM calls from
+concurrent requests are what the micro-batcher can coalesce.
+
+    python -m benchmarks.load_test --concurrency 1 4 16 --requests 40
+    python -m benchmarks.load_test --batch-window-ms 0     # batching off
+    python -m benchmarks.load_test --stream                # measure TTFT too
+
+Prints one JSON object: per level throughput, latency percentiles, 503
+rejections, LLM calls and batcher statistics.
+"""
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import socket
+import tempfile
+import threading
+import time
+
+import httpx
+
+from benchmarks.bench_pipeline import make_queries, percentiles
+from benchmarks.fake_ollama import FakeOllamaEmbeddings, FakeOllamaLLM
+from benchmarks.synthetic_pdf import make_pdf
+from src import config
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(app, port: int):
+    import uvicorn
+
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, name="load-test-server", daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    return server, thread
+
+
+async def _query(client, doc_id: str, question: str, stream: bool):
+    body = {"document_id": doc_id, "question": question, "use_cache": False, "verify": False}
+    start = time.perf_counter()
+    if not stream:
+        response = await client.post("/query", json=body)
+        return response.status_code, time.perf_counter() - start, None
+    first_token = None
+    async with client.stream("POST", "/query/stream", json=body) as response:
+        if response.status_code != 200:
+            await response.aread()
+            return response.status_code, time.perf_counter() - start, None
+        async for line in response.aiter_lines():
+            if first_token is None and line == "event: token":
+                first_token = time.perf_counter() - start
+    return response.status_code, time.perf_counter() - start, first_token
+
+
+async def run_level(base_url: str, doc_id: str, concurrency: int, total: int, questions, stream: bool) -> dict:
+    latencies, ttfts, statuses = [], [], {}
+    issued = 0
+
+    async def client_loop(client):
+        nonlocal issued
+        while issued < total:
+            question = questions[issued % len(questions)]
+            issued += 1
+            status, seconds, ttft = await _query(client, doc_id, question, stream)
+            statuses[status] = statuses.get(status, 0) + 1
+            if status == 200:
+                latencies.append(seconds)
+                if ttft is not None:
+                    ttfts.append(ttft)
+            else:
+                # Rejected (503): back off and retry, so every level completes ``total`` requests.
+                issued -= 1
+                await asyncio.sleep(0.05)
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=120, limits=limits) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(client_loop(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+    result = {
+        "concurrency": concurrency,
+        "completed": len(latencies),
+        "statuses": statuses,
+        "requests_per_s": round(len(latencies) / elapsed, 2),
+        "latency": percentiles(latencies),
+    }
+    if stream:
+        result["ttft"] = percentiles(ttfts)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Service load test (fake Ollama)")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    parser.add_argument("--requests", type=int, default=40, help="completed requests per level")
+    parser.add_argument("--distinct-questions", type=int, default=4)
+    parser.add_argument("--pages", type=int, default=40)
+    parser.add_argument("--llm-latency-ms", type=float, default=50.0)
+    parser.add_argument("--token-latency-ms", type=float, default=2.0)
+    parser.add_argument("--batch-window-ms", type=float, default=config.LLM_BATCH_WINDOW_MS)
+    parser.add_argument("--workers", type=int, default=config.SERVICE_WORKERS, help="graph runs in flight")
+    parser.add_argument("--queue-size", type=int, default=config.SERVICE_QUEUE_SIZE)
+    parser.add_argument("--stream", action="store_true", help="use /query/stream and report time to first token")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="load-test-")
+    # Keep load-test artifacts out of the real caches.
+    config.INDEX_CACHE_DIR = os.path.join(workdir, "indexes")
+    config.ANSWER_CACHE_DIR = os.path.join(workdir, "answers")
+    config.EMBED_CACHE_PATH = os.path.join(workdir, "embeddings.sqlite3")
+    config.UPLOAD_DIR = os.path.join(workdir, "uploads")
+    config.TRACE_LOG_PATH = ""
+    config.SERVICE_WORKERS = args.workers
+    config.SERVICE_QUEUE_SIZE = args.queue_size
+
+    from src.api.server import create_app
+
+    llm = FakeOllamaLLM(latency_s=args.llm_latency_ms / 1000, token_latency_s=args.token_latency_ms / 1000)
+    app = create_app(llm=llm, embedding=FakeOllamaEmbeddings(dim=256), batch_window_ms=args.batch_window_ms)
+    port = _free_port()
+    server, thread = start_server(app, port)
+    base_url = f"http://127.0.0.1:{port}"
+    report = {"settings": vars(args), "levels": []}
+    try:
+        pdf_path = make_pdf(os.path.join(workdir, "synthetic.pdf"), args.pages)
+        with open(pdf_path, "rb") as f:
+            response = httpx.post(f"{base_url}/documents", files={"file": ("synthetic.pdf", f, "application/pdf")},
+                                  timeout=600)
+        response.raise_for_status()
+        doc_id = response.json()["document_id"]
+        questions = make_queries(args.pages, args.distinct_questions)
+        batcher = app.state.batcher
+        for concurrency in args.concurrency:
+            llm.calls.clear()
+            before = dict(batcher.stats)
+            level = asyncio.run(run_level(base_url, doc_id, concurrency, args.requests, questions, args.stream))
+            level["llm_calls"] = sum(llm.calls.values())
+            level["batcher"] = {k: v - before.get(k, 0) if k != "largest_batch" else v
+                                for k, v in batcher.stats.items()}
+            report["levels"].append(level)
+        report["health"] = httpx.get(f"{base_url}/health").json()
+    finally:
+        server.should_exit = True
+        thread.join(10)
+        shutil.rmtree(workdir, ignore_errors=True)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
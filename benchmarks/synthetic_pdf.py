@@ -0,0 +1,79 @@
+"""
+Deterministic synthetic PDFs for benchmarks, written without extra dependencies.
+
+Each page has a running header and footer, a section with a part number and
+a clause reference, and filler paragraphs, so extraction, header/footer
+stripping, chunking and lexical search all have realistic work to do.
+
+    python -m benchmarks.synthetic_pdf out.pdf --pages 500
+"""
+import argparse
+import random
+
+_WORDS = (
+    "system valve pressure torque calibration assembly inspection sensor housing "
+    "bracket procedure maintenance operator warning limit interval replacement "
+    "lubricant seal alignment tolerance fastener module firmware diagnostic"
+).split()
+
+
+def _escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def page_lines(page_no: int, total: int, lines_per_page: int, rng: random.Random):
+    lines = ["ACME Industrial Equipment - Service Manual", ""]
+    lines.append(f"Section {page_no}.{page_no % 7 + 1}: part number PN-{1000 + page_no * 7}")
+    lines.append(f"The torque value for clause {page_no}.{page_no % 5 + 1} is {page_no * 3 % 97 + 5} Nm.")
+    for _ in range(lines_per_page - 6):
+        lines.append(" ".join(rng.choice(_WORDS) for _ in range(12)).capitalize() + ".")
+    lines.append("")
+    lines.append(f"Page {page_no} of {total}")
+    return lines
+
+
+def make_pdf(path: str, pages: int, lines_per_page: int = 40, seed: int = 0):
+    """Write a ``pages``-page text PDF to ``path``."""
+    rng = random.Random(seed)
+    objects = {
+        3: b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    }
+    kids = []
+    for i in range(pages):
+        page_id, content_id = 4 + 2 * i, 5 + 2 * i
+        kids.append(page_id)
+        ops = " ".join(f"({_escape(l)}) '" for l in page_lines(i + 1, pages, lines_per_page, rng))
+        stream = f"BT /F1 9 Tf 40 800 Td 11 TL {ops} ET".encode("latin-1")
+        objects[content_id] = b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream"
+        objects[page_id] = (
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 842] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % content_id
+        )
+    objects[1] = b"<< /Type /Catalog /Pages 2 0 R >>"
+    objects[2] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (
+        b" ".join(b"%d 0 R" % k for k in kids), pages
+    )
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = {}
+    for num in sorted(objects):
+        offsets[num] = len(out)
+        out += b"%d 0 obj\n" % num + objects[num] + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for num in sorted(objects):
+        out += b"%010d 00000 n \n" % offsets[num]
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    with open(path, "wb") as f:
+        f.write(out)
+    return path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("path")
+    parser.add_argument("--pages", type=int, default=100)
+    parser.add_argument("--lines", type=int, default=40)
+    args = parser.parse_args()
+    make_pdf(args.path, args.pages, args.lines)
+    print(args.path)
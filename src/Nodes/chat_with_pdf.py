@@ -1,11 +1,30 @@
+import asyncio
+import contextvars
+import logging
+import re
+import threading
+import time
+
+from src import config
+from src.tracing import LLM_CALLBACK, count
 from src.state.graph_State import GraphState
-from langchain_ollama import OllamaLLM
+from src.Nodes.context_builder import build_context
+from src.tools.ollama_pool import PooledOllamaLLM
 from langchain_core.output_parsers import StrOutputParser
 from langchain_core.prompts import ChatPromptTemplate
+from langgraph.config import get_stream_writer
 
+log = logging.getLogger(__name__)
 
-def init_components():
-    llm = OllamaLLM(model="llama3.2:1b", temperature=0)
+
+def _traced(chain, name: str):
+    """Tag ``chain`` so the tracing callback records its LLM calls under ``name``."""
+    return chain.with_config(tags=[name], callbacks=[LLM_CALLBACK])
+
+
+def init_components(llm=None):
+    # ``llm`` lets benchmarks and tests swap in a stand-in for the Ollama model.
+    llm = llm or PooledOllamaLLM(model=config.LLM_MODEL, temperature=0, keep_alive=config.KEEP_ALIVE_SECONDS)
     system = """You are a lenient relevance grader. If the document contains any keyword(s) or semantic meaning related to the user question, grade it as relevant. The goal is to filter out only clearly wrong hits.
 Answer with exactly 'yes' or 'no'. If unsure, prefer 'yes'."""
 
@@ -15,7 +34,18 @@ Answer with exactly 'yes' or 'no'. If unsure, prefer 'yes'."""
             ("human","Retrieved document: \n\n {document} \n\n User question: {question}")
         ]
     )
-    retrieval_grader = grade_prompt | llm | StrOutputParser()
+    retrieval_grader = _traced(grade_prompt | llm | StrOutputParser(), "retrieval_grader")
+
+    # Grades every retrieved chunk in one call; used by the "single_prompt" grading mode.
+    system = """You are a lenient relevance grader. You will see several numbered documents and a user question. For each document, decide whether it contains any keyword(s) or semantic meaning related to the question. The goal is to filter out only clearly wrong hits; if unsure, prefer 'yes'.
+Reply with one line per document in the form '<number>: yes' or '<number>: no' and nothing else."""
+    batch_grade_prompt = ChatPromptTemplate.from_messages(
+        [
+            ("system", system),
+            ("human", "Retrieved documents: \n\n {documents} \n\n User question: {question}"),
+        ]
+    )
+    batch_grader = _traced(batch_grade_prompt | llm | StrOutputParser(), "batch_grader")
 
     # Simple RAG prompt without langchain_hub dependency
     prompt = ChatPromptTemplate.from_template(
@@ -55,7 +85,7 @@ Formatting:
 # - No paragraphs or merged bullets
 # """
 
-    rag_chain = prompt | llm | StrOutputParser()
+    rag_chain = _traced(prompt | llm | StrOutputParser(), "rag_chain")
 
     # Prompt
     system = """You are a grader assessing whether an LLM generation is grounded in / supported by a set of retrieved facts.
@@ -70,7 +100,7 @@ Answer with exactly 'yes' or 'no'. If the generation is even partially grounded,
     )
 
 
-    hallucination_grader = hallicinnation_prompt | llm | StrOutputParser()
+    hallucination_grader = _traced(hallicinnation_prompt | llm | StrOutputParser(), "hallucination_grader")
 
 
     # Prompt
@@ -83,7 +113,7 @@ Answer with exactly 'yes' or 'no'. If the answer partially addresses the questio
         ]
     )
 
-    answer_grader = answer_prompt | llm | StrOutputParser()
+    answer_grader = _traced(answer_prompt | llm | StrOutputParser(), "answer_grader")
 
     system = """You a question re-writer that converts an input question to a better version that is optimized \n
      for vectorstore retrieval. Look at the input and try to reason about the underlying semantic intent / meaning."""
@@ -98,48 +128,153 @@ Answer with exactly 'yes' or 'no'. If the answer partially addresses the questio
     )
 
 
-    question_rewriter = re_write_prompt | llm | StrOutputParser()
-    return (retrieval_grader, rag_chain, hallucination_grader, answer_grader, question_rewriter)
+    question_rewriter = _traced(re_write_prompt | llm | StrOutputParser(), "question_rewriter")
+    return (retrieval_grader, rag_chain, hallucination_grader, answer_grader, question_rewriter, batch_grader)
+
 
+def _loop_stats(state) -> dict:
+    stats = {
+        "retrievals": 0,
+        "retrievals_memoized": 0,
+        "grades_memoized": 0,
+        "rewrites": 0,
+        "rewrite_llm_calls": 0,
+        "wasted_llm_calls": 0,
+    }
+    stats.update(state.get("loop_stats") or {})
+    return stats
 
-def retrieve(state : GraphState,retriever):
+
+def retrieve(state : GraphState,retriever, memo=None):
     """
     Retrieve documents
 
     Args:
         state (dict): The current graph state
+        memo: optional RetrievalMemo; a query already retrieved for skips the retriever
 
     Returns:
-        state (dict): New key added to state, documents, that contains retrieved documents
+        state (dict): New key added to state, documents, that contains retrieved documents,
+            and retrieval_timings with per-stage latencies when the retriever reports them
      """
-    print("---RETRIEVE---")
+    log.info("retrieve")
     question=state["question"]
     if retriever is None:
         raise ValueError("Retriever is not initialized. Please re-upload the PDF.")
 
-    docs=retriever.invoke(question)
+    loop_stats = _loop_stats(state)
+    timings = None
+    docs = memo.get_retrieval(question) if memo is not None else None
+    memo_miss = docs is None
+    if docs is not None:
+        log.info("retrieve: memoized")
+        loop_stats["retrievals_memoized"] += 1
+        count("retrieval_memo_hits")
+    elif hasattr(retriever, "search_with_timings"):
+        docs, timings = retriever.search_with_timings(question)
+        log.info("retrieve timings: %s", timings)
+        loop_stats["retrievals"] += 1
+    else:
+        docs=retriever.invoke(question)
+        loop_stats["retrievals"] += 1
+    if memo is not None and memo_miss:
+        memo.put_retrieval(question, docs)
 
     failures = state.get("failures", 0)
 
-    return {"documents":docs , "question":question, "failures": failures}
+    return {"documents":docs , "question":question, "failures": failures,
+            "original_question": state.get("original_question") or question, "loop_stats": loop_stats,
+            "retrieval_timings": timings or {}}
+
+
+async def aretrieve(state : GraphState, retriever, memo=None):
+    """
+    Async ``retrieve``. The FAISS and BM25 searches are CPU-bound and short,
+    so they run on a worker thread (in a copy of the caller's context) rather
+    than blocking the event loop.
+    """
+    return await asyncio.to_thread(retrieve, state, retriever, memo)
+
+
+def _stream_writer():
+    """LangGraph's custom-stream writer, or a no-op when called outside a graph run."""
+    try:
+        return get_stream_writer()
+    except RuntimeError:
+        return lambda _chunk: None
+
+
+class _TokenCollector:
+    """Accumulates streamed generation chunks, forwarding each to the custom stream."""
+
+    def __init__(self):
+        self.writer = _stream_writer()
+        self.start = time.perf_counter()
+        self.first_token = None
+        self.parts = []
+
+    def add(self, chunk):
+        if self.first_token is None:
+            self.first_token = time.perf_counter() - self.start
+        self.parts.append(chunk)
+        self.writer({"token": chunk})
+
+    def stats(self) -> dict:
+        return {
+            "ttft_seconds": round(self.first_token, 4) if self.first_token is not None else None,
+            "total_seconds": round(time.perf_counter() - self.start, 4),
+            "chunks": len(self.parts),
+        }
+
+
+def _generation_inputs(state):
+    log.info("generate")
+    context, context_stats = build_context(state["documents"])
+    log.info("context: %s", context_stats)
+    question = state["question"]
+    if state.get("history_context"):
+        # Follow-ups ("explain the second point") only make sense next to the earlier turns.
+        question = f"Conversation so far:\n{state['history_context']}\n\nFollow-up question: {question}"
+    return {"context": context, "question": question}, context_stats
+
+
+def _generation_update(state, collector, context_stats) -> dict:
+    return {"documents": state["documents"], "question": state["question"],
+            "generation": "".join(collector.parts), "failures": state.get("failures", 0),
+            "generation_stats": collector.stats(), "context_stats": context_stats}
 
 
 def generate(state : GraphState ,rag_chain):
   """
     Generate answer
 
+    The context is assembled by ``build_context``: overlapping chunks merged,
+    ordered by page and packed into config.CONTEXT_TOKEN_BUDGET tokens.
+    Tokens are streamed as they arrive to LangGraph's "custom" stream mode
+    as ``{"token": text}`` events; ``graph.invoke`` callers are unaffected.
+
     Args:
         state (dict): The current graph state
 
     Returns:
-        state (dict): New key added to state, generation, that contains LLM generation
+        state (dict): New key added to state, generation, that contains LLM generation,
+            generation_stats with time-to-first-token and total generation time,
+            and context_stats with prompt tokens before/after context assembly
   """
-  print("---GENERATE---")
-  question=state["question"]
-  docs=state["documents"]
-  generation=rag_chain.invoke({"context":docs,"question":question})
-  failures = state.get("failures", 0)
-  return {"documents": docs, "question": question, "generation": generation, "failures": failures}
+  inputs, context_stats = _generation_inputs(state)
+  collector = _TokenCollector()
+  for chunk in rag_chain.stream(inputs):
+      collector.add(chunk)
+  return _generation_update(state, collector, context_stats)
+
+
+async def agenerate(state : GraphState, rag_chain):
+    """Async ``generate``: tokens are streamed with ``rag_chain.astream``."""
+    inputs, context_stats = _generation_inputs(state)
+    collector = _TokenCollector()
+    async for chunk in rag_chain.astream(inputs):
+        collector.add(chunk)
+    return _generation_update(state, collector, context_stats)
 
 
 
@@ -147,33 +282,269 @@ def _is_yes(text: str) -> bool:
     return str(text).strip().lower().startswith("yes")
 
 
-def grade_docs(state : GraphState ,retrieval_grader):
+_VERDICT_RE = re.compile(r"^\s*\[?(\d+)\]?\s*[:.)\-]\s*(yes|no)\b", re.IGNORECASE | re.MULTILINE)
+
+
+def _run_coroutine(coro):
+    """Run ``coro`` to completion from sync code, even if this thread already has a running loop."""
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+    result = {}
+
+    def runner():
+        try:
+            result["value"] = asyncio.run(coro)
+        except BaseException as exc:
+            result["error"] = exc
+
+    # Copy the context so the request's trace follows the grading calls.
+    t = threading.Thread(target=contextvars.copy_context().run, args=(runner,))
+    t.start()
+    t.join()
+    if "error" in result:
+        raise result["error"]
+    return result["value"]
+
+
+async def _agrade_concurrently(retrieval_grader, inputs, max_concurrency):
+    """Grade ``inputs`` through ``retrieval_grader.ainvoke`` with at most ``max_concurrency`` in flight."""
+    semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+    async def grade_one(inp):
+        async with semaphore:
+            start = time.perf_counter()
+            score = await retrieval_grader.ainvoke(inp)
+            return score, time.perf_counter() - start
+
+    return await asyncio.gather(*(grade_one(inp) for inp in inputs))
+
+
+def _grade_sequential(retrieval_grader, inputs):
+    results = []
+    for inp in inputs:
+        start = time.perf_counter()
+        score = retrieval_grader.invoke(inp)
+        results.append((score, time.perf_counter() - start))
+    return results
+
+
+def _parse_batch_verdicts(reply, n: int) -> dict:
+    verdicts = {}
+    for num, verdict in _VERDICT_RE.findall(str(reply)):
+        idx = int(num) - 1
+        if 0 <= idx < n:
+            verdicts.setdefault(idx, verdict.lower() == "yes")
+    return verdicts
+
+
+def _numbered(docs) -> str:
+    return "\n\n".join(f"[{i}] {d.page_content}" for i, d in enumerate(docs, start=1))
+
+
+def _grade_single_prompt(batch_grader, retrieval_grader, question, docs, max_concurrency):
+    """
+    Grade all documents in one prompt. Documents the model gives no verdict
+    for are re-graded individually, so the outcome never silently drops a chunk.
+    """
+    return _run_coroutine(_agrade_single_prompt(batch_grader, retrieval_grader, question, docs, max_concurrency,
+                                                sync_batch=True))
+
+
+async def _agrade_single_prompt(batch_grader, retrieval_grader, question, docs, max_concurrency, sync_batch=False):
+    start = time.perf_counter()
+    payload = {"question": question, "documents": _numbered(docs)}
+    reply = batch_grader.invoke(payload) if sync_batch else await batch_grader.ainvoke(payload)
+    timings = [time.perf_counter() - start]
+    verdicts = _parse_batch_verdicts(reply, len(docs))
+    missing = [i for i in range(len(docs)) if i not in verdicts]
+    if missing:
+        log.info("grade: no verdict for %d document(s), grading individually", len(missing))
+        inputs = [{"question": question, "document": docs[i].page_content} for i in missing]
+        results = await _agrade_concurrently(retrieval_grader, inputs, max_concurrency)
+        for i, (score, seconds) in zip(missing, results):
+            verdicts[i] = _is_yes(score)
+            timings.append(seconds)
+    return [verdicts[i] for i in range(len(docs))], timings
+
+
+def _prefilter_by_score(docs, accept_score, reject_score):
+    """
+    Split documents by their retrieval similarity (``metadata["score"]``).
+
+    Returns:
+        (verdicts, ambiguous): verdicts maps index -> bool for clear hits and
+        misses; ambiguous lists the indexes that still need an LLM grade.
+        Documents without a score are always ambiguous, and lexical hits are
+        never rejected on similarity alone.
+    """
+    verdicts = {}
+    ambiguous = []
+    for i, d in enumerate(docs):
+        metadata = getattr(d, "metadata", None) or {}
+        score = metadata.get("score")
+        if score is not None and score >= accept_score:
+            verdicts[i] = True
+        elif score is not None and score < reject_score and not metadata.get("bm25_score"):
+            # Exact lexical matches (identifiers, clause numbers) can embed poorly,
+            # so only chunks the BM25 search did not surface are dropped outright.
+            verdicts[i] = False
+        else:
+            ambiguous.append(i)
+    return verdicts, ambiguous
+
+
+def _grade_setup(state, batch_grader, mode, max_concurrency, accept_score, reject_score, memo) -> dict:
+    """Resolve settings, apply the similarity pre-filter and the grade memo; returns the grading job."""
+    question = state["question"]
+    docs = state["documents"]
+    mode = mode or config.GRADING_MODE
+    accept_score = config.GRADE_ACCEPT_SCORE if accept_score is None else accept_score
+    reject_score = config.GRADE_REJECT_SCORE if reject_score is None else reject_score
+    if mode == "single_prompt" and batch_grader is None:
+        mode = "concurrent"
+    if mode not in ("single_prompt", "concurrent", "sequential"):
+        raise ValueError(f"Unknown grading mode: {mode!r}")
+
+    # Grades are memoized against the user's original question, so they survive rewrites.
+    memo_question = state.get("original_question") or question
+    loop_stats = _loop_stats(state)
+
+    start = time.perf_counter()
+    verdicts, ambiguous = _prefilter_by_score(docs, accept_score, reject_score)
+    if memo is not None:
+        remembered = {i: memo.get_grade(memo_question, docs[i]) for i in ambiguous}
+        remembered = {i: v for i, v in remembered.items() if v is not None}
+        verdicts.update(remembered)
+        loop_stats["grades_memoized"] += len(remembered)
+        if remembered:
+            count("grade_memo_hits", len(remembered))
+        ambiguous = [i for i in ambiguous if i not in remembered]
+    pending = [docs[i] for i in ambiguous]
+    return {
+        "state": state,
+        "question": question,
+        "docs": docs,
+        "mode": mode,
+        "max_concurrency": max_concurrency or config.GRADING_CONCURRENCY,
+        "memo_question": memo_question,
+        "loop_stats": loop_stats,
+        "start": start,
+        "verdicts": verdicts,
+        "ambiguous": ambiguous,
+        "pending": pending,
+        "inputs": [{"question": question, "document": d.page_content} for d in pending],
+    }
+
+
+def _grade_finish(job, llm_verdicts, timings, memo) -> dict:
+    """Merge LLM verdicts into the job, update the memo and build the node's state update."""
+    docs, ambiguous, verdicts, loop_stats = job["docs"], job["ambiguous"], job["verdicts"], job["loop_stats"]
+    verdicts.update(zip(ambiguous, llm_verdicts))
+    if memo is not None:
+        for i, relevant in zip(ambiguous, llm_verdicts):
+            memo.put_grade(job["memo_question"], docs[i], relevant)
+
+    # Score each doc
+    filtered_docs = []
+    for i, d in enumerate(docs):
+        if verdicts[i]:
+            log.debug("grade: document relevant")
+            filtered_docs.append(d)
+        else:
+            log.debug("grade: document not relevant")
+            continue
+    prefiltered = len(docs) - len(job["pending"])
+    grading = {
+        "mode": job["mode"],
+        "llm_calls": len(timings),
+        # Baseline is one grader call per retrieved document.
+        "llm_calls_saved": len(docs) - len(timings),
+        "prefiltered_accept": sum(1 for i, v in verdicts.items() if v and i not in ambiguous),
+        "prefiltered_reject": sum(1 for i, v in verdicts.items() if not v and i not in ambiguous),
+        "call_seconds": [round(t, 4) for t in timings],
+        "total_seconds": round(time.perf_counter() - job["start"], 4),
+    }
+    if not filtered_docs:
+        # Nothing passed, so every grading call in this pass bought nothing.
+        loop_stats["wasted_llm_calls"] += len(timings)
+    log.info("grading: %d of %d decided by similarity, %s", prefiltered, len(docs), grading)
+    return {"documents": filtered_docs, "question": job["question"], "failures": job["state"].get("failures", 0),
+            "grading": grading, "loop_stats": loop_stats}
+
+
+def grade_docs(state : GraphState ,retrieval_grader, batch_grader=None, mode=None, max_concurrency=None,
+               accept_score=None, reject_score=None, memo=None):
     """
         Determines whether the retrieved documents are relevant to the question.
 
+        Documents whose retrieval similarity is at least ``accept_score`` are
+        kept, and those below ``reject_score`` are dropped, without an LLM call;
+        only the band in between goes to the grader.
+
         Args:
             state (dict): The current graph state
+            retrieval_grader: per-document relevance chain
+            batch_grader: chain grading all documents in one prompt ("single_prompt" mode)
+            mode: "sequential", "concurrent" or "single_prompt"; defaults to config.GRADING_MODE
+            max_concurrency: cap on in-flight grading calls; defaults to config.GRADING_CONCURRENCY
+            accept_score: similarity at or above which a document is kept; defaults to config.GRADE_ACCEPT_SCORE
+            reject_score: similarity below which a document is dropped; defaults to config.GRADE_REJECT_SCORE
+            memo: optional RetrievalMemo; chunks already graded for the original question are not re-graded
 
         Returns:
             state (dict): Updates documents key with only filtered relevant documents
+                and grading key with the mode, LLM calls made and saved, and per-call timings
     """
-    print("---CHECK DOCUMENT RELEVANCE TO QUESTION---")
-    question=state["question"]
-    docs=state["documents"]
-    failures = state.get("failures", 0)
-    # Score each doc
-    filtered_docs = []
-    for d in docs:
-        score = retrieval_grader.invoke(
-                {"question": question, "document": d.page_content}
-            )
-        if _is_yes(score):
-            print("---GRADE: DOCUMENT RELEVANT---")
-            filtered_docs.append(d)
+    log.info("grade documents")
+    job = _grade_setup(state, batch_grader, mode, max_concurrency, accept_score, reject_score, memo)
+    if not job["pending"]:
+        llm_verdicts, timings = [], []
+    elif job["mode"] == "single_prompt":
+        llm_verdicts, timings = _grade_single_prompt(
+            batch_grader, retrieval_grader, job["question"], job["pending"], job["max_concurrency"])
+    else:
+        if job["mode"] == "concurrent":
+            results = _run_coroutine(_agrade_concurrently(retrieval_grader, job["inputs"], job["max_concurrency"]))
         else:
-            print("---GRADE: DOCUMENT NOT RELEVANT---")
-            continue
-    return {"documents": filtered_docs, "question": question, "failures": failures}
+            results = _grade_sequential(retrieval_grader, job["inputs"])
+        llm_verdicts = [_is_yes(score) for score, _ in results]
+        timings = [seconds for _, seconds in results]
+    return _grade_finish(job, llm_verdicts, timings, memo)
+
+
+async def agrade_docs(state : GraphState, retrieval_grader, batch_grader=None, mode=None, max_concurrency=None,
+                      accept_score=None, reject_score=None, memo=None):
+    """Async ``grade_docs``: grader calls are awaited on the caller's event loop instead of a private one."""
+    log.info("grade documents")
+    job = _grade_setup(state, batch_grader, mode, max_concurrency, accept_score, reject_score, memo)
+    if not job["pending"]:
+        llm_verdicts, timings = [], []
+    elif job["mode"] == "single_prompt":
+        llm_verdicts, timings = await _agrade_single_prompt(
+            batch_grader, retrieval_grader, job["question"], job["pending"], job["max_concurrency"])
+    else:
+        # "sequential" is a concurrency cap of one.
+        limit = job["max_concurrency"] if job["mode"] == "concurrent" else 1
+        results = await _agrade_concurrently(retrieval_grader, job["inputs"], limit)
+        llm_verdicts = [_is_yes(score) for score, _ in results]
+        timings = [seconds for _, seconds in results]
+    return _grade_finish(job, llm_verdicts, timings, memo)
+
+
+def _rewrite_setup(state) -> dict:
+    rewrites = state.get("rewrites", 0) + 1
+    loop_stats = _loop_stats(state)
+    loop_stats["rewrites"] = rewrites
+    # Failed grading passes are already counted as wasted; a rewrite is wasted
+    # only if the loop still ends in not_found.
+    loop_stats["rewrite_llm_calls"] += 1
+    count("rewrites")
+    log.info("transform query (%d/%d)", rewrites, config.MAX_REWRITES)
+    return {"documents": state["documents"], "failures": state.get("failures", 0),
+            "rewrites": rewrites, "loop_stats": loop_stats}
+
 
 def transform_query(state : GraphState ,question_rewriter):
     """
@@ -183,15 +554,37 @@ def transform_query(state : GraphState ,question_rewriter):
         state (dict): The current graph state
 
     Returns:
-        state (dict): Updates question key with a re-phrased question
+        state (dict): Updates question key with a re-phrased question and
+            increments rewrites
   """
-    question=state["question"]
-    documents = state["documents"]
-    failures = state.get("failures", 0)
+    update = _rewrite_setup(state)
+    update["question"] = question_rewriter.invoke({"question": state["question"]})
+    return update
 
-    print("---TRANSFORM QUERY---")
-    new_question=question_rewriter.invoke({"question":question})
-    return {"documents": documents, "question": new_question, "failures": failures}
+
+async def atransform_query(state : GraphState, question_rewriter):
+    """Async ``transform_query``."""
+    update = _rewrite_setup(state)
+    update["question"] = await question_rewriter.ainvoke({"question": state["question"]})
+    return update
+
+
+def not_found(state : GraphState):
+    """
+    Answer gracefully once the rewrite budget is spent without relevant chunks.
+
+    Args:
+        state (dict): The current graph state
+
+    Returns:
+        state (dict): generation set to config.NOT_FOUND_ANSWER
+    """
+    log.info("not found in document")
+    loop_stats = _loop_stats(state)
+    # None of the rewrites led to relevant chunks.
+    loop_stats["wasted_llm_calls"] += loop_stats["rewrite_llm_calls"]
+    log.info("loop stats: %s", loop_stats)
+    return {"documents": [], "generation": config.NOT_FOUND_ANSWER, "loop_stats": loop_stats}
 
 
 
@@ -203,23 +596,25 @@ def decide_to_generate(state : GraphState):
         state (dict): The current graph state
 
     Returns:
-        str: Binary decision for next node to call
+        str: Decision for next node to call: "generate", "transform_query", or
+            "not_found" once config.MAX_REWRITES rewrites have failed
     """
 
-    print("---ASSESS GRADED DOCUMENTS---")
+    log.info("assess graded documents")
     state["question"]
     filtered_documents = state["documents"]
 
+    if not filtered_documents and state.get("rewrites", 0) >= config.MAX_REWRITES:
+        log.info("decision: rewrite budget spent, not found in document")
+        return "not_found"
     if not filtered_documents:
         # All documents have been filtered check_relevance
         # We will re-generate a new query
-        print(
-            "---DECISION: ALL DOCUMENTS ARE NOT RELEVANT TO QUESTION, TRANSFORM QUERY---"
-        )
+        log.info("decision: all documents are not relevant to question, transform query")
         return "transform_query"
     else:
         # We have relevant documents, so generate answer
-        print("---DECISION: GENERATE---")
+        log.info("decision: generate")
         return "generate"
     
 
@@ -241,37 +636,37 @@ def grade_generation_v_documents_and_question(state : GraphState ,hallucination_
         str: Decision for next node to call
     """
 
-    print("---CHECK HALLUCINATIONS---")
+    log.info("check hallucinations")
     question = state["question"]
     documents = state["documents"]
     generation = state["generation"]
 
     score = hallucination_grader.invoke(
-        {"facts": documents, "generation": generation}
+        {"facts": build_context(documents)[0], "generation": generation}
     )
     grade = _is_yes(score)
     failures = state.get("failures", 0)
 
     # Check hallucination
     if grade:
-        print("---DECISION: GENERATION IS GROUNDED IN DOCUMENTS---")
+        log.info("decision: generation is grounded in documents")
         # Check question-answering
-        print("---GRADE GENERATION vs QUESTION---")
+        log.info("grade generation vs question")
         score = answer_grader.invoke({"question": question, "generation": generation})
         grade = _is_yes(score)
         if grade:
-            print("---DECISION: GENERATION ADDRESSES QUESTION---")
+            log.info("decision: generation addresses question")
             state["failures"] = failures
             return "useful"
         else:
-            print("---DECISION: GENERATION DOES NOT ADDRESS QUESTION---")
+            log.info("decision: generation does not address question")
             failures += 1
             state["failures"] = failures
             if failures >= 2:
                 return "stop"
             return "not useful"
     else:
-        print("---DECISION: GENERATION IS NOT GROUNDED IN DOCUMENTS, RE-TRY---")
+        log.info("decision: generation is not grounded in documents, re-try")
         failures += 1
         state["failures"] = failures
         if failures >= 2:
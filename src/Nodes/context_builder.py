@@ -0,0 +1,133 @@
+import math
+
+from src import config
+
+# Longest suffix/prefix overlap searched when chunks carry no start_index.
+_MAX_TEXT_OVERLAP = 400
+_MIN_TEXT_OVERLAP = 20
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap prompt-token estimate (characters / config.CONTEXT_CHARS_PER_TOKEN); no tokenizer needed."""
+    return math.ceil(len(text) / config.CONTEXT_CHARS_PER_TOKEN) if text else 0
+
+
+def _text_overlap(a: str, b: str) -> int:
+    """Length of the longest suffix of ``a`` that is a prefix of ``b``."""
+    for n in range(min(len(a), len(b), _MAX_TEXT_OVERLAP), _MIN_TEXT_OVERLAP - 1, -1):
+        if a.endswith(b[:n]):
+            return n
+    return 0
+
+
+def _source_key(meta: dict):
+    return meta.get("library_doc_id") or meta.get("source", "")
+
+
+def merge_chunks(docs):
+    """
+    Merge chunks that overlap or touch on the same page into passages.
+
+    Uses the splitter's ``start_index`` when present, else a text overlap check.
+
+    Returns:
+        list of passage dicts with source, page, page_label, label, start, text
+        and rank (best retrieval rank among the merged chunks)
+    """
+    groups = {}
+    for rank, doc in enumerate(docs):
+        meta = doc.metadata or {}
+        key = (_source_key(meta), meta.get("page", -1))
+        groups.setdefault(key, []).append((meta.get("start_index"), rank, doc))
+
+    passages = []
+    for (source, page), items in groups.items():
+        if all(start is not None for start, _, _ in items):
+            items.sort(key=lambda item: item[0])
+        current = None
+        for start, rank, doc in items:
+            text = doc.page_content.strip()
+            if current is not None:
+                if start is not None and current["start"] is not None:
+                    end = current["start"] + len(current["text"])
+                    # Overlapping or adjacent (the splitter may drop a separator).
+                    if start <= end + 1:
+                        current["text"] += text[end - start:] if start <= end else " " + text
+                        current["rank"] = min(current["rank"], rank)
+                        continue
+                else:
+                    overlap = _text_overlap(current["text"], text)
+                    if overlap or text in current["text"]:
+                        if text not in current["text"]:
+                            current["text"] += text[overlap:]
+                        current["rank"] = min(current["rank"], rank)
+                        continue
+                passages.append(current)
+            meta = doc.metadata or {}
+            current = {
+                "source": source,
+                "page": page,
+                "page_label": meta.get("page_label"),
+                "label": meta.get("library_name"),
+                "start": start,
+                "text": text,
+                "rank": rank,
+            }
+        if current is not None:
+            passages.append(current)
+    return passages
+
+
+def _render(passage: dict) -> str:
+    page = passage["page_label"]
+    if not page:
+        page = passage["page"] + 1 if isinstance(passage["page"], int) and passage["page"] >= 0 else "?"
+    header = f"[{passage['label']}, page {page}]" if passage["label"] else f"[Page {page}]"
+    return f"{header}\n{passage['text']}"
+
+
+def build_context(docs, budget: int = None, count_tokens=estimate_tokens):
+    """
+    Assemble the generation prompt's context from retrieved chunks.
+
+    Overlapping/adjacent chunks are merged, passages are admitted in
+    retrieval-rank order until ``budget`` tokens are used (the first passage
+    is truncated to fit if needed), and the admitted passages are rendered in
+    document order as plain text with a page header each.
+
+    Args:
+        docs: retrieved (graded) Documents, best first
+        budget: token budget for the context; defaults to config.CONTEXT_TOKEN_BUDGET
+        count_tokens: token counter, ``estimate_tokens`` by default
+
+    Returns:
+        (context, stats): the context string and a dict with chunks, passages,
+        passages_used, tokens_before (the raw Document list as previously
+        sent), tokens_after and budget
+    """
+    budget = budget or config.CONTEXT_TOKEN_BUDGET
+    passages = merge_chunks(docs)
+    used = []
+    tokens = 0
+    for passage in sorted(passages, key=lambda p: p["rank"]):
+        cost = count_tokens(_render(passage)) + 1
+        if tokens + cost > budget:
+            if used:
+                continue
+            # Never send an empty context: keep the head of the best passage.
+            chars = max(0, (budget - 1) * config.CONTEXT_CHARS_PER_TOKEN - len(_render(dict(passage, text=""))))
+            passage = dict(passage, text=passage["text"][:chars])
+            cost = count_tokens(_render(passage)) + 1
+        used.append(passage)
+        tokens += cost
+    used.sort(key=lambda p: (str(p["source"]), p["page"] if isinstance(p["page"], int) else -1, p["start"] or 0))
+    context = "\n\n".join(_render(p) for p in used)
+    stats = {
+        "chunks": len(docs),
+        "passages": len(passages),
+        "passages_used": len(used),
+        "tokens_before": count_tokens(str(docs)),
+        "tokens_after": count_tokens(context),
+        "budget": budget,
+    }
+    return context, stats
@@ -0,0 +1,247 @@
+import logging
+import re
+import threading
+
+from src import config
+from src.Nodes.chat_with_pdf import agrade_docs, aretrieve, grade_docs, retrieve
+from src.Nodes.context_builder import estimate_tokens
+from src.Nodes.retrieval_memo import doc_key
+from src.state.graph_State import GraphState
+from src.tracing import count
+
+log = logging.getLogger(__name__)
+
+_WORD_RE = re.compile(r"[a-z0-9][a-z0-9.\-]*", re.IGNORECASE)
+# Openers that only make sense as a continuation of the previous turn.
+_CONTINUATION_RE = re.compile(
+    r"^\s*(what about|how about|tell me more|more on|go on|continue|elaborate|expand|"
+    r"explain (that|this|it|them|those|more|further)|why is that|why so\b|can you (elaborate|expand))",
+    re.IGNORECASE,
+)
+# Conjunctions that open follow-ups ("and the rear ones?") but also plenty of
+# standalone questions ("Also, how do I reset the infotainment system?").
+_CONJUNCTION_RE = re.compile(r"^\s*(and|but|also|so|then|why)\b", re.IGNORECASE)
+# References to something said earlier in the conversation.
+_REFERENCE_RE = re.compile(
+    r"\b(it|its|this|that|these|those|they|them|their|above|previous|earlier|you said|your answer|"
+    r"the (first|second|third|fourth|fifth|last|next|other|same) (point|one|step|item|bullet|part|option))\b",
+    re.IGNORECASE,
+)
+_STOPWORDS = frozenset(
+    "a an the and or but if of to in on at by for with about from into over under is are was were be been "
+    "being do does did can could should would will shall may might must what which who whom whose when where "
+    "why how it its this that these those they them their there here i me my we our you your he she his her "
+    "more most some any all each other such than then so also please tell explain describe give show list "
+    "point points step steps one ones part parts again further detail details elaborate expand mean means said answer "
+    "first second third fourth fifth last next previous above earlier same".split()
+)
+# A question with at most this many words not seen in the previous turn can still be a follow-up.
+_MAX_NEW_WORDS = 2
+# The same limit for questions whose only cue is an opening conjunction.
+_MAX_CONJUNCTION_NEW_WORDS = 1
+
+
+def content_words(text: str) -> set:
+    return {w.strip(".-") for w in _WORD_RE.findall(str(text).lower())} - _STOPWORDS - {""}
+
+
+def classify_follow_up(question: str, history) -> str:
+    """
+    Cheap follow-up detector (no model calls).
+
+    A question is a follow-up when the previous turn found documents and the
+    question either opens like a continuation ("and the second point?", "tell
+    me more") or refers back ("explain that", "the third step"), and adds at
+    most ``_MAX_NEW_WORDS`` content words of its own. A question whose only
+    cue is an opening conjunction ("and the rear ones?") may add at most
+    ``_MAX_CONJUNCTION_NEW_WORDS``, since "Also, how do I ..." or "Why does
+    ..." usually starts a new question.
+
+    Returns:
+        "reuse" when the previous turn's documents cover every content word of
+        the question, "extend" when it brings new terms to retrieve for, or
+        "new" for a standalone question
+    """
+    if not history or not history[-1].get("documents"):
+        return "new"
+    last = history[-1]
+    words = content_words(question)
+    seen = content_words(f"{last['question']} {last.get('answer', '')}")
+    new_words = words - seen
+    if _CONTINUATION_RE.search(question) or _REFERENCE_RE.search(question):
+        limit = _MAX_NEW_WORDS
+    elif _CONJUNCTION_RE.search(question):
+        limit = _MAX_CONJUNCTION_NEW_WORDS
+    else:
+        return "new"
+    if len(new_words) > limit:
+        return "new"
+    covered = content_words(" ".join(d.page_content for d in last["documents"]))
+    return "extend" if new_words - covered else "reuse"
+
+
+def condense_history(history, max_tokens: int = None) -> str:
+    """
+    Earlier turns as "User:/Assistant:" lines, newest kept first, within ``max_tokens``.
+
+    Answers that do not fit whole are cut to the remaining budget; older turns
+    are dropped.
+    """
+    max_tokens = config.CONVERSATION_HISTORY_TOKENS if max_tokens is None else max_tokens
+    chars_per_token = config.CONTEXT_CHARS_PER_TOKEN
+    blocks = []
+    remaining = max_tokens
+    for turn in reversed(history or []):
+        question = f"User: {turn['question']}"
+        answer = f"Assistant: {turn.get('answer') or ''}".strip()
+        needed = estimate_tokens(question) + estimate_tokens(answer)
+        if needed > remaining:
+            room = int((remaining - estimate_tokens(question)) * chars_per_token)
+            if room < 40:
+                break
+            answer = answer[:room].rsplit(" ", 1)[0] + " ..."
+            needed = remaining
+        blocks.append(f"{question}\n{answer}")
+        remaining -= needed
+        if remaining <= 0:
+            break
+    return "\n\n".join(reversed(blocks))
+
+
+def route_question(state: GraphState) -> str:
+    """
+    Entry edge: follow-ups go to ``follow_up``, everything else to ``retrive``.
+
+    Uses ``state["follow_up"]`` when the caller already classified the question.
+    """
+    mode = state.get("follow_up") or classify_follow_up(state["question"], state.get("history"))
+    return "follow_up" if mode in ("reuse", "extend") else "retrive"
+
+
+def _follow_up_setup(state):
+    history = state["history"]
+    last = history[-1]
+    mode = state.get("follow_up") or classify_follow_up(state["question"], history)
+    if mode not in ("reuse", "extend"):
+        mode = "extend"
+    log.info("follow-up (%s) of %r", mode, last["question"])
+    count("follow_ups")
+    return last, mode
+
+
+def _follow_up_update(state, last, mode, fresh, grading=None, loop_stats=None) -> dict:
+    documents = list(last["documents"])
+    seen = {doc_key(d) for d in documents}
+    added = [d for d in fresh if doc_key(d) not in seen]
+    documents.extend(added)
+    update = {
+        "documents": documents,
+        "original_question": state["question"],
+        "failures": state.get("failures", 0),
+        "history_context": condense_history(state["history"]),
+        "conversation": {
+            "mode": mode,
+            "reused_documents": len(last["documents"]),
+            "new_documents": len(added),
+            "retrieval_avoided": mode == "reuse",
+        },
+    }
+    if grading is not None:
+        update["grading"] = grading
+    if loop_stats is not None:
+        update["loop_stats"] = loop_stats
+    return update
+
+
+def _extension_state(state, last) -> dict:
+    # The follow-up alone ("and the torque for the second one?") retrieves
+    # poorly; prefix the previous question so the search has its subject.
+    return {"question": f"{last['question']} {state['question']}", "original_question": state["question"],
+            "loop_stats": state.get("loop_stats")}
+
+
+def follow_up(state: GraphState, retriever, retrieval_grader, batch_grader=None, memo=None):
+    """
+    Answer a follow-up from the previous turn's already graded chunks.
+
+    In "reuse" mode nothing is retrieved or graded. In "extend" mode the
+    question (prefixed with the previous one) is retrieved for and only
+    chunks not already held are graded and appended.
+
+    Args:
+        state (dict): The current graph state, with ``history`` of earlier turns
+
+    Returns:
+        state (dict): documents (previous chunks plus any new relevant ones),
+            history_context with the condensed conversation for the prompt,
+            and conversation with the mode and chunk counts
+    """
+    last, mode = _follow_up_setup(state)
+    if mode == "reuse":
+        return _follow_up_update(state, last, mode, [])
+    retrieved = retrieve(_extension_state(state, last), retriever, memo)
+    held = {doc_key(d) for d in last["documents"]}
+    retrieved["documents"] = [d for d in retrieved["documents"] if doc_key(d) not in held]
+    graded = grade_docs(retrieved, retrieval_grader, batch_grader, memo=memo) if retrieved["documents"] else retrieved
+    return _follow_up_update(state, last, mode, graded["documents"], graded.get("grading"), graded["loop_stats"])
+
+
+async def afollow_up(state: GraphState, retriever, retrieval_grader, batch_grader=None, memo=None):
+    """Async ``follow_up``."""
+    last, mode = _follow_up_setup(state)
+    if mode == "reuse":
+        return _follow_up_update(state, last, mode, [])
+    retrieved = await aretrieve(_extension_state(state, last), retriever, memo)
+    held = {doc_key(d) for d in last["documents"]}
+    retrieved["documents"] = [d for d in retrieved["documents"] if doc_key(d) not in held]
+    graded = (await agrade_docs(retrieved, retrieval_grader, batch_grader, memo=memo)
+              if retrieved["documents"] else retrieved)
+    return _follow_up_update(state, last, mode, graded["documents"], graded.get("grading"), graded["loop_stats"])
+
+
+class ConversationMemory:
+    """
+    One session's conversation over one document (or library).
+
+    Keeps the last ``max_turns`` turns (question, answer and the graded
+    chunks the answer used) and per-session counters. ``inputs`` builds the
+    graph input for the next question, already classified, so callers can
+    skip the semantic answer cache for follow-ups; ``record`` stores the
+    finished turn.
+    """
+
+    def __init__(self, max_turns: int = None):
+        self.max_turns = max_turns or config.CONVERSATION_MAX_TURNS
+        self.turns = []
+        self._lock = threading.Lock()
+        self.stats = {"turns": 0, "follow_ups": 0, "retrievals_avoided": 0, "grades_avoided": 0}
+
+    def inputs(self, question: str) -> dict:
+        with self._lock:
+            history = list(self.turns)
+        return {"question": question, "history": history, "follow_up": classify_follow_up(question, history)}
+
+    def record(self, state: dict):
+        """Add the finished turn from the final graph ``state``."""
+        conversation = state.get("conversation") or {}
+        documents = state.get("documents") or []
+        answer = state.get("generation") or ""
+        with self._lock:
+            self.stats["turns"] += 1
+            if conversation:
+                self.stats["follow_ups"] += 1
+                self.stats["retrievals_avoided"] += int(conversation.get("retrieval_avoided", False))
+                # Each carried-over chunk would have been retrieved and graded again.
+                self.stats["grades_avoided"] += conversation.get("reused_documents", 0)
+            if answer == config.NOT_FOUND_ANSWER:
+                documents = []
+            self.turns.append({
+                "question": state.get("original_question") or state.get("question"),
+                "answer": answer,
+                "documents": list(documents),
+            })
+            del self.turns[:-self.max_turns]
+
+    def clear(self):
+        with self._lock:
+            self.turns = []
@@ -0,0 +1,153 @@
+import logging
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from src import config
+from src.Nodes.chat_with_pdf import _agrade_concurrently, _is_yes, _run_coroutine
+from src.Nodes.context_builder import build_context
+from src.tools.embedding_pipeline import BatchedEmbedder
+from src.tools.ingestion import make_splitter
+from src.tracing import METRICS
+
+log = logging.getLogger(__name__)
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+|\n+")
+_MARKUP = re.compile(r"^\s*(?:[-*•]|\d+[.)])\s+|\*\*|__|`")
+# Fragments shorter than this (headings, "Yes.") are not checked.
+_MIN_SENTENCE_CHARS = 12
+
+
+def split_sentences(text: str):
+    """Answer sentences to check, with list markers and emphasis stripped."""
+    sentences = []
+    for part in _SENTENCE_END.split(text or ""):
+        sentence = _MARKUP.sub("", part).strip()
+        if len(sentence) >= _MIN_SENTENCE_CHARS:
+            sentences.append(sentence)
+    return sentences
+
+
+def _normalized(matrix) -> np.ndarray:
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.maximum(norms, 1e-12)
+
+
+class GroundingVerifier:
+    """
+    Checks finished answers against their retrieved chunks, off the answer path.
+
+    Each answer sentence is embedded and scored by its best cosine similarity
+    to the chunk embeddings (read from the ingestion embedding cache, so the
+    chunks are normally not embedded again; parent sections are scored
+    through their chunks). Sentences at or above ``support_score`` count as
+    supported without an LLM call; only the rest go to the hallucination
+    grader. The answer grader runs only when the
+    answer is less than ``answer_score`` similar to the question.
+
+    ``submit`` runs the check on a background worker and returns a Future, so
+    callers show the answer first and attach the report when it is ready.
+    """
+
+    def __init__(self, embedding, hallucination_grader, answer_grader, support_score: float = None,
+                 answer_score: float = None, max_concurrency: int = None):
+        self.embedding = embedding
+        self.hallucination_grader = hallucination_grader
+        self.answer_grader = answer_grader
+        self.support_score = config.GROUNDING_SUPPORT_SCORE if support_score is None else support_score
+        self.answer_score = config.GROUNDING_ANSWER_SCORE if answer_score is None else answer_score
+        self.max_concurrency = max_concurrency or config.GRADING_CONCURRENCY
+        self._embedder = None
+        self._lock = threading.Lock()
+        # One worker: verification never competes with itself for the model.
+        self._executor = ThreadPoolExecutor(1, thread_name_prefix="grounding")
+
+    def _chunk_vectors(self, documents) -> np.ndarray:
+        with self._lock:
+            if self._embedder is None:
+                self._embedder = BatchedEmbedder(self.embedding)
+        # Parent sections are re-split into the chunks that were embedded at ingestion
+        # (the split is deterministic), so their vectors come from the cache too.
+        splitter = make_splitter()
+        texts = [c.page_content for d in documents for c in splitter.split_documents([d])]
+        return self._embedder.embed(texts)
+
+    def close(self):
+        """Stop the background worker once queued checks finish; ``submit`` must not be called afterwards."""
+        self._executor.shutdown(wait=False)
+
+    def submit(self, question: str, generation: str, documents):
+        """
+        Verify in the background.
+
+        Returns:
+            Future of the ``verify`` report, or None when there is nothing to check
+            (no answer, no documents, or the "not found" answer)
+        """
+        if not generation or not documents or generation == config.NOT_FOUND_ANSWER:
+            return None
+        return self._executor.submit(self.verify, question, generation, list(documents))
+
+    def verify(self, question: str, generation: str, documents) -> dict:
+        """
+        Args:
+            question: the user's question
+            generation: the answer shown to the user
+            documents: the chunks the answer was generated from
+
+        Returns:
+            dict with grounded, answers_question, supported_ratio, per-sentence
+            similarity and verdicts, the answer-to-question similarity, LLM calls
+            made and saved, and the wall time
+        """
+        start = time.perf_counter()
+        sentences = split_sentences(generation)
+        chunk_vectors = _normalized(self._chunk_vectors(documents))
+        vectors = _normalized(self.embedding.embed_documents([question, generation] + sentences))
+        answer_similarity = float(vectors[0] @ vectors[1])
+        similarities = (vectors[2:] @ chunk_vectors.T).max(axis=1) if sentences else np.zeros(0)
+
+        report = []
+        low = []
+        for i, (sentence, similarity) in enumerate(zip(sentences, similarities)):
+            supported = bool(similarity >= self.support_score)
+            report.append({"text": sentence, "similarity": round(float(similarity), 4),
+                           "supported": supported, "checked_by": "similarity"})
+            if not supported:
+                low.append(i)
+
+        llm_calls = 0
+        if low:
+            facts = build_context(documents)[0]
+            inputs = [{"facts": facts, "generation": sentences[i]} for i in low]
+            results = _run_coroutine(_agrade_concurrently(self.hallucination_grader, inputs, self.max_concurrency))
+            for i, (score, _) in zip(low, results):
+                report[i].update(supported=_is_yes(score), checked_by="llm")
+            llm_calls += len(low)
+        answers_question = True
+        if answer_similarity < self.answer_score:
+            answers_question = _is_yes(self.answer_grader.invoke({"question": question, "generation": generation}))
+            llm_calls += 1
+
+        supported = sum(1 for s in report if s["supported"])
+        result = {
+            "grounded": supported == len(report),
+            "answers_question": answers_question,
+            "supported_ratio": round(supported / len(report), 4) if report else 1.0,
+            "sentences": report,
+            "answer_similarity": round(answer_similarity, 4),
+            "llm_calls": llm_calls,
+            # Baseline is one hallucination check per sentence plus one answer check.
+            "llm_calls_saved": len(report) + 1 - llm_calls,
+            "seconds": round(time.perf_counter() - start, 4),
+        }
+        METRICS.inc("rag_grounding_total", help="Answers verified for groundedness",
+                    result="grounded" if result["grounded"] else "ungrounded")
+        METRICS.observe("rag_grounding_seconds", result["seconds"], help="Groundedness verification time")
+        log.info("grounding: %d/%d sentence(s) supported, %d LLM call(s), answers question: %s",
+                 supported, len(report), llm_calls, answers_question)
+        return result
@@ -0,0 +1,68 @@
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+
+from src import config
+
+_PUNCT_RE = re.compile(r"[^\w\s]")
+_SPACE_RE = re.compile(r"\s+")
+
+
+def normalize_query(text: str) -> str:
+    """Lowercase, drop punctuation and collapse whitespace so trivial rewrites share a key."""
+    return _SPACE_RE.sub(" ", _PUNCT_RE.sub(" ", str(text).lower())).strip()
+
+
+def doc_key(doc) -> str:
+    """Stable identity of a retrieved chunk: its docstore id, else a hash of its content and page."""
+    doc_id = getattr(doc, "id", None)
+    if doc_id:
+        return str(doc_id)
+    page = (getattr(doc, "metadata", None) or {}).get("page", "")
+    return hashlib.sha1(f"{page}\x00{doc.page_content}".encode("utf-8")).hexdigest()
+
+
+class RetrievalMemo:
+    """
+    Per-graph memo of retrievals and relevance grades.
+
+    ``retrievals`` maps a normalized query to the documents it returned, so a
+    rewrite that normalizes to an already seen query skips the retriever.
+    ``grades`` maps (normalized original question, chunk id) to the grader's
+    verdict, so rewrites that land on the same chunks are not graded again.
+    Both tables are LRU-bounded to ``max_entries``.
+    """
+
+    def __init__(self, max_entries: int = None):
+        self.max_entries = max_entries or config.RETRIEVAL_MEMO_SIZE
+        self._lock = threading.Lock()
+        self._retrievals = OrderedDict()
+        self._grades = OrderedDict()
+
+    def _get(self, table, key):
+        with self._lock:
+            if key not in table:
+                return None
+            table.move_to_end(key)
+            return table[key]
+
+    def _put(self, table, key, value):
+        with self._lock:
+            table[key] = value
+            table.move_to_end(key)
+            while len(table) > self.max_entries:
+                table.popitem(last=False)
+
+    def get_retrieval(self, query: str):
+        docs = self._get(self._retrievals, normalize_query(query))
+        return list(docs) if docs is not None else None
+
+    def put_retrieval(self, query: str, docs):
+        self._put(self._retrievals, normalize_query(query), list(docs))
+
+    def get_grade(self, question: str, doc):
+        return self._get(self._grades, (normalize_query(question), doc_key(doc)))
+
+    def put_grade(self, question: str, doc, relevant: bool):
+        self._put(self._grades, (normalize_query(question), doc_key(doc)), bool(relevant))
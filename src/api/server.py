@@ -0,0 +1,385 @@
+"""
+Headless HTTP service over the compiled RAG graph.
+
+    python -m src.api.server --port 8000
+
+Endpoints:
+    POST /documents             multipart PDF upload; stores and indexes it, returns its id
+    POST /query                 {"document_id", "question", "session_id"?} -> answer, chunks, timings
+    POST /query/stream          same body; server-sent events: node, token, done, then grounding
+    GET  /health                queue, LLM batcher and Ollama pool statistics
+
+Graph runs are admitted through a bounded ``AdmissionQueue``: at most
+``SERVICE_WORKERS`` run at once, ``SERVICE_QUEUE_SIZE`` more may wait, and
+anything beyond that is rejected with 503 and ``Retry-After``. Every LLM call
+goes through one ``BatchingLLM``, so grading and generation calls of
+concurrent requests reach the model as batches.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, File, HTTPException, UploadFile
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+
+from src import config
+from src.graph.graph_builder import Graph_builder
+from src.graph.graph_runner import astream_answer
+from src.Nodes.conversation import ConversationMemory
+from src.Nodes.grounding import GroundingVerifier
+from src.Nodes.chat_with_pdf import init_components
+from src.tools.index_cache import file_digest
+from src.tools.llm_batcher import BatchingLLM
+from src.tools.ollama_pool import PooledOllamaLLM, get_pool
+from src.tools.PDF_tool import PDFTool, make_embeddings
+from src.tools.semantic_cache import SemanticAnswerCache
+from src.tools.upload_store import UploadStore
+from src.tracing import configure_logging, start_metrics_server
+
+log = logging.getLogger(__name__)
+
+
+class QueueFull(Exception):
+    """No graph slot is free and the wait queue is full (or the wait timed out)."""
+
+
+class AdmissionQueue:
+    """
+    Bounded admission for graph runs on one event loop.
+
+    ``workers`` requests run concurrently and up to ``max_waiting`` more
+    wait in FIFO order for at most ``timeout`` seconds; the rest fail fast
+    with ``QueueFull`` so clients can back off instead of piling up.
+    """
+
+    def __init__(self, workers: int = None, max_waiting: int = None, timeout: float = None):
+        self.workers = workers or config.SERVICE_WORKERS
+        self.max_waiting = config.SERVICE_QUEUE_SIZE if max_waiting is None else max_waiting
+        self.timeout = timeout or config.SERVICE_QUEUE_TIMEOUT_SECONDS
+        self._slots = asyncio.Semaphore(self.workers)
+        self.stats = {"running": 0, "waiting": 0, "admitted": 0, "rejected": 0, "timed_out": 0}
+
+    async def acquire(self):
+        if self._slots.locked() and self.stats["waiting"] >= self.max_waiting:
+            self.stats["rejected"] += 1
+            raise QueueFull("request queue is full")
+        self.stats["waiting"] += 1
+        try:
+            await asyncio.wait_for(self._slots.acquire(), self.timeout)
+        except asyncio.TimeoutError:
+            self.stats["timed_out"] += 1
+            raise QueueFull(f"no graph slot within {self.timeout:.0f}s") from None
+        finally:
+            self.stats["waiting"] -= 1
+        self.stats["admitted"] += 1
+        self.stats["running"] += 1
+
+    def release(self):
+        self.stats["running"] -= 1
+        self._slots.release()
+
+    @asynccontextmanager
+    async def slot(self):
+        await self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+
+class _AdmittedStream(StreamingResponse):
+    """
+    Event stream that holds an admission slot until it ends, however it ends.
+
+    The body releases the slot as soon as the graph finishes. If the client
+    disconnects or the send fails before the body starts, the body generator
+    never runs, so the slot is released here instead.
+    """
+
+    def __init__(self, content, admission: AdmissionQueue, **kwargs):
+        super().__init__(content, **kwargs)
+        self._admission = admission
+        self._held = True
+
+    def release(self):
+        if self._held:
+            self._held = False
+            self._admission.release()
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            self.release()
+
+
+class DocumentRegistry:
+    """
+    Indexed documents of this service, by id (the first 16 hex digits of the PDF's SHA-256).
+
+    Keeps the ``max_documents`` most recently used documents; queries for an
+    evicted one get 404 until it is uploaded again (its index is still on disk).
+    """
+
+    def __init__(self, components, embedding=None, max_documents: int = None):
+        self.components = components
+        self.embedding = embedding or make_embeddings()
+        self.max_documents = max_documents or config.SERVICE_MAX_DOCUMENTS
+        self._documents = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, pdf_path: str, name: str, digest: str = None) -> dict:
+        digest = digest or file_digest(pdf_path)
+        doc_id = digest[:16]
+        # A known document is returned before any index work.
+        with self._lock:
+            entry = self._documents.get(doc_id)
+            if entry is not None:
+                self._documents.move_to_end(doc_id)
+                return entry
+        tool = PDFTool(pdf_path, embedding=self.embedding, digest=digest)
+        graph = Graph_builder(retriever=tool.get_retriever(), components=self.components).build()
+        entry = {
+            "document_id": doc_id,
+            "name": name,
+            "chunks": tool.vectorstore.index.ntotal,
+            "index_key": tool.index_key,
+            "graph": graph,
+            "answer_cache": SemanticAnswerCache(tool.digest, tool.index_key, tool.embedding),
+        }
+        with self._lock:
+            self._documents[doc_id] = entry
+            while len(self._documents) > self.max_documents:
+                self._documents.popitem(last=False)
+        return entry
+
+    def __len__(self):
+        return len(self._documents)
+
+    def get(self, doc_id: str) -> dict:
+        with self._lock:
+            entry = self._documents.get(doc_id)
+            if entry is not None:
+                self._documents.move_to_end(doc_id)
+        if entry is None:
+            raise HTTPException(status_code=404, detail=f"unknown document_id {doc_id!r}")
+        return entry
+
+    def describe(self, entry: dict) -> dict:
+        return {k: entry[k] for k in ("document_id", "name", "chunks")}
+
+
+class QueryRequest(BaseModel):
+    document_id: str
+    question: str
+    # False skips the semantic answer cache (load tests, forced refresh).
+    use_cache: bool = True
+    # Groundedness check. /query/stream sends it as a trailing "grounding" event
+    # (default: config.GROUNDING_VERIFY); /query only includes it when true, since
+    # the response then waits for it.
+    verify: bool = None
+    # Requests sharing a session_id form one conversation: follow-ups reuse the
+    # previous turn's chunks and see the earlier turns.
+    session_id: str = None
+
+
+def _documents_payload(documents):
+    payload = []
+    for d in documents or []:
+        metadata = getattr(d, "metadata", None) or {}
+        payload.append({
+            "page": metadata.get("page"),
+            "score": metadata.get("score"),
+            "text": getattr(d, "page_content", str(d)),
+        })
+    return payload
+
+
+def _done_payload(state, metrics):
+    return {
+        "answer": state.get("generation"),
+        "question": state.get("original_question") or state.get("question"),
+        "documents": _documents_payload(state.get("documents")),
+        "metrics": {k: v for k, v in metrics.items() if k not in ("trace", "grounding")},
+        "trace_id": (metrics.get("trace") or {}).get("trace_id"),
+        "conversation": state.get("conversation"),
+    }
+
+
+def _busy(exc: QueueFull):
+    return HTTPException(status_code=503, detail=str(exc), headers={"Retry-After": "1"})
+
+
+def create_app(llm=None, embedding=None, batch_window_ms: float = None, admission: AdmissionQueue = None,
+               uploads: UploadStore = None):
+    """
+    Build the FastAPI app.
+
+    Args:
+        llm: model behind the batcher (default: pooled Ollama ``config.LLM_MODEL``);
+            benchmarks pass a local stand-in.
+        embedding: embeddings for indexing and the answer cache (default: pooled Ollama).
+        batch_window_ms: LLM coalescing window (default ``config.LLM_BATCH_WINDOW_MS``).
+        admission: request admission queue (default from ``config.SERVICE_*``).
+        uploads: where uploaded PDFs are stored (default ``UploadStore()`` in ``config.UPLOAD_DIR``).
+    """
+    inner = llm or PooledOllamaLLM(model=config.LLM_MODEL, temperature=0, keep_alive=config.KEEP_ALIVE_SECONDS)
+    batching_llm = BatchingLLM(inner=inner, window_ms=batch_window_ms)
+    components = init_components(llm=batching_llm)
+    registry = DocumentRegistry(components, embedding=embedding)
+    uploads = uploads or UploadStore()
+    _, _, hallucination_grader, answer_grader, _, _ = components
+    verifier = GroundingVerifier(registry.embedding, hallucination_grader, answer_grader)
+    sessions = OrderedDict()
+
+    def conversation_for(request: QueryRequest):
+        if not request.session_id:
+            return None
+        key = (request.document_id, request.session_id)
+        memory = sessions.get(key)
+        if memory is None:
+            memory = sessions[key] = ConversationMemory()
+        sessions.move_to_end(key)
+        while len(sessions) > config.SERVICE_MAX_SESSIONS:
+            sessions.popitem(last=False)
+        return memory
+
+    def finish_turn(memory, done) -> dict:
+        payload = _done_payload(done[1], done[2])
+        if memory is not None:
+            memory.record(done[1])
+            payload["session"] = dict(memory.stats)
+        return payload
+    state = {"admission": admission}
+
+    @asynccontextmanager
+    async def lifespan(app):
+        # The semaphore must be created on the serving event loop.
+        if state["admission"] is None:
+            state["admission"] = AdmissionQueue()
+        yield
+
+    app = FastAPI(title="PrivatePDF-RAG", lifespan=lifespan)
+    app.state.registry = registry
+    app.state.batcher = batching_llm.batcher
+    app.state.uploads = uploads
+
+    @app.post("/documents")
+    async def upload(file: UploadFile = File(...)):
+        name = os.path.basename(file.filename or "upload.pdf")
+        if not name.lower().endswith(".pdf"):
+            raise HTTPException(status_code=400, detail="expected a .pdf file")
+        # Hashed while it is copied; bytes already stored are not written again.
+        stored = await asyncio.to_thread(uploads.put_stream, file.file, name)
+        try:
+            entry = await asyncio.to_thread(registry.add, stored["path"], name, stored["digest"])
+        except Exception as exc:
+            log.exception("indexing %s failed", name)
+            raise HTTPException(status_code=422, detail=f"could not index {name}: {exc}") from exc
+        return registry.describe(entry)
+
+    @app.post("/query")
+    async def query(request: QueryRequest):
+        entry = registry.get(request.document_id)
+        cache = entry["answer_cache"] if request.use_cache else None
+        memory = conversation_for(request)
+        inputs = memory.inputs(request.question) if memory is not None else {"question": request.question}
+        done = None
+        try:
+            async with state["admission"].slot():
+                async for event in astream_answer(entry["graph"], inputs, cache,
+                                                  verifier=verifier if request.verify else None):
+                    if event[0] == "done":
+                        done = event
+        except QueueFull as exc:
+            raise _busy(exc) from exc
+        if done is not None:
+            payload = finish_turn(memory, done)
+            # Verified outside the admission slot, so waiting for it does not hold up other requests.
+            payload["grounding"] = await _grounding(done[2])
+            return payload
+        raise HTTPException(status_code=500, detail="graph finished without a result")
+
+    @app.post("/query/stream")
+    async def query_stream(request: QueryRequest):
+        entry = registry.get(request.document_id)
+        cache = entry["answer_cache"] if request.use_cache else None
+        verify = config.GROUNDING_VERIFY if request.verify is None else request.verify
+        memory = conversation_for(request)
+        inputs = memory.inputs(request.question) if memory is not None else {"question": request.question}
+        admission = state["admission"]
+        # Admit before the response starts, so a full queue is still a plain 503.
+        try:
+            await admission.acquire()
+        except QueueFull as exc:
+            raise _busy(exc) from exc
+
+        async def events():
+            done = None
+            try:
+                async for event in astream_answer(entry["graph"], inputs, cache,
+                                                  verifier=verifier if verify else None):
+                    if event[0] == "node":
+                        yield _sse("node", {"node": event[1]})
+                    elif event[0] == "token":
+                        yield _sse("token", {"text": event[1]})
+                    else:
+                        done = event
+                        yield _sse("done", finish_turn(memory, event))
+            finally:
+                response.release()
+            if done is not None and done[2].get("grounding") is not None:
+                yield _sse("grounding", await _grounding(done[2]))
+
+        response = _AdmittedStream(events(), admission, media_type="text/event-stream")
+        return response
+
+    @app.get("/health")
+    async def health():
+        return {
+            "status": "ok",
+            "documents": len(registry),
+            "sessions": len(sessions),
+            "queue": dict(state["admission"].stats) if state["admission"] else None,
+            "llm_batcher": dict(batching_llm.batcher.stats),
+            "ollama_pool": dict(get_pool().stats),
+        }
+
+    return app
+
+
+async def _grounding(metrics: dict):
+    future = metrics.get("grounding")
+    if future is None:
+        return None
+    try:
+        return await asyncio.wrap_future(future)
+    except Exception as exc:
+        log.warning("grounding check failed: %r", exc)
+        return {"error": str(exc)}
+
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Headless PDF RAG service")
+    parser.add_argument("--host", default=config.SERVICE_HOST)
+    parser.add_argument("--port", type=int, default=config.SERVICE_PORT)
+    args = parser.parse_args()
+    configure_logging()
+    start_metrics_server()
+    uvicorn.run(create_app(), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
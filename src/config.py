@@ -0,0 +1,204 @@
+"""Runtime settings for the PDF RAG pipeline.
+
+Every value can be overridden with an environment variable of the same name
+(e.g. ``RAG_CHUNK_SIZE=800``) so deployments can tune the pipeline without
+code changes.
+"""
+import os
+
+
+def _env_str(name: str, default: str) -> str:
+    return os.getenv(name, default)
+
+
+def _env_int(name: str, default: int) -> int:
+    value = os.getenv(name)
+    if value is None or not value.strip():
+        return default
+    try:
+        return int(value)
+    except ValueError as exc:
+        raise ValueError(f"{name} must be an integer, got {value!r}") from exc
+
+
+def _env_float(name: str, default: float) -> float:
+    value = os.getenv(name)
+    if value is None or not value.strip():
+        return default
+    try:
+        return float(value)
+    except ValueError as exc:
+        raise ValueError(f"{name} must be a number, got {value!r}") from exc
+
+
+# Models served by the local Ollama daemon
+LLM_MODEL = _env_str("RAG_LLM_MODEL", "llama3.2:1b")
+EMBED_MODEL = _env_str("RAG_EMBED_MODEL", "mxbai-embed-large")
+# How long Ollama keeps the models loaded after the last request
+KEEP_ALIVE_SECONDS = _env_int("RAG_KEEP_ALIVE_SECONDS", 1800)
+# Shared Ollama client: server URL ("" uses OLLAMA_HOST or the default), the
+# process-wide cap on requests in flight, and the HTTP connection pool size
+OLLAMA_HOST = _env_str("RAG_OLLAMA_HOST", "")
+OLLAMA_MAX_CONCURRENCY = _env_int("RAG_OLLAMA_MAX_CONCURRENCY", 4)
+OLLAMA_MAX_CONNECTIONS = _env_int("RAG_OLLAMA_MAX_CONNECTIONS", 16)
+OLLAMA_TIMEOUT_SECONDS = _env_float("RAG_OLLAMA_TIMEOUT_SECONDS", 300.0)
+
+# Chunking and retrieval
+CHUNK_SIZE = _env_int("RAG_CHUNK_SIZE", 500)
+CHUNK_OVERLAP = _env_int("RAG_CHUNK_OVERLAP", 100)
+CHUNK_SEPARATORS = ["\n\n", "\n", " ", ""]
+# Parent/child index: the chunks above are embedded and searched, and each maps
+# to its parent section (the page, or a paragraph-aligned block of at most
+# PARENT_CHUNK_SIZE characters of a long page); retrieval returns up to
+# PARENT_K de-duplicated parents as generation context
+PARENT_CHILD = _env_str("RAG_PARENT_CHILD", "1").lower() not in ("0", "false", "no")
+PARENT_CHUNK_SIZE = _env_int("RAG_PARENT_CHUNK_SIZE", 1500)
+PARENT_K = _env_int("RAG_PARENT_K", 4)
+RETRIEVER_K = _env_int("RAG_RETRIEVER_K", 6)
+# Generation context: merged chunks packed into this many prompt tokens
+# (estimated at CONTEXT_CHARS_PER_TOKEN characters per token)
+CONTEXT_TOKEN_BUDGET = _env_int("RAG_CONTEXT_TOKEN_BUDGET", 1500)
+CONTEXT_CHARS_PER_TOKEN = _env_int("RAG_CONTEXT_CHARS_PER_TOKEN", 4)
+# Hybrid retrieval: BM25 + dense search merged with reciprocal rank fusion
+HYBRID_SEARCH = _env_str("RAG_HYBRID_SEARCH", "1").lower() not in ("0", "false", "no")
+HYBRID_FETCH_K = _env_int("RAG_HYBRID_FETCH_K", 20)
+HYBRID_RRF_K = _env_int("RAG_HYBRID_RRF_K", 60)
+
+# On-disk FAISS index cache (content-addressed, LRU-evicted)
+INDEX_CACHE_DIR = _env_str("RAG_INDEX_CACHE_DIR", os.path.join(".rag_cache", "indexes"))
+INDEX_CACHE_MAX_BYTES = _env_int("RAG_INDEX_CACHE_MAX_MB", 2048) * 1024 * 1024
+
+# Vector index layout: "flat", "ivf", "ivf_pq", "sq8", "fp16", or "auto" (flat
+# until INDEX_AUTO_THRESHOLD chunks, INDEX_AUTO_MODE above). Saved indexes are
+# memory-mapped read-only on load so worker processes share the page cache.
+INDEX_MODE = _env_str("RAG_INDEX_MODE", "auto")
+INDEX_AUTO_THRESHOLD = _env_int("RAG_INDEX_AUTO_THRESHOLD", 20000)
+INDEX_AUTO_MODE = _env_str("RAG_INDEX_AUTO_MODE", "sq8")
+IVF_NLIST = _env_int("RAG_IVF_NLIST", 0)  # 0: about 4*sqrt(chunks)
+IVF_NPROBE = _env_int("RAG_IVF_NPROBE", 16)
+PQ_M = _env_int("RAG_PQ_M", 0)  # 0: dimension / 16 sub-quantizers
+INDEX_MMAP = _env_str("RAG_INDEX_MMAP", "1").lower() not in ("0", "false", "no")
+INDEX_RECALL_SAMPLE = _env_int("RAG_INDEX_RECALL_SAMPLE", 200)
+
+# Page extraction: page ranges spread over a process pool; running headers and
+# footers are learned from the first HEADER_SAMPLE_PAGES pages
+EXTRACT_WORKERS = _env_int("RAG_EXTRACT_WORKERS", min(4, os.cpu_count() or 1))
+EXTRACT_PAGES_PER_TASK = _env_int("RAG_EXTRACT_PAGES_PER_TASK", 32)
+EXTRACT_PARALLEL_MIN_PAGES = _env_int("RAG_EXTRACT_PARALLEL_MIN_PAGES", 64)
+HEADER_SAMPLE_PAGES = _env_int("RAG_HEADER_SAMPLE_PAGES", 20)
+HEADER_EDGE_LINES = _env_int("RAG_HEADER_EDGE_LINES", 2)
+HEADER_MIN_RATIO = _env_float("RAG_HEADER_MIN_RATIO", 0.6)
+
+# Streaming ingestion: chunks embedded and added to the index per step
+INGEST_BATCH_CHUNKS = _env_int("RAG_INGEST_BATCH_CHUNKS", 256)
+
+# Chunk-level embedding cache and batched embedding requests
+EMBED_CACHE_PATH = _env_str("RAG_EMBED_CACHE_PATH", os.path.join(".rag_cache", "embeddings.sqlite3"))
+EMBED_BATCH_SIZE = _env_int("RAG_EMBED_BATCH_SIZE", 32)
+EMBED_WORKERS = _env_int("RAG_EMBED_WORKERS", 4)
+
+# Relevance grading: "sequential", "concurrent" (capped fan-out) or "single_prompt"
+GRADING_MODE = _env_str("RAG_GRADING_MODE", "concurrent")
+GRADING_CONCURRENCY = _env_int("RAG_GRADING_CONCURRENCY", 3)
+
+# Similarity pre-filter for grading: chunks scoring at or above ACCEPT are kept
+# and chunks below REJECT are dropped without an LLM call (cosine similarity).
+GRADE_ACCEPT_SCORE = _env_float("RAG_GRADE_ACCEPT_SCORE", 0.85)
+GRADE_REJECT_SCORE = _env_float("RAG_GRADE_REJECT_SCORE", 0.30)
+
+# Compiled graphs kept in the process-wide graph cache, and PDF tools (vector
+# store, BM25 and parent index of one PDF) kept in the PDF tool cache
+GRAPH_CACHE_SIZE = _env_int("RAG_GRAPH_CACHE_SIZE", 8)
+PDF_TOOL_CACHE_SIZE = _env_int("RAG_PDF_TOOL_CACHE_SIZE", GRAPH_CACHE_SIZE)
+
+# Query-rewrite loop: rewrites allowed before answering "not found", and the
+# size of the per-graph retrieval/grade memo
+MAX_REWRITES = _env_int("RAG_MAX_REWRITES", 2)
+RETRIEVAL_MEMO_SIZE = _env_int("RAG_RETRIEVAL_MEMO_SIZE", 1024)
+NOT_FOUND_ANSWER = _env_str(
+    "RAG_NOT_FOUND_ANSWER",
+    "I could not find information about this in the document.",
+)
+
+# Semantic answer cache: questions whose embedding is at least THRESHOLD
+# cosine-similar to an answered one reuse its answer
+ANSWER_CACHE_DIR = _env_str("RAG_ANSWER_CACHE_DIR", os.path.join(".rag_cache", "answers"))
+ANSWER_CACHE_THRESHOLD = _env_float("RAG_ANSWER_CACHE_THRESHOLD", 0.95)
+ANSWER_CACHE_TTL_SECONDS = _env_int("RAG_ANSWER_CACHE_TTL_SECONDS", 7 * 24 * 3600)
+ANSWER_CACHE_MAX_ENTRIES = _env_int("RAG_ANSWER_CACHE_MAX_ENTRIES", 500)
+
+# Multi-turn conversations: turns remembered per session, and the token budget
+# of the condensed history added to a follow-up's generation prompt
+CONVERSATION_MAX_TURNS = _env_int("RAG_CONVERSATION_MAX_TURNS", 6)
+CONVERSATION_HISTORY_TOKENS = _env_int("RAG_CONVERSATION_HISTORY_TOKENS", 400)
+
+# Groundedness check, run in the background after the answer is shown: answer
+# sentences at least SUPPORT_SCORE cosine-similar to a retrieved chunk count
+# as supported, only the rest go to the hallucination grader; the answer
+# grader runs only when the answer is less than ANSWER_SCORE similar to the question
+GROUNDING_VERIFY = _env_str("RAG_GROUNDING_VERIFY", "1").lower() not in ("0", "false", "no")
+GROUNDING_SUPPORT_SCORE = _env_float("RAG_GROUNDING_SUPPORT_SCORE", 0.75)
+GROUNDING_ANSWER_SCORE = _env_float("RAG_GROUNDING_ANSWER_SCORE", 0.50)
+
+# Uploaded PDFs (UI and service), stored once each as <sha256>.pdf plus a
+# manifest.json of the names they were uploaded under
+UPLOAD_DIR = _env_str("RAG_UPLOAD_DIR", "uploaded_pdfs")
+
+# Library mode: one index shard per PDF, fanned out per query
+LIBRARY_DIR = _env_str("RAG_LIBRARY_DIR", os.path.join(".rag_cache", "library"))
+LIBRARY_MEMORY_BUDGET_BYTES = _env_int("RAG_LIBRARY_MEMORY_BUDGET_MB", 1024) * 1024 * 1024
+LIBRARY_WORKERS = _env_int("RAG_LIBRARY_WORKERS", 8)
+
+# Observability: finished request traces as JSON lines ("" disables), rotated
+# to traces.jsonl.1 .. .N once the file would exceed TRACE_LOG_MAX_MB (0 never
+# rotates), the Prometheus /metrics endpoint (port 0 disables) and log output
+TRACE_LOG_PATH = _env_str("RAG_TRACE_LOG_PATH", os.path.join(".rag_cache", "traces.jsonl"))
+TRACE_LOG_MAX_BYTES = _env_int("RAG_TRACE_LOG_MAX_MB", 64) * 1024 * 1024
+TRACE_LOG_BACKUPS = _env_int("RAG_TRACE_LOG_BACKUPS", 3)
+METRICS_HOST = _env_str("RAG_METRICS_HOST", "127.0.0.1")
+METRICS_PORT = _env_int("RAG_METRICS_PORT", 9464)
+LOG_LEVEL = _env_str("RAG_LOG_LEVEL", "INFO")
+LOG_FORMAT = _env_str("RAG_LOG_FORMAT", "text")  # "text" or "json"
+
+# Voice models, loaded on first use: the Vosk model directory and the
+# pyttsx3 speaking rate (words per minute) and volume
+VOSK_MODEL_PATH = _env_str("RAG_VOSK_MODEL_PATH", os.path.join("models", "vosk-model-small-en-us-0.15"))
+TTS_RATE = _env_int("RAG_TTS_RATE", 150)
+TTS_VOLUME = _env_float("RAG_TTS_VOLUME", 1.0)
+# Spoken answers: sentences shorter than TTS_MIN_SENTENCE_CHARS are merged with
+# the next one; synthesized sentences are cached by content hash on disk
+TTS_MIN_SENTENCE_CHARS = _env_int("RAG_TTS_MIN_SENTENCE_CHARS", 20)
+TTS_CACHE_DIR = _env_str("RAG_TTS_CACHE_DIR", os.path.join(".rag_cache", "tts"))
+TTS_CACHE_MAX_BYTES = _env_int("RAG_TTS_CACHE_MAX_MB", 256) * 1024 * 1024
+
+# Speech input: recognizer sample rate and audio block size. Voice-activity
+# endpointing opens an utterance after VAD_START_MS of speech and closes it
+# after VAD_END_SILENCE_MS of silence; a block is speech when its RMS is above
+# max(VAD_MIN_RMS, noise floor * VAD_NOISE_RATIO)
+STT_SAMPLE_RATE = _env_int("RAG_STT_SAMPLE_RATE", 16000)
+STT_BLOCK_MS = _env_int("RAG_STT_BLOCK_MS", 100)
+STT_MAX_SECONDS = _env_float("RAG_STT_MAX_SECONDS", 30.0)
+STT_NO_SPEECH_SECONDS = _env_float("RAG_STT_NO_SPEECH_SECONDS", 8.0)
+VAD_START_MS = _env_int("RAG_VAD_START_MS", 200)
+VAD_END_SILENCE_MS = _env_int("RAG_VAD_END_SILENCE_MS", 800)
+VAD_PREROLL_MS = _env_int("RAG_VAD_PREROLL_MS", 300)
+VAD_MIN_RMS = _env_float("RAG_VAD_MIN_RMS", 300.0)
+VAD_NOISE_RATIO = _env_float("RAG_VAD_NOISE_RATIO", 3.0)
+
+# Headless HTTP service (python -m src.api.server): graph runs in flight, how
+# many more requests may wait for a slot (beyond that: 503) and for how long
+SERVICE_HOST = _env_str("RAG_SERVICE_HOST", "127.0.0.1")
+SERVICE_PORT = _env_int("RAG_SERVICE_PORT", 8000)
+SERVICE_WORKERS = _env_int("RAG_SERVICE_WORKERS", 8)
+SERVICE_QUEUE_SIZE = _env_int("RAG_SERVICE_QUEUE_SIZE", 32)
+SERVICE_QUEUE_TIMEOUT_SECONDS = _env_float("RAG_SERVICE_QUEUE_TIMEOUT_SECONDS", 30.0)
+# Conversations kept for requests carrying a session_id, and indexed documents
+# (with their graph and answer cache) kept by the service; least recently used dropped first
+SERVICE_MAX_SESSIONS = _env_int("RAG_SERVICE_MAX_SESSIONS", 1000)
+SERVICE_MAX_DOCUMENTS = _env_int("RAG_SERVICE_MAX_DOCUMENTS", 64)
+# LLM micro-batching in the service: calls arriving within the window are
+# dispatched together (identical prompts once), at most MAX_SIZE distinct calls
+# per batch and MAX_IN_FLIGHT calls running across batches
+LLM_BATCH_WINDOW_MS = _env_float("RAG_LLM_BATCH_WINDOW_MS", 10.0)
+LLM_BATCH_MAX_SIZE = _env_int("RAG_LLM_BATCH_MAX_SIZE", OLLAMA_MAX_CONCURRENCY)
+LLM_MAX_IN_FLIGHT = _env_int("RAG_LLM_MAX_IN_FLIGHT", OLLAMA_MAX_CONCURRENCY)
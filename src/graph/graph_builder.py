@@ -1,21 +1,39 @@
 from src.state.graph_State import GraphState
 from langgraph.graph import StateGraph, START, END
-from src.tools.PDF_tool import build_pdf_retriver
+from src.tools.PDF_tool import build_pdf_tool
 from src.Nodes.chat_with_pdf import init_components
+from src.Nodes.retrieval_memo import RetrievalMemo
+from src.Nodes.conversation import afollow_up, follow_up, route_question
+from src.tracing import traced_node
 from src.Nodes.chat_with_pdf import (
     retrieve,
+    aretrieve,
     grade_docs,
+    agrade_docs,
     transform_query,
+    atransform_query,
     generate,
+    agenerate,
+    not_found,
     decide_to_generate,
     grade_generation_v_documents_and_question,
 )
 class Graph_builder:
-    def __init__(self,pdf_path):
+    def __init__(self,pdf_path=None, components=None, retriever=None, digest=None):
         self.pdf_path = pdf_path
+        # SHA-256 of pdf_path when known, so the PDF tool cache skips hashing it.
+        self.digest = digest
+        # Prebuilt init_components() tuple, shared across graphs by graph_cache.
+        self.components = components
+        # Prebuilt retriever (e.g. a DocumentLibrary's) used instead of pdf_path.
+        self.retriever = retriever
     def build(self):
         try:
-            retriver = build_pdf_retriver(self.pdf_path)
+            if self.retriever is not None:
+                retriver = self.retriever
+            else:
+                self.pdf_tool = build_pdf_tool(self.pdf_path, digest=self.digest)
+                retriver = self.pdf_tool.get_retriever()
         except Exception as exc:
             raise RuntimeError(f"build_pdf_retriver failed: {exc}") from exc
 
@@ -28,22 +46,56 @@ class Graph_builder:
                 hallucination_grader,
                 answer_grader,
                 question_rewriter,
-            ) = init_components()
+                batch_grader,
+            ) = self.components or init_components()
         except Exception as exc:
             raise RuntimeError(f"init_components failed: {exc!r}") from exc
 
-        self.graph.add_node("retrive", lambda s: retrieve(s, retriver))
-        self.graph.add_node("grade_docs", lambda s: grade_docs(s, retrieval_grader))
-        self.graph.add_node("transform_query", lambda s: transform_query(s, question_rewriter))
-        self.graph.add_node("generate", lambda s: generate(s, rag_chain))
+        # Shared by every run of this graph: repeated queries and rewrites
+        # landing on already graded chunks skip the retriever and the grader.
+        memo = RetrievalMemo()
 
-        self.graph.add_edge(START, "retrive")
+        # Every node runs inside a tracing span (wall time plus a summary of its update)
+        # and has a sync and an async variant: the graph serves both stream() and astream().
+        self.graph.add_node("retrive", traced_node(
+            "retrive",
+            lambda s: retrieve(s, retriver, memo),
+            lambda s: aretrieve(s, retriver, memo)))
+        self.graph.add_node("grade_docs", traced_node(
+            "grade_docs",
+            lambda s: grade_docs(s, retrieval_grader, batch_grader, memo=memo),
+            lambda s: agrade_docs(s, retrieval_grader, batch_grader, memo=memo)))
+        self.graph.add_node("transform_query", traced_node(
+            "transform_query",
+            lambda s: transform_query(s, question_rewriter),
+            lambda s: atransform_query(s, question_rewriter)))
+        self.graph.add_node("generate", traced_node(
+            "generate",
+            lambda s: generate(s, rag_chain),
+            lambda s: agenerate(s, rag_chain)))
+        self.graph.add_node("not_found", traced_node("not_found", not_found))
+        self.graph.add_node("follow_up", traced_node(
+            "follow_up",
+            lambda s: follow_up(s, retriver, retrieval_grader, batch_grader, memo),
+            lambda s: afollow_up(s, retriver, retrieval_grader, batch_grader, memo)))
+
+        # Follow-ups answer from the previous turn's graded chunks instead of a fresh retrieval.
+        self.graph.add_conditional_edges(
+            START,
+            route_question,
+            {
+                "follow_up": "follow_up",
+                "retrive": "retrive",
+            },
+        )
+        self.graph.add_edge("follow_up", "generate")
         self.graph.add_edge("retrive", "grade_docs")
         self.graph.add_conditional_edges(
             "grade_docs",
              decide_to_generate,{
                  "transform_query":"transform_query",
                  "generate":"generate",
+                 "not_found":"not_found",
              },
         )
         self.graph.add_edge("transform_query", "retrive")
@@ -59,6 +111,7 @@ class Graph_builder:
         # )
 
         self.graph.add_edge("generate", END)
+        self.graph.add_edge("not_found", END)
 
 
         try:
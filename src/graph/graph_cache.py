@@ -0,0 +1,222 @@
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from src import config
+from src.graph.graph_builder import Graph_builder
+from src.Nodes.chat_with_pdf import init_components
+from src.tools.library import DocumentLibrary
+from src.tools.PDF_tool import build_pdf_tool
+from src.tools.semantic_cache import SemanticAnswerCache
+
+log = logging.getLogger(__name__)
+
+# Process-wide caches shared by every Streamlit session and worker thread.
+_lock = threading.Lock()
+_key_locks = {}
+_components = {}
+_graphs = OrderedDict()
+_answer_caches = OrderedDict()
+_verifiers = {}
+_libraries = {}
+_warmed = {}
+
+
+def _settings_key() -> tuple:
+    """Settings that change what init_components or Graph_builder produce."""
+    return (
+        config.LLM_MODEL,
+        config.EMBED_MODEL,
+        config.KEEP_ALIVE_SECONDS,
+        config.CHUNK_SIZE,
+        config.CHUNK_OVERLAP,
+        config.RETRIEVER_K,
+    )
+
+
+def _pdf_key(pdf_path: str, digest: str = None) -> tuple:
+    # Content digest when known: identical uploads share a graph wherever they are stored.
+    if digest:
+        return ("sha256", digest)
+    # Path plus size and mtime: a re-upload under the same name gets a new graph.
+    st = os.stat(pdf_path)
+    return (os.path.abspath(pdf_path), st.st_size, st.st_mtime_ns)
+
+
+def _lock_for(key) -> threading.Lock:
+    with _lock:
+        return _key_locks.setdefault(key, threading.Lock())
+
+
+def get_components():
+    """LLM chains from ``init_components``, built once per process and settings."""
+    key = ("components",) + _settings_key()
+    with _lock_for(key):
+        if key not in _components:
+            _components[key] = init_components()
+        return _components[key]
+
+
+def _cached_graph(key, factory):
+    with _lock:
+        graph = _graphs.get(key)
+        if graph is not None:
+            _graphs.move_to_end(key)
+            return graph
+    with _lock_for(key):
+        with _lock:
+            graph = _graphs.get(key)
+        if graph is None:
+            graph = factory()
+        with _lock:
+            _graphs[key] = graph
+            _graphs.move_to_end(key)
+            while len(_graphs) > config.GRAPH_CACHE_SIZE:
+                old_key, _ = _graphs.popitem(last=False)
+                _evict(old_key)
+        return graph
+
+
+def _evict(key):
+    """Drop everything cached for a graph key (caller holds ``_lock``)."""
+    _key_locks.pop(key, None)
+    _answer_caches.pop(key, None)
+    _key_locks.pop(("answers",) + key, None)
+
+
+def get_graph(pdf_path: str, digest: str = None):
+    """
+    Compiled RAG graph for ``pdf_path``, built at most once per PDF and settings.
+
+    Pass the PDF's SHA-256 as ``digest`` when it is known (``UploadStore``) to
+    key the graph on content instead of stat'ing and hashing the file.
+
+    Concurrent callers asking for the same graph wait for a single build
+    instead of each compiling their own. The cache keeps the
+    ``config.GRAPH_CACHE_SIZE`` most recently used graphs.
+    """
+    key = _pdf_key(pdf_path, digest) + _settings_key()
+    return _cached_graph(
+        key, lambda: Graph_builder(pdf_path=pdf_path, components=get_components(), digest=digest).build()
+    )
+
+
+def get_library(root: str = None) -> DocumentLibrary:
+    """Process-wide ``DocumentLibrary`` for ``root`` (default ``config.LIBRARY_DIR``)."""
+    root = os.path.abspath(root or config.LIBRARY_DIR)
+    with _lock_for(("library", root)):
+        if root not in _libraries:
+            _libraries[root] = DocumentLibrary(root)
+        return _libraries[root]
+
+
+def get_library_graph(library: DocumentLibrary):
+    """Compiled graph over every document in ``library``; rebuilt when documents are added or removed."""
+    key = ("library", os.path.abspath(library.root), library.revision) + _settings_key()
+    return _cached_graph(
+        key, lambda: Graph_builder(retriever=library.as_retriever(), components=get_components()).build()
+    )
+
+
+def get_answer_cache(pdf_path: str, digest: str = None) -> SemanticAnswerCache:
+    """
+    Semantic answer cache for the PDF's current index, shared across sessions.
+
+    Keyed like ``get_graph`` and evicted with the graph, so at most
+    ``config.GRAPH_CACHE_SIZE`` caches are held.
+    """
+    key = _pdf_key(pdf_path, digest) + _settings_key()
+    with _lock:
+        cache = _answer_caches.get(key)
+        if cache is not None:
+            _answer_caches.move_to_end(key)
+            return cache
+    with _lock_for(("answers",) + key):
+        with _lock:
+            cache = _answer_caches.get(key)
+        if cache is None:
+            tool = build_pdf_tool(pdf_path, digest=digest)
+            cache = SemanticAnswerCache(tool.digest, tool.index_key, tool.embedding)
+        with _lock:
+            _answer_caches[key] = cache
+            _answer_caches.move_to_end(key)
+            # Caches whose graph was never built (or is already gone) are bounded too.
+            while len(_answer_caches) > config.GRAPH_CACHE_SIZE:
+                old_key, _ = _answer_caches.popitem(last=False)
+                _key_locks.pop(("answers",) + old_key, None)
+        return cache
+
+
+def get_verifier():
+    """
+    Process-wide ``GroundingVerifier`` over the shared graders and embedding
+    client, or None when ``config.GROUNDING_VERIFY`` is off.
+    """
+    if not config.GROUNDING_VERIFY:
+        return None
+    from src.Nodes.grounding import GroundingVerifier
+    from src.tools.PDF_tool import make_embeddings
+
+    key = ("verifier",) + _settings_key()
+    with _lock_for(key):
+        verifier = _verifiers.get(key)
+        if verifier is None:
+            _, _, hallucination_grader, answer_grader, _, _ = get_components()
+            verifier = GroundingVerifier(make_embeddings(), hallucination_grader, answer_grader)
+            with _lock:
+                # One verifier per process: one for older settings is never asked for again.
+                for old_key in [k for k in _verifiers if k != key]:
+                    _verifiers.pop(old_key).close()
+                    _key_locks.pop(old_key, None)
+                _verifiers[key] = verifier
+        return verifier
+
+
+def _warm_up_models():
+    from src.tools.ollama_pool import PooledOllamaEmbeddings, PooledOllamaLLM
+
+    start = time.perf_counter()
+    # A one-token completion makes Ollama load the model and keep it resident.
+    PooledOllamaLLM(
+        model=config.LLM_MODEL, keep_alive=config.KEEP_ALIVE_SECONDS, num_predict=1
+    ).invoke("ping")
+    PooledOllamaEmbeddings(
+        model=config.EMBED_MODEL, keep_alive=config.KEEP_ALIVE_SECONDS
+    ).embed_query("ping")
+    log.info("warm-up: models loaded in %.2fs", time.perf_counter() - start)
+
+
+def warm_up(background: bool = True):
+    """
+    Ask Ollama to load the LLM and embedding model with keep-alive.
+
+    Skipped when a warm-up ran within the last half of the keep-alive window,
+    so calling this on every upload or rerun is cheap.
+
+    Returns:
+        The warm-up thread when ``background`` is true and a warm-up started, else None.
+    """
+    key = _settings_key()
+    now = time.monotonic()
+    with _lock:
+        last = _warmed.get(key)
+        if last is not None and now - last < config.KEEP_ALIVE_SECONDS / 2:
+            return None
+        _warmed[key] = now
+
+    def run():
+        try:
+            _warm_up_models()
+        except Exception as exc:
+            log.warning("warm-up failed: %r", exc)
+            with _lock:
+                _warmed.pop(key, None)
+
+    if not background:
+        run()
+        return None
+    thread = threading.Thread(target=run, name="ollama-warm-up", daemon=True)
+    thread.start()
+    return thread
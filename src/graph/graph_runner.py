@@ -0,0 +1,204 @@
+import asyncio
+import logging
+import time
+
+from src import config
+from src.tracing import count, span, trace_request
+
+log = logging.getLogger(__name__)
+
+# Human-readable progress labels for each graph node.
+NODE_LABELS = {
+    "retrive": "Retrieving relevant chunks",
+    "grade_docs": "Grading chunk relevance",
+    "transform_query": "Rewriting the question",
+    "generate": "Generating the answer",
+    "not_found": "No relevant passages found",
+    "semantic_cache": "Answered from the semantic cache",
+    "follow_up": "Reusing the previous answer's chunks",
+}
+
+
+class _Progress:
+    """Turns raw ``stream_mode=["updates", "custom"]`` chunks into runner events."""
+
+    def __init__(self, inputs: dict):
+        self.start = time.perf_counter()
+        self.first_token = None
+        self.state = dict(inputs)
+        self.nodes = []
+
+    def events(self, mode, chunk):
+        if mode == "custom":
+            token = chunk.get("token") if isinstance(chunk, dict) else None
+            if token:
+                if self.first_token is None:
+                    self.first_token = time.perf_counter() - self.start
+                yield ("token", token)
+        elif mode == "updates":
+            for name, update in chunk.items():
+                if isinstance(update, dict):
+                    self.state.update(update)
+                self.nodes.append({"node": name, "at_seconds": round(time.perf_counter() - self.start, 4)})
+                yield ("node", name, update)
+
+    def done(self):
+        metrics = {
+            "ttft_seconds": round(self.first_token, 4) if self.first_token is not None else None,
+            "total_seconds": round(time.perf_counter() - self.start, 4),
+            "nodes": self.nodes,
+        }
+        return ("done", self.state, metrics)
+
+
+def stream_graph(graph, inputs: dict):
+    """
+    Run a compiled graph and yield progress as it happens.
+
+    Yields tuples of:
+        ("node", name, update): a node finished; ``update`` is its state delta
+        ("token", text): a token streamed by the generate node
+        ("done", state, metrics): final merged state, with time-to-first-token
+            and total wall time in ``metrics``
+    """
+    progress = _Progress(inputs)
+    for mode, chunk in graph.stream(inputs, stream_mode=["updates", "custom"]):
+        yield from progress.events(mode, chunk)
+    yield progress.done()
+
+
+async def astream_graph(graph, inputs: dict):
+    """Async ``stream_graph``: runs the graph's async nodes on the caller's event loop."""
+    progress = _Progress(inputs)
+    async for mode, chunk in graph.astream(inputs, stream_mode=["updates", "custom"]):
+        for event in progress.events(mode, chunk):
+            yield event
+    yield progress.done()
+
+
+def stream_answer(graph, inputs: dict, answer_cache=None, verifier=None):
+    """
+    ``stream_graph`` fronted by a semantic answer cache, traced as one request.
+
+    On a cache hit the stored answer is yielded as a single token and the
+    graph never runs; ``metrics["cache_hit"]`` tells the two paths apart.
+    Fresh answers backed by documents are added to the cache. The finished
+    trace (spans for every node, LLM and embedding call) is returned in
+    ``metrics["trace"]``.
+
+    With a ``GroundingVerifier``, fresh answers are checked in the background:
+    ``metrics["grounding"]`` is a Future of the report (None when skipped),
+    so the "done" event is not held back by the check.
+    """
+    done = None
+    with trace_request("query", cache_enabled=answer_cache is not None) as trace:
+        for event in _answer_events(graph, inputs, answer_cache):
+            if event[0] == "done":
+                # Held back until the trace is closed, so it carries the full timing.
+                done = event
+                continue
+            yield event
+        if done is not None:
+            _close_trace(trace, done)
+    if done is not None:
+        done[2]["trace"] = trace.to_dict()
+        _submit_grounding(verifier, done)
+        yield done
+
+
+async def astream_answer(graph, inputs: dict, answer_cache=None, verifier=None):
+    """Async ``stream_answer``, for callers that already run an event loop."""
+    done = None
+    with trace_request("query", cache_enabled=answer_cache is not None) as trace:
+        async for event in _aanswer_events(graph, inputs, answer_cache):
+            if event[0] == "done":
+                done = event
+                continue
+            yield event
+        if done is not None:
+            _close_trace(trace, done)
+    if done is not None:
+        done[2]["trace"] = trace.to_dict()
+        _submit_grounding(verifier, done)
+        yield done
+
+
+def _submit_grounding(verifier, done):
+    state, metrics = done[1], done[2]
+    if verifier is None or metrics.get("cache_hit"):
+        metrics["grounding"] = None
+        return
+    question = state.get("original_question") or state.get("question")
+    metrics["grounding"] = verifier.submit(question, state.get("generation"), state.get("documents"))
+
+
+def _close_trace(trace, done):
+    trace.attrs["cache_hit"] = done[2].get("cache_hit")
+    trace.attrs["rewrites"] = (done[1].get("loop_stats") or {}).get("rewrites", 0)
+
+
+def _cache_lookup(answer_cache, inputs: dict):
+    """Returns ``(hit_events, vector)``; ``hit_events`` is None on a miss."""
+    start = time.perf_counter()
+    question = inputs["question"]
+    with span("semantic_cache", kind="cache") as attrs:
+        hit, vector = answer_cache.lookup(question)
+        attrs["hit"] = hit is not None
+    if hit is None:
+        return None, vector
+    log.info("semantic cache hit (%s): %r", hit["similarity"], hit["question"])
+    count("answer_cache_hits")
+    elapsed = round(time.perf_counter() - start, 4)
+    state = dict(inputs, generation=hit["generation"], documents=hit["documents"])
+    return [
+        ("node", "semantic_cache", {"similarity": hit["similarity"], "question": hit["question"]}),
+        ("token", hit["generation"]),
+        ("done", state, {"ttft_seconds": elapsed, "total_seconds": elapsed, "nodes": [],
+                         "cache_hit": True, "cache_similarity": hit["similarity"]}),
+    ], vector
+
+
+def _cache_store(answer_cache, inputs: dict, vector, event):
+    if event[0] != "done":
+        return
+    state, metrics = event[1], event[2]
+    generation = state.get("generation")
+    documents = state.get("documents") or []
+    if generation and documents and generation != config.NOT_FOUND_ANSWER:
+        answer_cache.put(inputs["question"], generation, documents, vector)
+    metrics["cache_hit"] = False
+
+
+def _cacheable(inputs: dict) -> bool:
+    # A follow-up ("and the second one?") means something else in every conversation.
+    return inputs.get("follow_up") in (None, "new")
+
+
+def _answer_events(graph, inputs: dict, answer_cache=None):
+    if answer_cache is None or not _cacheable(inputs):
+        yield from stream_graph(graph, inputs)
+        return
+    hit_events, vector = _cache_lookup(answer_cache, inputs)
+    if hit_events is not None:
+        yield from hit_events
+        return
+    for event in stream_graph(graph, inputs):
+        _cache_store(answer_cache, inputs, vector, event)
+        yield event
+
+
+async def _aanswer_events(graph, inputs: dict, answer_cache=None):
+    if answer_cache is None or not _cacheable(inputs):
+        async for event in astream_graph(graph, inputs):
+            yield event
+        return
+    # The cache embeds the question and writes to SQLite on a hit: keep both off the event loop.
+    hit_events, vector = await asyncio.to_thread(_cache_lookup, answer_cache, inputs)
+    if hit_events is not None:
+        for event in hit_events:
+            yield event
+        return
+    async for event in astream_graph(graph, inputs):
+        if event[0] == "done":
+            await asyncio.to_thread(_cache_store, answer_cache, inputs, vector, event)
+        yield event
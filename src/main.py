@@ -91,9 +91,105 @@
 
 import os
 import streamlit as st
-from langchain_core.documents import Document
-from src.graph.graph_builder import Graph_builder
-from src.voice.voice_input import transcribe_once, tts_to_bytes
+from src.tracing import configure_logging, start_metrics_server
+from src.voice.voice_input import speech_stream, transcribe_once
+
+# The graph, FAISS and PDF stack is imported inside app() where it is first
+# needed, so the page renders before it loads; voice models load on first use.
+
+
+def _store_upload(uploaded):
+    """
+    Put a Streamlit upload into the content-addressed upload store.
+
+    Streamlit reruns the script on every interaction; the stored entry is
+    remembered per upload, so reruns neither re-hash nor rewrite the file.
+
+    Returns:
+        upload store entry with ``digest`` and ``path``
+    """
+    from src.tools.upload_store import get_upload_store
+
+    stored = st.session_state.setdefault("stored_uploads", {})
+    entry = stored.get(uploaded.file_id)
+    if entry is None:
+        entry = stored[uploaded.file_id] = get_upload_store().put_bytes(uploaded.getbuffer(), uploaded.name)
+    return entry
+
+
+def _index_with_progress(pdf_path, name, digest=None):
+    """Build (or load) the PDF's index up front, showing ingestion progress and throughput."""
+    progress = st.empty()
+
+    def on_progress(p):
+        total = p.get("total_pages")
+        label = (
+            f"Indexing {name}: {p['pages']}/{total or '?'} pages, {p['chunks']} chunks "
+            f"({p['pages_per_s']:.1f} pages/s, {p['chunks_per_s']:.1f} chunks/s)"
+        )
+        progress.progress(min(p["pages"] / total, 1.0) if total else 0.0, text=label)
+
+    from src.tools.PDF_tool import build_pdf_tool
+
+    tool = build_pdf_tool(pdf_path, on_progress=on_progress, digest=digest)
+    progress.empty()
+    return tool
+
+
+def _render_waterfall(trace, width=40):
+    """Per-query timing waterfall: one bar per span, offset by its start within the request."""
+    total = trace.get("duration_ms") or 0.0
+    counters = trace.get("counters") or {}
+    st.caption(
+        f"Trace {trace['trace_id']} — {total:.0f} ms, {int(counters.get('llm_calls', 0))} LLM call(s), "
+        f"{int(counters.get('prompt_tokens', 0))} prompt / {int(counters.get('completion_tokens', 0))} "
+        f"completion tokens"
+    )
+    lines = []
+    for s in trace.get("spans", []):
+        start = int(width * s["start_ms"] / total) if total else 0
+        length = max(1, int(width * s["duration_ms"] / total)) if total else 1
+        name = ("  " if s.get("parent") else "") + s["name"]
+        lines.append(f"{name[:24]:<24} {s['kind'][:9]:<9} {' ' * start}{'█' * length:<{width - start}} "
+                     f"{s['start_ms']:>8.1f} +{s['duration_ms']:.1f} ms")
+    st.code("\n".join(lines) or "No spans recorded.", language=None)
+    st.json(trace, expanded=False)
+
+
+def _render_grounding(future):
+    """Groundedness report of the answer; waits for the background check, which usually finished during TTS."""
+    try:
+        with st.spinner("Checking the answer against the document..."):
+            report = future.result()
+    except Exception as exc:
+        st.caption(f"Grounding check failed: {exc}")
+        return
+    unsupported = [s for s in report["sentences"] if not s["supported"]]
+    if report["grounded"] and report["answers_question"]:
+        st.caption(
+            f"✅ All {len(report['sentences'])} sentence(s) are supported by the retrieved chunks "
+            f"({report['llm_calls']} LLM check(s), {report['seconds']:.2f}s)."
+        )
+    else:
+        if unsupported:
+            st.warning(f"⚠️ {len(unsupported)} sentence(s) of the answer may not be supported by the document.")
+        if not report["answers_question"]:
+            st.warning("⚠️ The answer may not address the question.")
+    with st.expander("🧾 Grounding report"):
+        for s in report["sentences"]:
+            mark = "✅" if s["supported"] else "⚠️"
+            st.markdown(f"{mark} {s['text']}  \n_similarity {s['similarity']:.2f}, checked by {s['checked_by']}_")
+        st.json({k: v for k, v in report.items() if k != "sentences"}, expanded=False)
+
+
+def _conversation(key):
+    """This session's conversation about ``key`` (PDF digest or library); a different document starts a new one."""
+    from src.Nodes.conversation import ConversationMemory
+
+    if st.session_state.get("conversation_key") != key or "conversation" not in st.session_state:
+        st.session_state.conversation_key = key
+        st.session_state.conversation = ConversationMemory()
+    return st.session_state.conversation
 
 
 def app():
@@ -102,6 +198,9 @@ def app():
     Handles UI loading, model setup, graph initialization, and safe exception handling.
     """
     st.set_page_config(page_title="LangGraph AgenticAI", layout="wide")
+    configure_logging()
+    # Prometheus /metrics on config.METRICS_PORT; a no-op after the first run.
+    start_metrics_server()
     st.title("LangGraph AgenticAI Application")
     
     if "pending_text" not in st.session_state:
@@ -110,34 +209,81 @@ def app():
         st.session_state.chat_box = ""
 
     pdf_path = None
-    uploaded_file = st.file_uploader("Upload your PDF file", type=["pdf"])
-    if uploaded_file:
-        pdf_dir="uploaded_pdfs"
-        os.makedirs(pdf_dir, exist_ok=True)
-        pdf_path = os.path.join(pdf_dir, uploaded_file.name)
-        with open(pdf_path, "wb") as f:
-            f.write(uploaded_file.getbuffer())
-        st.success(f"Uploaded {uploaded_file.name} successfully!")
+    pdf_digest = None
+    library = None
+    library_mode = st.sidebar.toggle("📚 Library mode", help="Ask questions across many PDFs at once.")
+    if library_mode:
+        from src.graph.graph_cache import get_library, warm_up
+
+        library = get_library()
+        uploaded_files = st.file_uploader(
+            "Add PDF files to the library", type=["pdf"], accept_multiple_files=True
+        )
+        for uploaded in uploaded_files or []:
+            try:
+                stored = _store_upload(uploaded)
+                with st.spinner(f"Indexing {uploaded.name}..."):
+                    library.add(stored["path"], name=uploaded.name, digest=stored["digest"])
+            except Exception as exc:
+                st.error(f"Could not add {uploaded.name}: {exc}")
+        if len(library):
+            st.success(f"{len(library)} document(s) in the library.")
+            with st.sidebar.expander("Library documents"):
+                for entry in library.documents().values():
+                    st.write(f"{entry['name']} — {entry['chunks']} chunks")
+            warm_up()
+        else:
+            st.info("Please add PDF files to the library to proceed.")
     else:
-        st.info("Please upload a PDF file to proceed.")
+        uploaded_file = st.file_uploader("Upload your PDF file", type=["pdf"])
+        if uploaded_file:
+            stored = _store_upload(uploaded_file)
+            pdf_path, pdf_digest = stored["path"], stored["digest"]
+            from src.graph.graph_cache import warm_up
+
+            # Load the models in the background so the first question skips model-load latency.
+            warm_up()
+            try:
+                _index_with_progress(pdf_path, uploaded_file.name, digest=pdf_digest)
+            except Exception as exc:
+                st.error(f"Error indexing PDF: {exc}")
+                st.stop()
+            st.success(f"Uploaded {uploaded_file.name} successfully!")
+        else:
+            st.info("Please upload a PDF file to proceed.")
+
+    conversation = None
+    if pdf_path or (library is not None and len(library)):
+        conversation = _conversation(pdf_digest or ("library", os.path.abspath(library.root)))
+        if st.sidebar.button("🧹 New conversation"):
+            conversation.clear()
+        if conversation.turns:
+            with st.expander(f"💬 Conversation so far ({len(conversation.turns)} turn(s))"):
+                for turn in conversation.turns:
+                    st.markdown(f"**You:** {turn['question']}")
+                    st.markdown(turn["answer"])
 
     st.subheader("Voice or Text Input")
 
     if st.button("🎙️ Start Recording"):
-        with st.spinner("Listening..."):
-            try:
-                transcript = transcribe_once()
-                if transcript:
-                    st.session_state.chat_box = transcript
-                else:
-                    st.warning("No speech detected.")
-            except Exception as exc:
-                st.error(f"STT error: {exc}")
+        # Recording stops at the first pause; partial transcripts show while the user speaks.
+        live = st.empty()
+        live.info("Listening... recording stops when you pause.")
+        try:
+            transcript = transcribe_once(on_partial=lambda text: live.info(f"🎙️ {text}"))
+            live.empty()
+            if transcript:
+                st.session_state.chat_box = transcript
+            else:
+                st.warning("No speech detected.")
+        except Exception as exc:
+            live.empty()
+            st.error(f"STT error: {exc}")
 
     st.text_input("Enter your message:", key="chat_box")
     submitted = st.button("Submit")
 
-    if not pdf_path:
+    if conversation is None:
         st.stop()
 
     if not submitted:
@@ -148,17 +294,74 @@ def app():
         st.warning("Please enter or record a question before submitting.")
         st.stop()
 
-    graph_builder = Graph_builder(pdf_path=pdf_path)
+    from langchain_core.documents import Document
+    from src.graph.graph_cache import get_answer_cache, get_graph, get_library_graph, get_verifier
+    from src.graph.graph_runner import NODE_LABELS, stream_answer
+
     try:
-        graph = graph_builder.build()
-        st.success("Graph built successfully!")
+        if library is not None:
+            graph = get_library_graph(library)
+            answer_cache = None
+        else:
+            graph = get_graph(pdf_path, digest=pdf_digest)
+            answer_cache = get_answer_cache(pdf_path, digest=pdf_digest)
     except Exception as e:
         st.error(f"Error building graph: {e}")
         return
 
-    with st.spinner("Analyzing PDF and generating answer... ⏳"):
-        try:
-            result = graph.invoke({"question": st.session_state.pending_text})
+    with st.chat_message("user"):
+        st.write(st.session_state.pending_text)
+
+    try:
+        with st.chat_message("assistant"):
+            st.subheader(" 📖 Answer:")
+            status = st.status("Analyzing PDF and generating answer... ⏳", expanded=False)
+            answer_box = st.empty()
+            tokens = []
+            result, metrics = {}, {}
+            # Sentences are synthesized on the TTS worker while the answer is still streaming.
+            speech = speech_stream()
+            # The groundedness check runs in the background and is shown once the answer is out.
+            # Follow-ups are classified here and answered from the previous turn's chunks.
+            inputs = conversation.inputs(st.session_state.pending_text)
+            for event in stream_answer(graph, inputs, answer_cache, verifier=get_verifier()):
+                if event[0] == "node":
+                    label = NODE_LABELS.get(event[1], event[1])
+                    status.write(f"✔ {label}")
+                    status.update(label=f"{label}...")
+                elif event[0] == "token":
+                    tokens.append(event[1])
+                    speech.feed(event[1])
+                    answer_box.markdown("".join(tokens) + "▌")
+                else:
+                    _, result, metrics = event
+            ttft = metrics.get("ttft_seconds")
+            status.update(
+                label=(
+                    f"Answered from cache in {metrics['total_seconds']:.2f}s "
+                    f"(similarity {metrics['cache_similarity']:.2f})"
+                    if metrics.get("cache_hit")
+                    else f"Done — first token in {ttft:.2f}s, total {metrics['total_seconds']:.2f}s"
+                    if ttft is not None else f"Done in {metrics.get('total_seconds', 0):.2f}s"
+                ),
+                state="complete",
+            )
+            if result:
+                conversation.record(result)
+            follow_up = result.get("conversation")
+            if follow_up:
+                added = f", added {follow_up['new_documents']} new" if follow_up["mode"] == "extend" else ""
+                st.caption(
+                    f"Follow-up: reused {follow_up['reused_documents']} chunk(s) from the previous answer{added}; "
+                    f"{conversation.stats['retrievals_avoided']} retrieval(s) avoided this session."
+                )
+            loop_stats = result.get("loop_stats") or {}
+            if loop_stats.get("rewrites"):
+                st.caption(
+                    f"Question rewritten {loop_stats['rewrites']} time(s); "
+                    f"{loop_stats.get('wasted_llm_calls', 0)} LLM call(s) spent on failed attempts."
+                )
+
             def _extract_answer(res):
                 if isinstance(res, dict):
                     for k in ("generation", "answer", "output", "response", "result"):
@@ -177,38 +380,50 @@ def app():
             elif not isinstance(docs, list):
                 # Fallback: wrap unknown type as string
                 docs = [Document(page_content=str(docs))]  
-            with st.chat_message("user"):
-                st.write(st.session_state.pending_text)  
 
             if answer:
-                with st.chat_message("assistant"):
-                    st.subheader(" 📖 Answer:")
-                    st.write(answer)
-                    try:
-                        audio_out = tts_to_bytes(answer)
-                        st.audio(audio_out, format="audio/wav")
-                    except Exception as exc:
-                        st.warning(f"TTS error: {exc}")
-
-            if docs:
-                with st.expander("🔎 Supporting PDF Chunks"):
-                    for i, d in enumerate(docs[:5]):  # show first 5 chunks
-                        st.markdown(f"**Chunk {i+1}:**")
-                        st.write(d.page_content)
-
-            if not answer and not docs:
-                        st.info("No answer or supporting documents returned. Expand Debug to inspect state.")
-                        with st.expander("Debug state"):
-                            try:
-                                st.json(result if isinstance(result, dict) else {"result": str(result)})
-                            except Exception:
-                                st.write(result)
-        except Exception as e:
-            st.error(f"Error running graph: {e}")
-
-
-
-
-
-
-
+                answer_box.markdown(answer)
+                try:
+                    from src.voice.tts_service import concat_wav
+
+                    if "".join(tokens).strip() != answer.strip():
+                        # Streamed tokens spanned a discarded generation; speak the final answer only.
+                        speech = speech_stream()
+                        speech.feed(answer)
+                    # st.audio plays one clip, so playback starts once every sentence is synthesized.
+                    st.audio(concat_wav(speech.segments()), format="audio/wav")
+                    tts = speech.stats
+                    first_segment = tts["first_segment_ms"]
+                    st.caption(
+                        (f"🔊 First sentence synthesized {first_segment:.0f} ms after the first token; "
+                         if first_segment is not None else "🔊 No sentence synthesized; ")
+                        + f"{tts['cache_hits']}/{tts['sentences']} sentence(s) from the TTS cache"
+                    )
+                except Exception as exc:
+                    st.warning(f"TTS error: {exc}")
+            else:
+                answer_box.empty()
+
+        if docs:
+            with st.expander("🔎 Supporting PDF Chunks"):
+                for i, d in enumerate(docs[:5]):  # show first 5 chunks
+                    source = d.metadata.get("library_name") if isinstance(d.metadata, dict) else None
+                    st.markdown(f"**Chunk {i+1}:**" + (f" _{source}_" if source else ""))
+                    st.write(d.page_content)
+
+        if metrics.get("grounding") is not None:
+            _render_grounding(metrics["grounding"])
+
+        if metrics.get("trace"):
+            with st.expander("⏱ Timing waterfall (debug)"):
+                _render_waterfall(metrics["trace"])
+
+        if not answer and not docs:
+                    st.info("No answer or supporting documents returned. Expand Debug to inspect state.")
+                    with st.expander("Debug state"):
+                        try:
+                            st.json(result if isinstance(result, dict) else {"result": str(result)})
+                        except Exception:
+                            st.write(result)
+    except Exception as e:
+        st.error(f"Error running graph: {e}")
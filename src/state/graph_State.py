@@ -10,11 +10,33 @@ class GraphState(TypedDict):
                 generation: LLM generation
                 documents: list of documents
                 failures: how many times generation was judged not useful/not supported
+                grading: mode, LLM call count and per-call timings of the last grading pass
+                generation_stats: time-to-first-token and total time of the generate node
+                original_question: the user's question before any rewrite
+                rewrites: how many times the question has been rewritten
+                loop_stats: retrievals, memo hits, rewrites and wasted LLM calls for this query
+                retrieval_timings: per-stage latencies (ms) of the last hybrid retrieval
+                context_stats: passages merged and prompt tokens before/after context assembly
+                history: earlier turns of the session (question, answer, graded documents)
+                follow_up: "reuse", "extend" or "new", when the caller already classified the question
+                history_context: condensed earlier turns added to a follow-up's generation prompt
+                conversation: follow-up mode and how many chunks were reused or added
     """
     question:str
     generation:str
     documents:List[str]
     failures:int
+    grading:dict
+    generation_stats:dict
+    original_question:str
+    rewrites:int
+    loop_stats:dict
+    retrieval_timings:dict
+    context_stats:dict
+    history:list
+    follow_up:str
+    history_context:str
+    conversation:dict
 
 
    
@@ -1,54 +1,174 @@
-import streamlit as st
-from langchain_ollama import OllamaEmbeddings
-from langchain_community.document_loaders import PyPDFLoader
-from langchain_community.vectorstores import FAISS
-from langchain_text_splitters import RecursiveCharacterTextSplitter
+import logging
+import os
+import threading
+from collections import OrderedDict
+
+from src import config
+from src.tools.bm25 import BM25Index
+from src.tools.index_cache import IndexCache, file_digest, index_cache_key
+from src.tools.ingestion import StreamingIngestor
+from src.tools.ollama_pool import PooledOllamaEmbeddings
+from src.tools.parent_store import ParentStore
+from src.tools.retrievers import HybridRetriever, ParentRetriever, ScoredRetriever
+from src.tools.vector_index import compact_vectorstore
+from src.tracing import METRICS, TracedEmbeddings, span
+
+log = logging.getLogger(__name__)
+
+# Bump when page cleaning in `pdf_extract` changes so cached indexes get rebuilt.
+CLEANING_VERSION = 2
+BM25_FILE = "bm25.json"
+PARENTS_FILE = "parents.json"
+
+
+def index_params() -> dict:
+    """Everything besides the PDF bytes that changes the resulting index."""
+    return {
+        "chunk_size": config.CHUNK_SIZE,
+        "chunk_overlap": config.CHUNK_OVERLAP,
+        "separators": config.CHUNK_SEPARATORS,
+        "start_index": True,
+        "embed_model": config.EMBED_MODEL,
+        "cleaning": CLEANING_VERSION,
+        "normalize_L2": True,
+        "index_mode": config.INDEX_MODE,
+        "index_auto": [config.INDEX_AUTO_THRESHOLD, config.INDEX_AUTO_MODE],
+        "ivf": [config.IVF_NLIST, config.PQ_M],
+        # 0: flat chunks, else the parent section size of the parent/child index.
+        "parents": config.PARENT_CHUNK_SIZE if config.PARENT_CHILD else 0,
+    }
+
+
+_embeddings = {}
+_embeddings_lock = threading.Lock()
+
+
+def make_embeddings():
+    """Process-wide embedding client for the configured model, created on first use."""
+    key = (config.EMBED_MODEL, config.KEEP_ALIVE_SECONDS)
+    with _embeddings_lock:
+        embedding = _embeddings.get(key)
+        if embedding is None:
+            embedding = _embeddings[key] = TracedEmbeddings(
+                PooledOllamaEmbeddings(model=config.EMBED_MODEL, keep_alive=config.KEEP_ALIVE_SECONDS)
+            )
+        return embedding
+
 
 class PDFTool:
-    def __init__(self, pdf_path: str):
+    def __init__(self, pdf_path: str, index_cache: IndexCache = None, embedding=None, on_progress=None,
+                 digest: str = None):
         self.pdf_path = pdf_path
-        self.embedding =  OllamaEmbeddings(model="mxbai-embed-large")
+        # Called with ingestion progress (pages, chunks, throughput) while building.
+        self.on_progress = on_progress
+        self.embedding = embedding or make_embeddings()
+        self.index_cache = index_cache or IndexCache()
+        # SHA-256 of the PDF when the caller already knows it (e.g. from the upload store).
+        self.digest = digest
+        self.index_key = None
         self.vectorstore = None
+        self.bm25 = None
+        # Parent sections of the searched chunks (``config.PARENT_CHILD``), else None.
+        self.parents = None
         self.retriever = None
+        # Mode, memory footprint and recall@10 vs. flat of the vector index.
+        self.index_report = None
         self._prepare_pdf()
 
+    def index_params(self) -> dict:
+        return index_params()
+
     def _prepare_pdf(self):
-        loader = PyPDFLoader(self.pdf_path)
-        try:
-            docs_list = loader.load()
-        except Exception as exc:
-            raise ValueError(
-                f"Failed to read PDF. Ensure it is not password-protected and is text-based. ({exc})"
-            ) from exc
-        if not docs_list:
-            raise ValueError(
-                "PDF produced no text. Please upload a text-based or OCR-processed PDF."
+        digest = self.digest = self.digest or file_digest(self.pdf_path)
+        params = self.index_params()
+        self.index_key = index_cache_key(digest, params)
+        self.vectorstore = self.index_cache.load(self.index_key, self.embedding, params)
+        METRICS.inc("rag_index_cache_total", help="Index cache lookups",
+                    result="miss" if self.vectorstore is None else "hit")
+        if self.vectorstore is not None:
+            self.bm25 = BM25Index.load(self.index_cache.artifact_path(self.index_key, BM25_FILE))
+            if config.PARENT_CHILD:
+                self.parents = ParentStore.load(self.index_cache.artifact_path(self.index_key, PARENTS_FILE))
+            self.index_report = (self.index_cache.read_meta(self.index_key) or {}).get("index")
+        else:
+            # Also builds the lexical index (and parent sections) over the same chunks,
+            # persisted next to the vectors.
+            self.vectorstore = self._build_vectorstore()
+            artifacts = {BM25_FILE: self.bm25}
+            if self.parents is not None:
+                artifacts[PARENTS_FILE] = self.parents
+            self.index_cache.save(
+                self.index_key, self.vectorstore, digest, params, artifacts=artifacts,
+                index_report=self.index_report,
             )
-        def clean_page_text(txt: str) -> str:
-            # tweak to remove repeated page headers/footers, common line patterns, or "Page X of Y"
-            import re
-            txt = re.sub(r"Page\s*\d+\s*(of\s*\d+)?", "", txt, flags=re.IGNORECASE)
-            txt = re.sub(r"^\s*-+\s*$", "", txt, flags=re.MULTILINE)
-            return txt.strip()
-        for d in docs_list:
-            d.page_content = clean_page_text(d.page_content)
-        full_text = "\n\n".join(d.page_content for d in docs_list)
-
-
-        text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=500,
-            chunk_overlap=100,
-            separators=["\n\n", "\n", " ", ""]
-        )
-        docs_splits = text_splitter.split_documents(docs_list)
-        self.vectorstore = FAISS.from_documents(docs_splits, self.embedding)
-        # Fetch a few more chunks to give the generator richer context.
-        self.retriever = self.vectorstore.as_retriever(search_kwargs={"k": 6})
+        if self.bm25 is None:
+            self.bm25 = BM25Index.from_vectorstore(self.vectorstore)
+        # Fetch a few more chunks to give the generator richer context; each
+        # hit carries its similarity so grading can skip clear hits and misses.
+        if config.HYBRID_SEARCH:
+            self.retriever = HybridRetriever(vectorstore=self.vectorstore, bm25=self.bm25, k=config.RETRIEVER_K)
+        else:
+            self.retriever = ScoredRetriever(vectorstore=self.vectorstore, k=config.RETRIEVER_K)
+        if self.parents is not None:
+            # Search the small chunks, answer from their parent sections.
+            self.retriever = ParentRetriever(child=self.retriever, parents=self.parents, k=config.PARENT_K)
+
+    def _build_vectorstore(self):
+        ingestor = StreamingIngestor(self.embedding, on_progress=self.on_progress)
+        with span("ingest", kind="ingest") as attrs:
+            vectorstore, self.bm25 = ingestor.ingest(self.pdf_path)
+            self.parents = ingestor.parents
+            attrs.update(pages=ingestor.stats.get("pages"), chunks=ingestor.stats.get("chunks"))
+        log.info("ingest: %s", ingestor.stats)
+        with span("compact_index", kind="ingest"):
+            self.index_report = compact_vectorstore(vectorstore)
+        log.info("index: %s", self.index_report)
+        return vectorstore
+
     def get_retriever(self):
         if self.retriever is None:
             self._prepare_pdf()
         return self.retriever
 
-@st.cache_resource
-def build_pdf_retriver(pdf_path):
-    return PDFTool(pdf_path).get_retriever()
\ No newline at end of file
+# Process-wide PDFTool cache, keyed by content digest when the caller knows it,
+# else by path, size and mtime so a re-upload under the same name is
+# re-indexed. LRU-bounded to config.PDF_TOOL_CACHE_SIZE tools. Plain
+# OrderedDict + locks rather than st.cache_resource so progress callbacks can
+# update the UI during a build and the tools work outside Streamlit.
+_tools = OrderedDict()
+_tools_lock = threading.Lock()
+_tool_locks = {}
+
+
+def build_pdf_tool(pdf_path, on_progress=None, digest=None):
+    if digest:
+        key = ("sha256", digest)
+    else:
+        st_ = os.stat(pdf_path)
+        key = (os.path.abspath(pdf_path), st_.st_size, st_.st_mtime_ns)
+    with _tools_lock:
+        if key in _tools:
+            _tools.move_to_end(key)
+            return _tools[key]
+        key_lock = _tool_locks.setdefault(key, threading.Lock())
+    with key_lock:
+        with _tools_lock:
+            if key in _tools:
+                _tools.move_to_end(key)
+                return _tools[key]
+        tool = PDFTool(pdf_path, on_progress=on_progress, digest=digest)
+        with _tools_lock:
+            # Drop tools for older versions of the same file (digest keys never go stale).
+            if not digest:
+                for old in [k for k in _tools if k[0] == key[0]]:
+                    del _tools[old]
+                    _tool_locks.pop(old, None)
+            _tools[key] = tool
+            while len(_tools) > config.PDF_TOOL_CACHE_SIZE:
+                old, _ = _tools.popitem(last=False)
+                _tool_locks.pop(old, None)
+        return tool
+
+def build_pdf_retriver(pdf_path, digest=None):
+    return build_pdf_tool(pdf_path, digest=digest).get_retriever()
+
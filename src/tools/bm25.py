@@ -0,0 +1,113 @@
+import json
+import math
+import os
+import re
+from collections import Counter
+
+# Keeps identifiers such as "PN-4471", "3.2.1" or "ISO_9001" together as one token.
+_TOKEN_RE = re.compile(r"[a-z0-9]+(?:[-_./:][a-z0-9]+)*")
+_SPLIT_RE = re.compile(r"[-_./:]")
+
+
+def tokenize(text: str):
+    """
+    Lowercased word and identifier tokens. Compound identifiers are emitted
+    whole and as their parts, so "PN-4471" matches both "pn-4471" and "4471".
+    """
+    tokens = []
+    for tok in _TOKEN_RE.findall(str(text).lower()):
+        tokens.append(tok)
+        if _SPLIT_RE.search(tok):
+            tokens.extend(p for p in _SPLIT_RE.split(tok) if p)
+    return tokens
+
+
+class BM25Index:
+    """
+    Compact in-process BM25 inverted index.
+
+    Postings map each term to ``{doc_position: term_frequency}``; a document's
+    position maps back to its docstore id through ``doc_ids``. Documents can
+    be added incrementally, and the whole index round-trips through JSON.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings = {}
+        self.doc_ids = []
+        self.doc_lens = []
+        self.total_len = 0
+
+    def __len__(self):
+        return len(self.doc_ids)
+
+    def add(self, texts, ids):
+        for text, doc_id in zip(texts, ids):
+            pos = len(self.doc_ids)
+            counts = Counter(tokenize(text))
+            for term, tf in counts.items():
+                self.postings.setdefault(term, {})[pos] = tf
+            length = sum(counts.values())
+            self.doc_ids.append(doc_id)
+            self.doc_lens.append(length)
+            self.total_len += length
+
+    @classmethod
+    def from_vectorstore(cls, vectorstore) -> "BM25Index":
+        """Index every chunk of a LangChain FAISS vectorstore, in index order."""
+        index = cls()
+        ids = [vectorstore.index_to_docstore_id[i] for i in sorted(vectorstore.index_to_docstore_id)]
+        texts = [vectorstore.docstore.search(doc_id).page_content for doc_id in ids]
+        index.add(texts, ids)
+        return index
+
+    def search(self, query: str, k: int):
+        """
+        Returns:
+            list of (docstore id, score), best first, at most ``k`` long
+        """
+        n = len(self.doc_ids)
+        if not n:
+            return []
+        avg_len = self.total_len / n or 1.0
+        scores = {}
+        for term in set(tokenize(query)):
+            posting = self.postings.get(term)
+            if not posting:
+                continue
+            idf = math.log(1.0 + (n - len(posting) + 0.5) / (len(posting) + 0.5))
+            for pos, tf in posting.items():
+                norm = self.k1 * (1.0 - self.b + self.b * self.doc_lens[pos] / avg_len)
+                scores[pos] = scores.get(pos, 0.0) + idf * tf * (self.k1 + 1.0) / (tf + norm)
+        best = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+        return [(self.doc_ids[pos], score) for pos, score in best]
+
+    def save(self, path):
+        payload = {
+            "k1": self.k1,
+            "b": self.b,
+            "doc_ids": self.doc_ids,
+            "doc_lens": self.doc_lens,
+            # JSON object keys must be strings; store postings as [pos, tf] pairs.
+            "postings": {t: [[p, tf] for p, tf in docs.items()] for t, docs in self.postings.items()},
+        }
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(payload, f, separators=(",", ":"))
+
+    @classmethod
+    def load(cls, path):
+        """Load a saved index, or return None if ``path`` is missing or unreadable."""
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                payload = json.load(f)
+        except (OSError, ValueError):
+            return None
+        index = cls(k1=payload["k1"], b=payload["b"])
+        index.doc_ids = payload["doc_ids"]
+        index.doc_lens = payload["doc_lens"]
+        index.total_len = sum(index.doc_lens)
+        index.postings = {t: {p: tf for p, tf in docs} for t, docs in payload["postings"].items()}
+        return index
@@ -0,0 +1,123 @@
+import hashlib
+import os
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from src import config
+
+
+def chunk_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingStore:
+    """
+    Persistent chunk-hash -> vector store backed by SQLite.
+
+    Vectors are stored as raw float32 blobs and namespaced by embedding
+    model, so switching models never returns vectors from another space.
+    """
+
+    def __init__(self, path: str = None, model: str = None):
+        self.path = path or config.EMBED_CACHE_PATH
+        self.model = model or config.EMBED_MODEL
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " model TEXT NOT NULL, hash TEXT NOT NULL, dim INTEGER NOT NULL, vector BLOB NOT NULL,"
+            " PRIMARY KEY (model, hash))"
+        )
+        self._conn.commit()
+
+    def get_many(self, hashes) -> dict:
+        found = {}
+        hashes = list(hashes)
+        with self._lock:
+            # Stay well under SQLite's bound-parameter limit.
+            for start in range(0, len(hashes), 500):
+                part = hashes[start:start + 500]
+                marks = ",".join("?" * len(part))
+                rows = self._conn.execute(
+                    f"SELECT hash, vector FROM embeddings WHERE model = ? AND hash IN ({marks})",
+                    [self.model, *part],
+                ).fetchall()
+                for h, blob in rows:
+                    found[h] = np.frombuffer(blob, dtype=np.float32)
+        return found
+
+    def put_many(self, items: dict):
+        rows = [
+            (self.model, h, int(v.shape[0]), np.asarray(v, dtype=np.float32).tobytes())
+            for h, v in items.items()
+        ]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, hash, dim, vector) VALUES (?, ?, ?, ?)",
+                rows,
+            )
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class BatchedEmbedder:
+    """
+    Embeds chunk texts through a cache-first, batched, concurrent pipeline.
+
+    Texts are de-duplicated by content hash, looked up in the ``EmbeddingStore``,
+    and only the misses are sent to the embedding model in batches of
+    ``batch_size`` across at most ``max_workers`` concurrent requests.
+    """
+
+    def __init__(self, embedding, store: EmbeddingStore = None, batch_size: int = None, max_workers: int = None):
+        self.embedding = embedding
+        self.store = store if store is not None else EmbeddingStore()
+        self.batch_size = batch_size or config.EMBED_BATCH_SIZE
+        self.max_workers = max_workers or config.EMBED_WORKERS
+        self.stats = {"chunks": 0, "unique": 0, "cache_hits": 0, "embedded": 0, "batches": 0}
+
+    def _embed_batch(self, texts):
+        return self.embedding.embed_documents(texts)
+
+    def embed(self, texts) -> np.ndarray:
+        """
+        Args:
+            texts: chunk texts, in index order
+
+        Returns:
+            float32 matrix with one row per input text
+        """
+        texts = list(texts)
+        hashes = [chunk_hash(t) for t in texts]
+        unique = dict(zip(hashes, texts))
+        vectors = self.store.get_many(unique.keys())
+        misses = [(h, t) for h, t in unique.items() if h not in vectors]
+
+        batches = [misses[i:i + self.batch_size] for i in range(0, len(misses), self.batch_size)]
+        if batches:
+            workers = max(1, min(self.max_workers, len(batches)))
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                results = pool.map(self._embed_batch, [[t for _, t in b] for b in batches])
+                for batch, embedded in zip(batches, results):
+                    fresh = {h: np.asarray(v, dtype=np.float32) for (h, _), v in zip(batch, embedded)}
+                    # Persist per batch so an interrupted ingest keeps its progress.
+                    self.store.put_many(fresh)
+                    vectors.update(fresh)
+
+        self.stats["chunks"] += len(texts)
+        self.stats["unique"] += len(unique)
+        self.stats["cache_hits"] += len(unique) - len(misses)
+        self.stats["embedded"] += len(misses)
+        self.stats["batches"] += len(batches)
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        return np.vstack([vectors[h] for h in hashes])
+
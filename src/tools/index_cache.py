@@ -0,0 +1,204 @@
+import hashlib
+import json
+import os
+import pickle
+import shutil
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from langchain_community.vectorstores import FAISS
+
+from src import config
+from src.tools.vector_index import read_index
+
+# Bump when the on-disk layout or the ingestion pipeline changes in a way
+# that makes previously saved indexes unusable.
+INDEX_FORMAT_VERSION = 2
+META_FILE = "meta.json"
+
+
+def file_digest(path, block_size: int = 1 << 20) -> str:
+    """SHA-256 of a file's bytes, read in blocks so large PDFs are never fully in memory."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def index_cache_key(digest: str, params: dict) -> str:
+    """Cache key for a PDF digest plus every parameter that shapes its index."""
+    payload = json.dumps(
+        {"digest": digest, "params": params, "version": INDEX_FORMAT_VERSION},
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class IndexCache:
+    """
+    Content-addressed on-disk store of FAISS indexes.
+
+    Each entry lives in ``<root>/<key>/`` and holds the FAISS index (loaded
+    memory-mapped), its docstore and a ``meta.json`` describing the source digest and the
+    parameters it was built with. Entries are written to a temporary
+    directory and renamed into place, so readers never see a half-written
+    index. The directory is kept under ``max_bytes`` by evicting the least
+    recently used entries.
+    """
+
+    def __init__(self, root=None, max_bytes: int = None):
+        self.root = Path(root or config.INDEX_CACHE_DIR)
+        self.max_bytes = config.INDEX_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+        self._lock = threading.Lock()
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def entry_path(self, key: str) -> Path:
+        return self.root / key
+
+    def read_meta(self, key: str):
+        try:
+            with open(self.entry_path(key) / META_FILE, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def load(self, key: str, embedding, params: dict = None):
+        """
+        Load the vectorstore stored under ``key``.
+
+        Args:
+            key: cache key from ``index_cache_key``
+            embedding: embeddings used to embed queries against the index
+            params: expected build parameters; a mismatch invalidates the entry
+
+        Returns:
+            FAISS vectorstore, or None on a cache miss
+        """
+        path = self.entry_path(key)
+        meta = self.read_meta(key)
+        if meta is None:
+            return None
+        if meta.get("version") != INDEX_FORMAT_VERSION or (
+            params is not None and meta.get("params") != params
+        ):
+            self.remove(key)
+            return None
+        try:
+            vectorstore = self._load_vectorstore(path, embedding)
+        except Exception:
+            # Corrupt or partially deleted entry: drop it and rebuild.
+            self.remove(key)
+            return None
+        self._touch(key)
+        return vectorstore
+
+    @staticmethod
+    def _load_vectorstore(path: Path, embedding):
+        # Same files as FAISS.load_local, but the index is memory-mapped (see
+        # config.INDEX_MMAP and read_index) so processes serving the same PDF
+        # share the page-cached vectors. The docstore is still unpickled per process.
+        index = read_index(path / "index.faiss")
+        with open(path / "index.pkl", "rb") as f:
+            docstore, index_to_docstore_id = pickle.load(f)
+        return FAISS(
+            embedding_function=embedding,
+            index=index,
+            docstore=docstore,
+            index_to_docstore_id=index_to_docstore_id,
+            normalize_L2=True,
+        )
+
+    def artifact_path(self, key: str, name: str) -> Path:
+        """Path of an auxiliary file (e.g. the BM25 index) stored next to the vector index."""
+        return self.entry_path(key) / name
+
+    def save(self, key: str, vectorstore, digest: str, params: dict, artifacts: dict = None,
+             index_report: dict = None) -> Path:
+        """
+        Atomically persist ``vectorstore`` under ``key``.
+
+        ``artifacts`` maps file names to objects with a ``save(path)`` method;
+        they are written into the same entry and published with it.
+        ``index_report`` (mode, footprint, recall) is recorded in ``meta.json``.
+
+        Entries built from the same PDF with different parameters are
+        invalidated, then the cache is trimmed to its size budget.
+        """
+        final = self.entry_path(key)
+        tmp = Path(tempfile.mkdtemp(prefix=f".tmp-{key[:12]}-", dir=self.root))
+        try:
+            vectorstore.save_local(str(tmp))
+            for name, artifact in (artifacts or {}).items():
+                artifact.save(tmp / name)
+            meta = {
+                "version": INDEX_FORMAT_VERSION,
+                "digest": digest,
+                "params": params,
+                "created": time.time(),
+            }
+            if index_report is not None:
+                meta["index"] = index_report
+            with open(tmp / META_FILE, "w", encoding="utf-8") as f:
+                json.dump(meta, f, indent=2, sort_keys=True)
+            try:
+                os.rename(tmp, final)
+            except OSError:
+                # Another worker published the same entry first; keep theirs.
+                if not (final / META_FILE).exists():
+                    raise
+                shutil.rmtree(tmp, ignore_errors=True)
+        except Exception:
+            shutil.rmtree(tmp, ignore_errors=True)
+            raise
+        self._touch(key)
+        self._invalidate_stale(key, digest)
+        self.evict(keep=key)
+        return final
+
+    def remove(self, key: str):
+        shutil.rmtree(self.entry_path(key), ignore_errors=True)
+
+    def _touch(self, key: str):
+        try:
+            os.utime(self.entry_path(key) / META_FILE)
+        except OSError:
+            pass
+
+    def _entries(self):
+        for child in self.root.iterdir():
+            if child.is_dir() and not child.name.startswith(".") and (child / META_FILE).exists():
+                yield child
+
+    def _invalidate_stale(self, key: str, digest: str):
+        for entry in list(self._entries()):
+            if entry.name == key:
+                continue
+            meta = self.read_meta(entry.name)
+            if meta and meta.get("digest") == digest:
+                self.remove(entry.name)
+
+    def evict(self, keep: str = None):
+        """Delete least recently used entries until the cache fits in ``max_bytes``."""
+        with self._lock:
+            entries = []
+            total = 0
+            for entry in self._entries():
+                try:
+                    size = sum(p.stat().st_size for p in entry.rglob("*") if p.is_file())
+                    last_used = (entry / META_FILE).stat().st_mtime
+                except OSError:
+                    # Removed concurrently by another worker.
+                    continue
+                entries.append((last_used, size, entry))
+                total += size
+            entries.sort()
+            for _, size, entry in entries:
+                if total <= self.max_bytes:
+                    break
+                if entry.name == keep:
+                    continue
+                shutil.rmtree(entry, ignore_errors=True)
+                total -= size
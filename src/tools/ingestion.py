@@ -0,0 +1,165 @@
+import time
+import uuid
+from itertools import islice
+
+from langchain_community.vectorstores import FAISS
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from src import config
+from src.tools.bm25 import BM25Index
+from src.tools.embedding_pipeline import BatchedEmbedder
+from src.tools.parent_store import ParentStore
+from src.tools.pdf_extract import extract_pages
+
+
+def make_splitter() -> RecursiveCharacterTextSplitter:
+    return RecursiveCharacterTextSplitter(
+        chunk_size=config.CHUNK_SIZE,
+        chunk_overlap=config.CHUNK_OVERLAP,
+        separators=config.CHUNK_SEPARATORS,
+        # Chunk offsets within the page let the context builder merge overlaps exactly.
+        add_start_index=True,
+    )
+
+
+def make_parent_splitter() -> RecursiveCharacterTextSplitter:
+    """Splits a page into parent sections: whole pages, or paragraph-aligned blocks of long ones."""
+    return RecursiveCharacterTextSplitter(
+        chunk_size=config.PARENT_CHUNK_SIZE,
+        chunk_overlap=0,
+        separators=config.CHUNK_SEPARATORS,
+        add_start_index=True,
+    )
+
+
+def count_pages(pdf_path: str):
+    """Page count from the PDF's page tree (no text extraction), or None if unreadable."""
+    try:
+        from pypdf import PdfReader
+
+        return len(PdfReader(pdf_path).pages)
+    except Exception:
+        return None
+
+
+def iter_pages(pdf_path: str):
+    """Cleaned pages in order, extracted across config.EXTRACT_WORKERS processes."""
+    return extract_pages(pdf_path)
+
+
+def _batched(iterable, size: int):
+    it = iter(iterable)
+    while True:
+        batch = list(islice(it, size))
+        if not batch:
+            return
+        yield batch
+
+
+class StreamingIngestor:
+    """
+    Generator-based ingestion: lazy page load -> clean -> split -> embed in
+    batches -> add to the FAISS and BM25 indexes incrementally.
+
+    Only one batch of ``batch_chunks`` chunks (plus the page being split) is
+    held outside the indexes at a time, so peak memory does not grow with
+    the page count beyond the indexes themselves. ``on_progress`` is called
+    after every batch with a dict of pages, total_pages, chunks, elapsed_s,
+    pages_per_s and chunks_per_s.
+
+    With ``parent_child`` (default ``config.PARENT_CHILD``) each page is first
+    cut into parent sections, kept in ``self.parents``, and the embedded
+    chunks are split from those sections and linked to them.
+    """
+
+    def __init__(self, embedding, embedder: BatchedEmbedder = None, batch_chunks: int = None, on_progress=None,
+                 parent_child: bool = None):
+        self.embedding = embedding
+        self.embedder = embedder or BatchedEmbedder(embedding)
+        self.batch_chunks = batch_chunks or config.INGEST_BATCH_CHUNKS
+        self.on_progress = on_progress
+        self.parent_child = config.PARENT_CHILD if parent_child is None else parent_child
+        self.parents = None
+        self.stats = {}
+
+    def _chunks(self, pages, splitter, counter):
+        parent_splitter = make_parent_splitter() if self.parents is not None else None
+        for page in pages:
+            counter["pages"] += 1
+            if parent_splitter is None:
+                yield from splitter.split_documents([page])
+                continue
+            for parent in parent_splitter.split_documents([page]):
+                parent_id = str(uuid.uuid4())
+                offset = parent.metadata.get("start_index", 0)
+                self.parents.add(parent_id, parent.page_content, parent.metadata)
+                for child in splitter.split_documents([parent]):
+                    # Offsets stay relative to the page, so the context builder can merge children.
+                    child.metadata["start_index"] = offset + child.metadata.get("start_index", 0)
+                    child.metadata["parent_id"] = parent_id
+                    yield child
+
+    def ingest(self, pdf_path: str, pages=None):
+        """
+        Args:
+            pdf_path: PDF to ingest
+            pages: optional iterable of cleaned page Documents; defaults to ``iter_pages(pdf_path)``
+
+        Returns:
+            (vectorstore, bm25): the FAISS vectorstore and BM25 index over the same chunks;
+            the parent sections, if any, are left in ``self.parents``
+        """
+        start = time.perf_counter()
+        self.parents = ParentStore() if self.parent_child else None
+        total_pages = count_pages(pdf_path)
+        counter = {"pages": 0}
+        chunks_done = 0
+        vectorstore = None
+        bm25 = BM25Index()
+        splitter = make_splitter()
+        pages = iter_pages(pdf_path) if pages is None else pages
+
+        for batch in _batched(self._chunks(pages, splitter, counter), self.batch_chunks):
+            texts = [d.page_content for d in batch]
+            metadatas = [d.metadata for d in batch]
+            ids = [str(uuid.uuid4()) for _ in batch]
+            if self.parents is not None:
+                # The link lives in the parent store's table, not in every chunk's metadata.
+                for chunk_id, metadata in zip(ids, metadatas):
+                    self.parents.link(chunk_id, metadata.pop("parent_id"))
+            matrix = self.embedder.embed(texts)
+            if vectorstore is None:
+                vectorstore = FAISS.from_embeddings(
+                    text_embeddings=list(zip(texts, matrix)),
+                    embedding=self.embedding,
+                    metadatas=metadatas,
+                    ids=ids,
+                    normalize_L2=True,
+                )
+            else:
+                vectorstore.add_embeddings(list(zip(texts, matrix)), metadatas=metadatas, ids=ids)
+            bm25.add(texts, ids)
+            chunks_done += len(batch)
+            self._report(start, counter["pages"], total_pages, chunks_done)
+
+        if vectorstore is None:
+            raise ValueError(
+                "PDF produced no text. Please upload a text-based or OCR-processed PDF."
+            )
+        self._report(start, counter["pages"], total_pages, chunks_done)
+        return vectorstore, bm25
+
+    def _report(self, start, pages, total_pages, chunks):
+        elapsed = max(time.perf_counter() - start, 1e-9)
+        self.stats = {
+            "pages": pages,
+            "total_pages": total_pages,
+            "chunks": chunks,
+            "parents": len(self.parents) if self.parents is not None else None,
+            "elapsed_s": round(elapsed, 3),
+            "pages_per_s": round(pages / elapsed, 2),
+            "chunks_per_s": round(chunks / elapsed, 2),
+            "embeddings": dict(self.embedder.stats),
+        }
+        if self.on_progress is not None:
+            self.on_progress(dict(self.stats))
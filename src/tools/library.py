@@ -0,0 +1,289 @@
+import contextvars
+import heapq
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, List
+
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+from src import config
+from src.tools.bm25 import BM25Index
+from src.tools.index_cache import IndexCache, file_digest, index_cache_key
+from src.tools.parent_store import ParentStore, expand_parents
+from src.tools.PDF_tool import BM25_FILE, PARENTS_FILE, PDFTool, index_params, make_embeddings
+from src.tools.retrievers import reciprocal_rank_fusion
+from src.tools.vector_index import index_nbytes
+
+MANIFEST_FILE = "manifest.json"
+
+
+class _Shard:
+    """One loaded document: its vectorstore, BM25 index, parent sections and approximate resident size."""
+
+    def __init__(self, doc_id: str, vectorstore, bm25, parents=None):
+        self.doc_id = doc_id
+        self.vectorstore = vectorstore
+        self.bm25 = bm25
+        self.parents = parents
+        # Encoded vectors (smaller for quantized modes) plus the chunk text held by the docstore.
+        text_bytes = sum(len(d.page_content) for d in vectorstore.docstore._dict.values())
+        self.nbytes = index_nbytes(vectorstore.index) + text_bytes * 2 + (parents.nbytes if parents else 0)
+
+
+class DocumentLibrary:
+    """
+    A collection of PDFs queried together, with one index shard per document.
+
+    Documents are listed in ``<root>/manifest.json`` with their source path,
+    digest and index cache key. Shards load lazily from the ``IndexCache``
+    on first use and the least recently used ones are evicted once the
+    loaded total exceeds ``memory_budget_bytes``. Queries fan out over the
+    shards on a thread pool. Dense hits are heap-merged across shards; each
+    shard's lexical hits stay a separate ranking, since BM25 scores are only
+    comparable within one shard, and everything is fused with reciprocal
+    rank fusion.
+    """
+
+    def __init__(self, root: str = None, index_cache: IndexCache = None, embedding=None,
+                 memory_budget_bytes: int = None, max_workers: int = None):
+        self.root = root or config.LIBRARY_DIR
+        os.makedirs(self.root, exist_ok=True)
+        self.index_cache = index_cache or IndexCache()
+        self.embedding = embedding or make_embeddings()
+        self.memory_budget_bytes = (
+            config.LIBRARY_MEMORY_BUDGET_BYTES if memory_budget_bytes is None else memory_budget_bytes
+        )
+        self._pool = ThreadPoolExecutor(max_workers=max_workers or config.LIBRARY_WORKERS,
+                                        thread_name_prefix="library-shard")
+        self._lock = threading.Lock()
+        self._shard_locks = {}
+        self._shards = OrderedDict()
+        self.manifest = self._read_manifest()
+
+    # -- manifest ----------------------------------------------------------
+
+    @property
+    def manifest_path(self) -> str:
+        return os.path.join(self.root, MANIFEST_FILE)
+
+    def _read_manifest(self) -> dict:
+        try:
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {"revision": 0, "documents": {}}
+
+    def _write_manifest(self):
+        fd, tmp = tempfile.mkstemp(prefix=".manifest-", suffix=".json", dir=self.root)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(self.manifest, f, indent=2, sort_keys=True)
+        os.replace(tmp, self.manifest_path)
+
+    @property
+    def revision(self) -> int:
+        """Bumped on every add/remove, so caches built over the library can be keyed on it."""
+        return self.manifest["revision"]
+
+    def __len__(self):
+        with self._lock:
+            return len(self.manifest["documents"])
+
+    def documents(self) -> dict:
+        with self._lock:
+            return dict(self.manifest["documents"])
+
+    def add(self, pdf_path: str, name: str = None, digest: str = None) -> str:
+        """
+        Index ``pdf_path`` (through the index cache) and add it to the library.
+
+        Args:
+            digest: the PDF's SHA-256 if already known, to skip hashing it again
+
+        Returns:
+            the document id; adding the same bytes twice is a no-op
+        """
+        digest = digest or file_digest(pdf_path)
+        doc_id = digest[:16]
+        with self._lock:
+            if doc_id in self.manifest["documents"]:
+                return doc_id
+        tool = PDFTool(pdf_path, index_cache=self.index_cache, embedding=self.embedding, digest=digest)
+        shard = _Shard(doc_id, tool.vectorstore, tool.bm25, tool.parents)
+        with self._lock:
+            self.manifest["documents"][doc_id] = {
+                "name": name or os.path.basename(pdf_path),
+                "path": os.path.abspath(pdf_path),
+                "digest": digest,
+                "index_key": tool.index_key,
+                "chunks": shard.vectorstore.index.ntotal,
+                "added": time.time(),
+            }
+            self.manifest["revision"] += 1
+            self._write_manifest()
+            self._shards[doc_id] = shard
+            self._evict_locked(keep=doc_id)
+        return doc_id
+
+    def remove(self, doc_id: str):
+        with self._lock:
+            if self.manifest["documents"].pop(doc_id, None) is not None:
+                self.manifest["revision"] += 1
+                self._write_manifest()
+            self._shards.pop(doc_id, None)
+
+    # -- shards ------------------------------------------------------------
+
+    def _evict_locked(self, keep: str = None):
+        total = sum(s.nbytes for s in self._shards.values())
+        for doc_id in list(self._shards):
+            if total <= self.memory_budget_bytes:
+                break
+            if doc_id == keep:
+                continue
+            total -= self._shards.pop(doc_id).nbytes
+
+    def _load_shard(self, doc_id: str, entry: dict = None) -> _Shard:
+        with self._lock:
+            shard = self._shards.get(doc_id)
+            if shard is not None:
+                self._shards.move_to_end(doc_id)
+                return shard
+            entry = entry or self.manifest["documents"][doc_id]
+            shard_lock = self._shard_locks.setdefault(doc_id, threading.Lock())
+        with shard_lock:
+            with self._lock:
+                shard = self._shards.get(doc_id)
+            if shard is None:
+                params = index_params()
+                key = index_cache_key(entry["digest"], params)
+                vectorstore = self.index_cache.load(key, self.embedding, params)
+                if vectorstore is not None:
+                    bm25 = BM25Index.load(self.index_cache.artifact_path(key, BM25_FILE))
+                    bm25 = bm25 or BM25Index.from_vectorstore(vectorstore)
+                    parents = (ParentStore.load(self.index_cache.artifact_path(key, PARENTS_FILE))
+                               if config.PARENT_CHILD else None)
+                else:
+                    # Evicted from the disk cache or built with other settings: re-ingest.
+                    tool = PDFTool(entry["path"], index_cache=self.index_cache, embedding=self.embedding)
+                    vectorstore, bm25, parents = tool.vectorstore, tool.bm25, tool.parents
+                shard = _Shard(doc_id, vectorstore, bm25, parents)
+            with self._lock:
+                self._shards[doc_id] = shard
+                self._shards.move_to_end(doc_id)
+                self._evict_locked(keep=doc_id)
+        return shard
+
+    def loaded_bytes(self) -> int:
+        with self._lock:
+            return sum(s.nbytes for s in self._shards.values())
+
+    # -- search ------------------------------------------------------------
+
+    def _search_shard(self, doc_id: str, entry: dict, query: str, vector, fetch_k: int):
+        shard = self._load_shard(doc_id, entry)
+        name = entry.get("name", doc_id)
+        dense = []
+        for doc, distance in shard.vectorstore.similarity_search_with_score_by_vector(vector, k=fetch_k):
+            dense.append((1.0 - float(distance) / 2.0, doc.id, doc_id, doc))
+        lexical = []
+        for chunk_id, score in shard.bm25.search(query, fetch_k):
+            lexical.append((score, chunk_id, doc_id, shard.vectorstore.docstore.search(chunk_id)))
+        return dense, lexical, name, shard.parents
+
+    def search_with_timings(self, query: str, k: int = None, fetch_k: int = None):
+        """
+        Returns:
+            (documents, timings): top-k documents across all shards, each tagged with
+            ``library_doc_id`` and ``library_name``, and stage latencies in milliseconds
+        """
+        k = k or config.RETRIEVER_K
+        fetch_k = fetch_k or config.HYBRID_FETCH_K
+        start = time.perf_counter()
+        # Snapshot under the lock: add/remove may rewrite the manifest while shards are searched.
+        with self._lock:
+            entries = dict(self.manifest["documents"])
+        doc_ids = list(entries)
+        if not doc_ids:
+            return [], {"shards": 0, "total_ms": 0.0}
+        # Embed once and reuse the vector for every shard.
+        vector = self.embedding.embed_query(query)
+        embed_s = time.perf_counter() - start
+
+        fan_start = time.perf_counter()
+        context = contextvars.copy_context()
+        results = list(self._pool.map(
+            lambda d: context.copy().run(self._search_shard, d, entries[d], query, vector, fetch_k), doc_ids
+        ))
+        fan_s = time.perf_counter() - fan_start
+
+        merge_start = time.perf_counter()
+        names = {doc_id: name for doc_id, (_, _, name, _) in zip(doc_ids, results)}
+        parents = {doc_id: store for doc_id, (_, _, _, store) in zip(doc_ids, results) if store is not None}
+        # Cosine similarities share one embedding model, so dense hits merge globally.
+        dense = heapq.nlargest(fetch_k, (hit for d, _, _, _ in results for hit in d), key=lambda h: h[0])
+        # BM25 scores depend on each shard's own IDF and document lengths and do not
+        # compare across shards: every shard's lexical list is its own RRF ranking.
+        lexical = [l for _, l, _, _ in results if l]
+        hits = {}
+        for score, chunk_id, doc_id, doc in dense:
+            hits[chunk_id] = {"doc": doc, "doc_id": doc_id, "score": round(score, 4)}
+        for ranking in lexical:
+            for score, chunk_id, doc_id, doc in ranking:
+                hits.setdefault(chunk_id, {"doc": doc, "doc_id": doc_id})["bm25_score"] = round(score, 4)
+        if config.HYBRID_SEARCH:
+            fused = reciprocal_rank_fusion(
+                [[h[1] for h in dense]] + [[h[1] for h in ranking] for ranking in lexical], config.HYBRID_RRF_K)
+        else:
+            fused = [(h[1], h[0]) for h in dense]
+        docs = []
+        for chunk_id, rrf_score in fused[:k]:
+            hit = hits[chunk_id]
+            metadata = {
+                **hit["doc"].metadata,
+                "library_doc_id": hit["doc_id"],
+                "library_name": names[hit["doc_id"]],
+                "rrf_score": round(rrf_score, 6),
+            }
+            for key in ("score", "bm25_score"):
+                if key in hit:
+                    metadata[key] = hit[key]
+            docs.append(Document(id=chunk_id, page_content=hit["doc"].page_content, metadata=metadata))
+        if parents:
+            # Chunks were searched; answer from their parent sections in each document's store.
+            docs = expand_parents(docs, lambda d: parents.get(d.metadata["library_doc_id"]), config.PARENT_K)
+        merge_s = time.perf_counter() - merge_start
+
+        timings = {
+            "shards": len(doc_ids),
+            "embed_ms": round(embed_s * 1000, 2),
+            "fan_out_ms": round(fan_s * 1000, 2),
+            "merge_ms": round(merge_s * 1000, 2),
+            "total_ms": round((time.perf_counter() - start) * 1000, 2),
+            "loaded_mb": round(self.loaded_bytes() / (1024 * 1024), 2),
+        }
+        return docs, timings
+
+    def as_retriever(self, k: int = None) -> "LibraryRetriever":
+        return LibraryRetriever(library=self, k=k or config.RETRIEVER_K)
+
+
+class LibraryRetriever(BaseRetriever):
+    """Retriever over a ``DocumentLibrary``; drop-in for the single-PDF retriever in ``retrieve``."""
+
+    library: Any
+    k: int = config.RETRIEVER_K
+
+    def search_with_timings(self, query: str):
+        return self.library.search_with_timings(query, k=self.k)
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        return self.search_with_timings(query)[0]
@@ -0,0 +1,187 @@
+import asyncio
+import logging
+import queue
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Optional
+
+from langchain_core.language_models.llms import LLM
+from langchain_core.outputs import GenerationChunk
+
+from src import config
+
+log = logging.getLogger(__name__)
+
+_END = object()
+
+
+class _Call:
+    def __init__(self, prompt: str, stop, emit=None):
+        self.prompt = prompt
+        self.stop = list(stop) if stop else None
+        # Called with each streamed text chunk, then with _END.
+        self.emit = emit
+        self.future = Future()
+
+    @property
+    def key(self):
+        return (self.prompt, tuple(self.stop or ()))
+
+
+class MicroBatcher:
+    """
+    Coalesces concurrent LLM calls into batches for the local model.
+
+    Calls arriving within ``window_ms`` of each other are dispatched together,
+    so the model server (Ollama with ``OLLAMA_NUM_PARALLEL``) decodes them in
+    the same steps. A batch holds at most ``max_batch`` distinct calls, and
+    at most ``max_in_flight`` calls run at once across batches; while the
+    model is busy, new calls accumulate and go out as the next batch. Identical
+    prompts in a batch (the same grading call from two users asking the same
+    question) are sent once and the result is fanned out.
+    """
+
+    def __init__(self, llm, window_ms: float = None, max_batch: int = None, max_in_flight: int = None):
+        self.llm = llm
+        self.window_s = (config.LLM_BATCH_WINDOW_MS if window_ms is None else window_ms) / 1000
+        self.max_batch = max_batch or config.LLM_BATCH_MAX_SIZE
+        self.max_in_flight = max_in_flight or config.LLM_MAX_IN_FLIGHT
+        self._pending = []
+        self._free = self.max_in_flight
+        self._cond = threading.Condition()
+        self._executor = ThreadPoolExecutor(self.max_in_flight, thread_name_prefix="llm-batch")
+        self._thread = None
+        self.stats = {"calls": 0, "batches": 0, "dispatched": 0, "coalesced": 0, "largest_batch": 0}
+
+    def submit(self, prompt: str, stop=None, emit=None) -> _Call:
+        call = _Call(prompt, stop, emit)
+        with self._cond:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="llm-batcher", daemon=True)
+                self._thread.start()
+            self.stats["calls"] += 1
+            self._pending.append(call)
+            self._cond.notify_all()
+        return call
+
+    def _take_batch(self):
+        """Wait for a free slot and a pending call, let the window fill, then take one batch."""
+        with self._cond:
+            while not (self._pending and self._free):
+                self._cond.wait()
+            size = min(self.max_batch, self._free)
+            deadline = time.monotonic() + self.window_s
+            while len({c.key for c in self._pending}) < size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            groups = OrderedDict()
+            rest = []
+            for call in self._pending:
+                if call.key in groups:
+                    groups[call.key].append(call)
+                elif len(groups) < size:
+                    groups[call.key] = [call]
+                else:
+                    rest.append(call)
+            self._pending = rest
+            self._free -= len(groups)
+        self.stats["batches"] += 1
+        self.stats["dispatched"] += len(groups)
+        self.stats["coalesced"] += sum(len(calls) - 1 for calls in groups.values())
+        self.stats["largest_batch"] = max(self.stats["largest_batch"], len(groups))
+        return groups
+
+    def _run(self):
+        while True:
+            for calls in self._take_batch().values():
+                self._executor.submit(self._dispatch, calls)
+
+    def _dispatch(self, calls):
+        call = calls[0]
+        try:
+            if any(c.emit is not None for c in calls):
+                parts = []
+                for chunk in self.llm.stream(call.prompt, stop=call.stop):
+                    parts.append(chunk)
+                    for c in calls:
+                        if c.emit is not None:
+                            c.emit(chunk)
+                text = "".join(parts)
+            else:
+                text = self.llm.invoke(call.prompt, stop=call.stop)
+            for c in calls:
+                c.future.set_result(text)
+        except Exception as exc:
+            log.warning("llm batch call failed: %r", exc)
+            for c in calls:
+                c.future.set_exception(exc)
+        finally:
+            for c in calls:
+                if c.emit is not None:
+                    c.emit(_END)
+            with self._cond:
+                self._free += 1
+                self._cond.notify_all()
+
+
+class BatchingLLM(LLM):
+    """
+    LLM that routes every call of ``inner`` through a ``MicroBatcher``.
+
+    Drop-in for the model passed to ``init_components``; sync, async and
+    streaming calls from any number of threads or event loops share one batcher.
+    """
+
+    inner: Any = None
+    window_ms: Optional[float] = None
+    max_batch: Optional[int] = None
+    max_in_flight: Optional[int] = None
+    batcher: Any = None
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.batcher = MicroBatcher(self.inner, self.window_ms, self.max_batch, self.max_in_flight)
+
+    @property
+    def _llm_type(self) -> str:
+        return f"batching-{getattr(self.inner, '_llm_type', 'llm')}"
+
+    def _call(self, prompt: str, stop=None, run_manager=None, **kwargs) -> str:
+        return self.batcher.submit(prompt, stop).future.result()
+
+    async def _acall(self, prompt: str, stop=None, run_manager=None, **kwargs) -> str:
+        return await asyncio.wrap_future(self.batcher.submit(prompt, stop).future)
+
+    def _stream(self, prompt: str, stop=None, run_manager=None, **kwargs):
+        chunks = queue.Queue()
+        call = self.batcher.submit(prompt, stop, emit=chunks.put)
+        while True:
+            text = chunks.get()
+            if text is _END:
+                break
+            chunk = GenerationChunk(text=text)
+            if run_manager is not None:
+                run_manager.on_llm_new_token(text, chunk=chunk)
+            yield chunk
+        # Surfaces a failed call.
+        call.future.result()
+
+    async def _astream(self, prompt: str, stop=None, run_manager=None, **kwargs):
+        loop = asyncio.get_running_loop()
+        chunks = asyncio.Queue()
+        call = self.batcher.submit(
+            prompt, stop, emit=lambda text: loop.call_soon_threadsafe(chunks.put_nowait, text)
+        )
+        while True:
+            text = await chunks.get()
+            if text is _END:
+                break
+            chunk = GenerationChunk(text=text)
+            if run_manager is not None:
+                await run_manager.on_llm_new_token(text, chunk=chunk)
+            yield chunk
+        await asyncio.wrap_future(call.future)
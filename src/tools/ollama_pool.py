@@ -0,0 +1,175 @@
+import asyncio
+import queue
+import threading
+
+import httpx
+from langchain_ollama import OllamaEmbeddings, OllamaLLM
+from ollama import AsyncClient
+
+from src import config
+
+_END = object()
+
+
+class _Failure:
+    def __init__(self, exc):
+        self.exc = exc
+
+
+class OllamaPool:
+    """
+    One connection-pooled async Ollama client shared by every model wrapper
+    in the process, behind a global concurrency semaphore.
+
+    The client lives on a dedicated event-loop thread, so sync callers
+    (Streamlit scripts, thread pools) and async callers on any event loop all
+    reuse the same keep-alive connections. At most ``max_concurrency``
+    requests reach the Ollama server at once; the rest wait in FIFO order.
+    """
+
+    def __init__(self, host: str = None, max_concurrency: int = None, max_connections: int = None,
+                 timeout: float = None):
+        self.host = host or config.OLLAMA_HOST or None
+        self.max_concurrency = max_concurrency or config.OLLAMA_MAX_CONCURRENCY
+        self.max_connections = max_connections or config.OLLAMA_MAX_CONNECTIONS
+        self.timeout = timeout or config.OLLAMA_TIMEOUT_SECONDS
+        self._lock = threading.Lock()
+        self._loop = None
+        self._client = None
+        self._semaphore = None
+        self.stats = {"requests": 0, "in_flight": 0, "waiting": 0, "peak_in_flight": 0}
+
+    def _start(self):
+        with self._lock:
+            if self._loop is not None:
+                return
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name="ollama-pool", daemon=True).start()
+
+            async def init():
+                # Created on the pool's loop: httpx connections are bound to the loop that opened them.
+                self._client = AsyncClient(
+                    host=self.host,
+                    timeout=self.timeout,
+                    limits=httpx.Limits(
+                        max_connections=self.max_connections,
+                        max_keepalive_connections=self.max_connections,
+                    ),
+                )
+                self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+            asyncio.run_coroutine_threadsafe(init(), loop).result()
+            self._loop = loop
+
+    async def _guarded(self, make_coro):
+        self.stats["waiting"] += 1
+        async with self._semaphore:
+            self.stats["waiting"] -= 1
+            self.stats["requests"] += 1
+            self.stats["in_flight"] += 1
+            self.stats["peak_in_flight"] = max(self.stats["peak_in_flight"], self.stats["in_flight"])
+            try:
+                return await make_coro(self._client)
+            finally:
+                self.stats["in_flight"] -= 1
+
+    def submit(self, make_coro):
+        """Schedule ``make_coro(client)`` on the pool loop; returns a concurrent.futures.Future."""
+        self._start()
+        return asyncio.run_coroutine_threadsafe(self._guarded(make_coro), self._loop)
+
+    def call(self, method: str, **kwargs):
+        """Blocking request, e.g. ``call("embed", model=..., input=[...])``."""
+        return self.submit(lambda client: getattr(client, method)(**kwargs)).result()
+
+    async def acall(self, method: str, **kwargs):
+        return await asyncio.wrap_future(self.submit(lambda client: getattr(client, method)(**kwargs)))
+
+    def _pump(self, params: dict, emit):
+        async def run(client):
+            try:
+                async for part in await client.generate(**params):
+                    emit(part)
+            except Exception as exc:
+                emit(_Failure(exc))
+            finally:
+                emit(_END)
+
+        return self.submit(run)
+
+    def generate_stream(self, params: dict):
+        """Stream ``generate`` response parts to a sync caller."""
+        parts = queue.Queue()
+        future = self._pump(params, parts.put)
+        try:
+            while True:
+                item = parts.get()
+                if item is _END:
+                    return
+                if isinstance(item, _Failure):
+                    raise item.exc
+                yield item
+        finally:
+            # Abandoned by the consumer: stop the request and free its slot.
+            future.cancel()
+
+    async def agenerate_stream(self, params: dict):
+        """Stream ``generate`` response parts to an async caller on any event loop."""
+        loop = asyncio.get_running_loop()
+        parts = asyncio.Queue()
+
+        def emit(item):
+            try:
+                loop.call_soon_threadsafe(parts.put_nowait, item)
+            except RuntimeError:
+                pass  # caller's loop already closed
+
+        future = self._pump(params, emit)
+        try:
+            while True:
+                item = await parts.get()
+                if item is _END:
+                    return
+                if isinstance(item, _Failure):
+                    raise item.exc
+                yield item
+        finally:
+            future.cancel()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> OllamaPool:
+    """Process-wide ``OllamaPool``."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = OllamaPool()
+        return _pool
+
+
+class PooledOllamaLLM(OllamaLLM):
+    """``OllamaLLM`` whose sync and async requests all go through the shared ``OllamaPool``."""
+
+    def _create_generate_stream(self, prompt, stop=None, **kwargs):
+        yield from get_pool().generate_stream(self._generate_params(prompt, stop=stop, **kwargs))
+
+    async def _acreate_generate_stream(self, prompt, stop=None, **kwargs):
+        async for part in get_pool().agenerate_stream(self._generate_params(prompt, stop=stop, **kwargs)):
+            yield part
+
+
+class PooledOllamaEmbeddings(OllamaEmbeddings):
+    """``OllamaEmbeddings`` whose requests go through the shared ``OllamaPool``."""
+
+    def _embed_params(self, texts):
+        return dict(model=self.model, input=texts, dimensions=self.dimensions,
+                    options=self._default_params, keep_alive=self.keep_alive)
+
+    def embed_documents(self, texts):
+        return get_pool().call("embed", **self._embed_params(texts))["embeddings"]
+
+    async def aembed_documents(self, texts):
+        return (await get_pool().acall("embed", **self._embed_params(texts)))["embeddings"]
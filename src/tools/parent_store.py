@@ -0,0 +1,122 @@
+import json
+import os
+
+from langchain_core.documents import Document
+
+# Child metadata merged into the parent: the best value over the parent's hits.
+_SCORE_KEYS = ("score", "bm25_score", "rrf_score")
+
+
+class ParentStore:
+    """
+    Parent sections of one PDF and the child -> parent relationship table.
+
+    Child chunks are what gets embedded and searched; each maps to the parent
+    section (a page, or a paragraph-aligned block of a long page) it was split
+    from. Parents are held once, by position, with their text and page
+    metadata; children map to a parent position. The whole store round-trips
+    through one compact JSON file next to the vector index, so loading a
+    cached index does not re-split anything.
+    """
+
+    def __init__(self):
+        self.ids = []
+        self.texts = []
+        self.metadatas = []
+        self._positions = {}
+        self.child_parent = {}
+
+    def __len__(self):
+        return len(self.ids)
+
+    def add(self, parent_id: str, text: str, metadata: dict):
+        self._positions[parent_id] = len(self.ids)
+        self.ids.append(parent_id)
+        self.texts.append(text)
+        self.metadatas.append(dict(metadata))
+
+    def link(self, child_id: str, parent_id: str):
+        self.child_parent[child_id] = self._positions[parent_id]
+
+    def parent_of(self, child_id: str):
+        """Parent Document of a child chunk id, or None if the child is unknown."""
+        pos = self.child_parent.get(child_id)
+        if pos is None:
+            return None
+        return Document(id=self.ids[pos], page_content=self.texts[pos], metadata=dict(self.metadatas[pos]))
+
+    @property
+    def nbytes(self) -> int:
+        return sum(len(t) for t in self.texts) * 2
+
+    def expand(self, children, k: int = None):
+        """Ranked child hits replaced by their de-duplicated parents; see ``expand_parents``."""
+        return expand_parents(children, lambda _child: self, k)
+
+    def save(self, path):
+        ids = list(self.child_parent)
+        payload = {
+            "ids": self.ids,
+            "texts": self.texts,
+            "metadatas": self.metadatas,
+            # Children point at parent positions rather than ids, keeping the file small.
+            "children": ids,
+            "child_parents": [self.child_parent[c] for c in ids],
+        }
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(payload, f, separators=(",", ":"))
+
+    @classmethod
+    def load(cls, path):
+        """Load a saved store, or return None if ``path`` is missing or unreadable."""
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                payload = json.load(f)
+        except (OSError, ValueError):
+            return None
+        store = cls()
+        store.ids = payload["ids"]
+        store.texts = payload["texts"]
+        store.metadatas = payload["metadatas"]
+        store._positions = {parent_id: pos for pos, parent_id in enumerate(store.ids)}
+        store.child_parent = dict(zip(payload["children"], payload["child_parents"]))
+        return store
+
+
+def expand_parents(children, store_for, k: int = None):
+    """
+    Replace ranked child hits by their de-duplicated parents.
+
+    ``store_for(child)`` returns the ``ParentStore`` that holds the child's
+    parent (a library has one per document), or None. Parents keep the rank
+    of their best child and the best ``score``, ``bm25_score`` and
+    ``rrf_score`` among their children; ``child_hits`` counts the children
+    that matched. Other child metadata added by the retriever (e.g. the
+    library's document tags) is carried over. Children with no known parent
+    are passed through unchanged.
+
+    Returns:
+        at most ``k`` documents, best first
+    """
+    parents = {}
+    order = []
+    for child in children:
+        store = store_for(child)
+        parent = store.parent_of(getattr(child, "id", None)) if store is not None else None
+        if parent is None:
+            order.append(child)
+            continue
+        held = parents.get(parent.id)
+        if held is None:
+            extra = {key: v for key, v in child.metadata.items() if key not in parent.metadata}
+            parent.metadata.update(extra, child_hits=1)
+            parents[parent.id] = parent
+            order.append(parent)
+            continue
+        held.metadata["child_hits"] += 1
+        for key in _SCORE_KEYS:
+            if key in child.metadata:
+                held.metadata[key] = max(held.metadata.get(key, child.metadata[key]), child.metadata[key])
+    return order[:k] if k else order
@@ -0,0 +1,164 @@
+import re
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+
+from langchain_core.documents import Document
+
+from src import config
+
+# Compiled once per process instead of on every page.
+_PAGE_NUMBER_RE = re.compile(r"Page\s*\d+\s*(of\s*\d+)?", re.IGNORECASE)
+_RULE_RE = re.compile(r"^\s*-+\s*$", re.MULTILINE)
+_EDGE_NUMBER_RE = re.compile(r"^\W*\d+\W*|\W*\d+\W*$")
+_SPACE_RE = re.compile(r"\s+")
+
+
+def clean_page_text(txt: str) -> str:
+    # tweak to remove repeated page headers/footers, common line patterns, or "Page X of Y"
+    txt = _PAGE_NUMBER_RE.sub("", txt)
+    txt = _RULE_RE.sub("", txt)
+    return txt.strip()
+
+
+def _line_signature(line: str) -> str:
+    # Only a leading or trailing page number is ignored: "Safety Manual - 12" and
+    # "Safety Manual - 13" match, while "Section 3.1" and "Section 4.2" do not.
+    return _EDGE_NUMBER_RE.sub("", _SPACE_RE.sub(" ", line).strip()).lower()
+
+
+def _edge_lines(text: str, n: int):
+    lines = [l for l in text.splitlines() if l.strip()]
+    return lines[:n] + lines[-n:] if len(lines) > 2 * n else lines
+
+
+class RepeatedLineFilter:
+    """
+    Detects running headers and footers as lines that recur at the top or
+    bottom of many pages, and strips them.
+
+    The first ``sample_pages`` pages are buffered to learn the repeated
+    lines; after that pages stream through without buffering.
+    """
+
+    def __init__(self, sample_pages: int = None, edge_lines: int = None, min_ratio: float = None):
+        self.sample_pages = sample_pages or config.HEADER_SAMPLE_PAGES
+        self.edge_lines = edge_lines or config.HEADER_EDGE_LINES
+        self.min_ratio = config.HEADER_MIN_RATIO if min_ratio is None else min_ratio
+        self.repeated = None
+
+    def _learn(self, texts):
+        counts = Counter()
+        for text in texts:
+            counts.update({_line_signature(l) for l in _edge_lines(text, self.edge_lines)})
+        # Need a few pages before anything can count as "repeated".
+        if len(texts) < 3:
+            self.repeated = set()
+            return
+        threshold = max(2, int(len(texts) * self.min_ratio + 0.999))
+        self.repeated = {sig for sig, c in counts.items() if sig and c >= threshold}
+
+    def strip(self, text: str) -> str:
+        if not self.repeated:
+            return text
+        lines = text.splitlines()
+        non_empty = [i for i, l in enumerate(lines) if l.strip()]
+        edges = set(non_empty[: self.edge_lines] + non_empty[-self.edge_lines:])
+        kept = [l for i, l in enumerate(lines) if i not in edges or _line_signature(l) not in self.repeated]
+        return "\n".join(kept).strip()
+
+    def apply(self, pages):
+        """Filter an iterable of (page_number, text) pairs, preserving order."""
+        buffer = []
+        it = iter(pages)
+        for item in it:
+            buffer.append(item)
+            if len(buffer) >= self.sample_pages:
+                break
+        self._learn([text for _, text in buffer])
+        for page_no, text in buffer:
+            yield page_no, self.strip(text)
+        for page_no, text in it:
+            yield page_no, self.strip(text)
+
+
+def _extract_range(pdf_path: str, start: int, stop: int, labels):
+    """
+    Worker: extract and clean pages [start, stop). Runs in a separate process.
+
+    ``labels`` holds the labels of exactly those pages: ``reader.page_labels``
+    walks the whole document, so it is computed once by the caller.
+    """
+    from pypdf import PdfReader
+
+    reader = PdfReader(pdf_path)
+    out = []
+    for offset, i in enumerate(range(start, min(stop, len(reader.pages)))):
+        text = clean_page_text(reader.pages[i].extract_text() or "")
+        out.append((i, labels[offset] if offset < len(labels) else str(i + 1), text))
+    return out
+
+
+def _iter_ranges(pdf_path: str, total: int, labels, workers: int, pages_per_task: int):
+    if workers <= 1 or total < config.EXTRACT_PARALLEL_MIN_PAGES:
+        for start in range(0, total, pages_per_task):
+            stop = start + pages_per_task
+            yield from _extract_range(pdf_path, start, stop, labels[start:stop])
+        return
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # Keep a bounded window of ranges in flight so extraction cannot run
+        # arbitrarily far ahead of a slow consumer (e.g. embedding).
+        pending = deque()
+        starts = iter(range(0, total, pages_per_task))
+        for start in starts:
+            stop = start + pages_per_task
+            pending.append(pool.submit(_extract_range, pdf_path, start, stop, labels[start:stop]))
+            if len(pending) >= workers * 2:
+                break
+        while pending:
+            yield from pending.popleft().result()
+            nxt = next(starts, None)
+            if nxt is not None:
+                stop = nxt + pages_per_task
+                pending.append(pool.submit(_extract_range, pdf_path, nxt, stop, labels[nxt:stop]))
+
+
+def extract_pages(pdf_path: str, workers: int = None, pages_per_task: int = None, strip_repeated: bool = True):
+    """
+    Extract, clean and yield the PDF's pages as Documents, in page order.
+
+    Page ranges of ``pages_per_task`` pages are spread across a process pool
+    of ``workers`` processes (in-process when ``workers`` is 1 or the PDF is
+    small). Running headers/footers are removed when ``strip_repeated`` is set.
+    Metadata matches PyPDFLoader's: source, page (0-based), page_label and total_pages.
+    """
+    from pypdf import PdfReader
+
+    workers = workers or config.EXTRACT_WORKERS
+    pages_per_task = pages_per_task or config.EXTRACT_PAGES_PER_TASK
+    try:
+        reader = PdfReader(pdf_path)
+        total = len(reader.pages)
+        page_labels = reader.page_labels
+    except Exception as exc:
+        raise ValueError(
+            f"Failed to read PDF. Ensure it is not password-protected and is text-based. ({exc})"
+        ) from exc
+
+    labels = {}
+
+    def pages():
+        for page_no, label, text in _iter_ranges(pdf_path, total, page_labels, workers, pages_per_task):
+            labels[page_no] = label
+            yield page_no, text
+
+    stream = RepeatedLineFilter().apply(pages()) if strip_repeated else pages()
+    for page_no, text in stream:
+        yield Document(
+            page_content=text,
+            metadata={
+                "source": pdf_path,
+                "page": page_no,
+                "page_label": labels.pop(page_no, str(page_no + 1)),
+                "total_pages": total,
+            },
+        )
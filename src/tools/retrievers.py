@@ -0,0 +1,167 @@
+import contextvars
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, List
+
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+from src import config
+from src.tracing import span
+
+# Shared by all hybrid retrievers so each query avoids spinning up threads.
+_SEARCH_POOL = ThreadPoolExecutor(max_workers=8, thread_name_prefix="hybrid-search")
+
+
+def with_score(doc: Document, score: float, key: str = "score") -> Document:
+    """Copy of ``doc`` with ``score`` in its metadata; docstore documents are never mutated."""
+    return Document(id=doc.id, page_content=doc.page_content, metadata={**doc.metadata, key: score})
+
+
+class ScoredRetriever(BaseRetriever):
+    """
+    Dense FAISS retriever that records each hit's cosine similarity in
+    ``metadata["score"]`` so downstream nodes can act on it.
+
+    The index must be built with ``normalize_L2=True``: FAISS then returns
+    squared L2 distances between unit vectors, and cosine = 1 - d / 2.
+    """
+
+    vectorstore: Any
+    k: int = config.RETRIEVER_K
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        pairs = self.vectorstore.similarity_search_with_score(query, k=self.k)
+        return [with_score(doc, round(1.0 - float(distance) / 2.0, 4)) for doc, distance in pairs]
+
+
+def reciprocal_rank_fusion(rankings, rrf_k: int = 60):
+    """
+    Merge ranked id lists: each id scores sum(1 / (rrf_k + rank)) over the lists it appears in.
+
+    Returns:
+        list of (id, fused score), best first
+    """
+    fused = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, start=1):
+            fused[doc_id] = fused.get(doc_id, 0.0) + 1.0 / (rrf_k + rank)
+    return sorted(fused.items(), key=lambda item: item[1], reverse=True)
+
+
+class HybridRetriever(BaseRetriever):
+    """
+    Runs dense FAISS search and BM25 lexical search concurrently and merges
+    them with reciprocal rank fusion.
+
+    Hits keep their dense cosine in ``metadata["score"]`` when the dense
+    search found them, and their BM25 score in ``metadata["bm25_score"]``
+    when the lexical search did.
+    """
+
+    vectorstore: Any
+    bm25: Any
+    k: int = config.RETRIEVER_K
+    fetch_k: int = config.HYBRID_FETCH_K
+    rrf_k: int = config.HYBRID_RRF_K
+
+    def _dense(self, query: str):
+        start = time.perf_counter()
+        with span("dense_search", kind="retrieval", fetch_k=self.fetch_k):
+            pairs = self.vectorstore.similarity_search_with_score(query, k=self.fetch_k)
+        hits = [(doc.id, doc, 1.0 - float(distance) / 2.0) for doc, distance in pairs]
+        return hits, time.perf_counter() - start
+
+    def _lexical(self, query: str):
+        start = time.perf_counter()
+        with span("lexical_search", kind="retrieval", fetch_k=self.fetch_k):
+            hits = self.bm25.search(query, self.fetch_k)
+        return hits, time.perf_counter() - start
+
+    def search_with_timings(self, query: str):
+        """
+        Returns:
+            (documents, timings): fused top-k documents and per-stage latencies in milliseconds
+        """
+        start = time.perf_counter()
+        # Each search runs in a copy of the caller's context so its spans join the request trace.
+        dense_future = _SEARCH_POOL.submit(contextvars.copy_context().run, self._dense, query)
+        lexical_future = _SEARCH_POOL.submit(contextvars.copy_context().run, self._lexical, query)
+        dense, dense_s = dense_future.result()
+        lexical, lexical_s = lexical_future.result()
+
+        fuse_start = time.perf_counter()
+        dense_docs = {doc_id: (doc, score) for doc_id, doc, score in dense}
+        bm25_scores = dict(lexical)
+        fused = reciprocal_rank_fusion(
+            [[doc_id for doc_id, _, _ in dense], [doc_id for doc_id, _ in lexical]], self.rrf_k
+        )[: self.k]
+        docs = []
+        for doc_id, rrf_score in fused:
+            if doc_id in dense_docs:
+                doc, cosine = dense_docs[doc_id]
+                metadata = {**doc.metadata, "score": round(cosine, 4)}
+            else:
+                doc = self.vectorstore.docstore.search(doc_id)
+                metadata = dict(doc.metadata)
+            if doc_id in bm25_scores:
+                metadata["bm25_score"] = round(bm25_scores[doc_id], 4)
+            metadata["rrf_score"] = round(rrf_score, 6)
+            docs.append(Document(id=doc_id, page_content=doc.page_content, metadata=metadata))
+        fusion_s = time.perf_counter() - fuse_start
+
+        timings = {
+            "dense_ms": round(dense_s * 1000, 2),
+            "lexical_ms": round(lexical_s * 1000, 2),
+            "fusion_ms": round(fusion_s * 1000, 2),
+            "total_ms": round((time.perf_counter() - start) * 1000, 2),
+        }
+        return docs, timings
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        return self.search_with_timings(query)[0]
+
+
+class ParentRetriever(BaseRetriever):
+    """
+    Searches child chunks with ``child`` and returns their parent sections.
+
+    Children are small, so the search is precise; the generator gets the
+    de-duplicated parents (at most ``k``) from the ``ParentStore``, so it
+    sees whole sections instead of fragments.
+    """
+
+    child: Any
+    parents: Any
+    k: int = config.PARENT_K
+
+    def search_with_timings(self, query: str):
+        """
+        Returns:
+            (documents, timings): the child retriever's timings plus ``parents_ms``
+            and the number of child hits behind the returned parents
+        """
+        start = time.perf_counter()
+        if hasattr(self.child, "search_with_timings"):
+            children, timings = self.child.search_with_timings(query)
+        else:
+            children, timings = self.child.invoke(query), {}
+        expand_start = time.perf_counter()
+        docs = self.parents.expand(children, self.k)
+        timings = {
+            **timings,
+            "children": len(children),
+            "parents_ms": round((time.perf_counter() - expand_start) * 1000, 2),
+            "total_ms": round((time.perf_counter() - start) * 1000, 2),
+        }
+        return docs, timings
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        return self.search_with_timings(query)[0]
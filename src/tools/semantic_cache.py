@@ -0,0 +1,198 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+import numpy as np
+from langchain_core.documents import Document
+
+from src import config
+
+
+def _normalize(vector) -> np.ndarray:
+    v = np.asarray(vector, dtype=np.float32)
+    norm = float(np.linalg.norm(v))
+    return v / norm if norm > 0 else v
+
+
+class SemanticAnswerCache:
+    """
+    Per-document cache of answers keyed by question embedding.
+
+    A new question is embedded and compared by cosine similarity to the
+    questions already answered for the document; a neighbour at or above
+    ``threshold`` returns its stored generation and supporting chunks.
+
+    Entries expire after ``ttl_seconds`` and the least recently used are
+    evicted beyond ``max_entries``. The cache is persisted in SQLite at
+    ``<root>/<digest>.sqlite3``, one row per entry, so an answer is one
+    INSERT and a hit one UPDATE (its LRU position survives restarts). The
+    file records the ``index_key`` it was built against; if the document's
+    index changes, the stored answers are dropped. Vectors are also kept in
+    memory for the similarity search.
+    """
+
+    def __init__(self, digest: str, index_key: str, embedding, root: str = None,
+                 threshold: float = None, ttl_seconds: int = None, max_entries: int = None):
+        self.digest = digest
+        self.index_key = index_key
+        self.embedding = embedding
+        self.root = root or config.ANSWER_CACHE_DIR
+        self.threshold = config.ANSWER_CACHE_THRESHOLD if threshold is None else threshold
+        self.ttl_seconds = config.ANSWER_CACHE_TTL_SECONDS if ttl_seconds is None else ttl_seconds
+        self.max_entries = max_entries or config.ANSWER_CACHE_MAX_ENTRIES
+        self.path = os.path.join(self.root, f"{digest}.sqlite3")
+        self._lock = threading.Lock()
+        self._entries = []
+        self._matrix = None
+        self._load()
+
+    # -- persistence -------------------------------------------------------
+
+    def _load(self):
+        os.makedirs(self.root, exist_ok=True)
+        try:
+            # Superseded by the SQLite file; answers are cheap to rebuild.
+            os.remove(os.path.join(self.root, f"{self.digest}.json"))
+        except OSError:
+            pass
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # A cache: losing the last write on power loss is fine, an fsync per answer is not.
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            " id INTEGER PRIMARY KEY, question TEXT NOT NULL, vector BLOB NOT NULL, generation TEXT NOT NULL,"
+            " documents TEXT NOT NULL, created REAL NOT NULL, last_used REAL NOT NULL, hits INTEGER NOT NULL)"
+        )
+        row = self._conn.execute("SELECT value FROM meta WHERE key = 'index_key'").fetchone()
+        if row is None or row[0] != self.index_key:
+            # The document was re-indexed; answers may cite chunks that no longer exist.
+            self._conn.execute("DELETE FROM entries")
+            self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('index_key', ?)", (self.index_key,))
+        rows = self._conn.execute(
+            "SELECT id, question, vector, generation, documents, created, last_used, hits FROM entries ORDER BY id"
+        ).fetchall()
+        self._entries = [
+            {"id": r[0], "question": r[1], "vector": np.frombuffer(r[2], dtype=np.float32), "generation": r[3],
+             "documents": json.loads(r[4]), "created": r[5], "last_used": r[6], "hits": r[7]}
+            for r in rows
+        ]
+        self._purge_expired(time.time())
+        self._conn.commit()
+        self._rebuild_matrix()
+
+    def _delete(self, entries):
+        if entries:
+            self._conn.executemany("DELETE FROM entries WHERE id = ?", [(e["id"],) for e in entries])
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    # -- bookkeeping -------------------------------------------------------
+
+    def _rebuild_matrix(self):
+        if self._entries:
+            self._matrix = np.vstack([e["vector"] for e in self._entries])
+        else:
+            self._matrix = None
+
+    def _purge_expired(self, now: float) -> bool:
+        if self.ttl_seconds <= 0:
+            return False
+        kept = [e for e in self._entries if now - e["created"] < self.ttl_seconds]
+        if len(kept) == len(self._entries):
+            return False
+        self._delete([e for e in self._entries if now - e["created"] >= self.ttl_seconds])
+        self._entries = kept
+        return True
+
+    def _evict_lru(self):
+        if len(self._entries) > self.max_entries:
+            self._entries.sort(key=lambda e: e["last_used"])
+            self._delete(self._entries[: len(self._entries) - self.max_entries])
+            del self._entries[: len(self._entries) - self.max_entries]
+
+    # -- public API --------------------------------------------------------
+
+    def embed(self, question: str) -> np.ndarray:
+        return _normalize(self.embedding.embed_query(question))
+
+    def lookup(self, question: str, vector=None):
+        """
+        Args:
+            question: incoming user question
+            vector: its normalized embedding, if already computed
+
+        Returns:
+            (hit, vector): hit is a dict with generation, documents, question and
+            similarity, or None; vector can be passed on to ``put``.
+        """
+        vector = self.embed(question) if vector is None else vector
+        with self._lock:
+            now = time.time()
+            if self._purge_expired(now):
+                self._conn.commit()
+                self._rebuild_matrix()
+            if self._matrix is None:
+                return None, vector
+            sims = self._matrix @ vector
+            best = int(np.argmax(sims))
+            similarity = float(sims[best])
+            if similarity < self.threshold:
+                return None, vector
+            entry = self._entries[best]
+            entry["last_used"] = now
+            entry["hits"] += 1
+            self._conn.execute("UPDATE entries SET last_used = ?, hits = ? WHERE id = ?",
+                               (now, entry["hits"], entry["id"]))
+            self._conn.commit()
+            hit = {
+                "question": entry["question"],
+                "generation": entry["generation"],
+                "documents": [
+                    Document(page_content=d["page_content"], metadata=d.get("metadata", {}))
+                    for d in entry["documents"]
+                ],
+                "similarity": round(similarity, 4),
+            }
+        return hit, vector
+
+    def put(self, question: str, generation: str, documents, vector=None):
+        vector = self.embed(question) if vector is None else vector
+        now = time.time()
+        entry = {
+            "question": question,
+            "vector": np.asarray(vector, dtype=np.float32),
+            "generation": generation,
+            "documents": [
+                {"page_content": d.page_content, "metadata": dict(getattr(d, "metadata", {}) or {})}
+                for d in documents
+            ],
+            "created": now,
+            "last_used": now,
+            "hits": 0,
+        }
+        with self._lock:
+            self._purge_expired(now)
+            cursor = self._conn.execute(
+                "INSERT INTO entries (question, vector, generation, documents, created, last_used, hits)"
+                " VALUES (?, ?, ?, ?, ?, ?, 0)",
+                (question, entry["vector"].tobytes(), generation, json.dumps(entry["documents"], default=str),
+                 now, now),
+            )
+            entry["id"] = cursor.lastrowid
+            self._entries.append(entry)
+            self._evict_lru()
+            self._conn.commit()
+            self._rebuild_matrix()
+
+    def clear(self):
+        with self._lock:
+            self._entries = []
+            self._matrix = None
+            self._conn.execute("DELETE FROM entries")
+            self._conn.commit()
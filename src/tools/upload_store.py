@@ -0,0 +1,134 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+
+from src import config
+
+MANIFEST_FILE = "manifest.json"
+_BLOCK_SIZE = 1 << 20
+
+
+class UploadStore:
+    """
+    Content-addressed store of uploaded PDFs.
+
+    Each distinct file is kept once as ``<root>/<sha256>.pdf``; uploading the
+    same bytes again (under any name) writes nothing. ``<root>/manifest.json``
+    records, per digest, the names it was uploaded under, its size and when
+    it was first and last seen. The digest returned by ``put_*`` is what the
+    PDF tool, graph and answer caches are keyed on, so an identical upload
+    reuses the existing index without hashing the file again.
+    """
+
+    def __init__(self, root: str = None):
+        self.root = root or config.UPLOAD_DIR
+        os.makedirs(self.root, exist_ok=True)
+        self._lock = threading.Lock()
+        self.manifest = self._read_manifest()
+
+    @property
+    def manifest_path(self) -> str:
+        return os.path.join(self.root, MANIFEST_FILE)
+
+    def _read_manifest(self) -> dict:
+        try:
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {"files": {}}
+
+    def _write_manifest(self):
+        fd, tmp = tempfile.mkstemp(prefix=".manifest-", suffix=".json", dir=self.root)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(self.manifest, f, indent=2, sort_keys=True)
+        os.replace(tmp, self.manifest_path)
+
+    def path(self, digest: str) -> str:
+        return os.path.join(self.root, f"{digest}.pdf")
+
+    def get(self, digest: str):
+        """Manifest entry (with ``path``) for ``digest``, or None if it is not stored."""
+        with self._lock:
+            entry = self.manifest["files"].get(digest)
+        if entry is None or not os.path.exists(self.path(digest)):
+            return None
+        return dict(entry, digest=digest, path=self.path(digest))
+
+    def _record(self, digest: str, name: str, size: int) -> dict:
+        now = time.time()
+        with self._lock:
+            entry = self.manifest["files"].setdefault(digest, {"names": [], "size": size, "added": now})
+            if name and name not in entry["names"]:
+                entry["names"].append(name)
+            entry["last_seen"] = now
+            self._write_manifest()
+            return dict(entry, digest=digest, path=self.path(digest))
+
+    def put_bytes(self, data, name: str = None) -> dict:
+        """
+        Store an in-memory upload (bytes or memoryview, e.g. Streamlit's ``getbuffer()``).
+
+        The bytes are hashed in blocks without copying and written only if the
+        digest is new.
+
+        Returns:
+            manifest entry with ``digest`` and ``path``
+        """
+        view = memoryview(data)
+        h = hashlib.sha256()
+        for start in range(0, len(view), _BLOCK_SIZE):
+            h.update(view[start:start + _BLOCK_SIZE])
+        digest = h.hexdigest()
+        if not os.path.exists(self.path(digest)):
+            fd, tmp = tempfile.mkstemp(prefix=".upload-", suffix=".pdf", dir=self.root)
+            with os.fdopen(fd, "wb") as f:
+                f.write(view)
+            os.replace(tmp, self.path(digest))
+        return self._record(digest, name, len(view))
+
+    def put_stream(self, stream, name: str = None) -> dict:
+        """
+        Store an upload read from a file-like ``stream`` in one pass.
+
+        The stream is hashed while it is copied to a temporary file, which is
+        renamed into place, or dropped if the digest is already stored.
+
+        Returns:
+            manifest entry with ``digest`` and ``path``
+        """
+        h = hashlib.sha256()
+        size = 0
+        fd, tmp = tempfile.mkstemp(prefix=".upload-", suffix=".pdf", dir=self.root)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                for block in iter(lambda: stream.read(_BLOCK_SIZE), b""):
+                    h.update(block)
+                    f.write(block)
+                    size += len(block)
+            digest = h.hexdigest()
+            if os.path.exists(self.path(digest)):
+                os.unlink(tmp)
+            else:
+                os.replace(tmp, self.path(digest))
+        except BaseException:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+            raise
+        return self._record(digest, name, size)
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_upload_store(root: str = None) -> UploadStore:
+    """Process-wide ``UploadStore`` for ``root`` (default ``config.UPLOAD_DIR``), so sessions share one manifest lock."""
+    root = os.path.abspath(root or config.UPLOAD_DIR)
+    with _stores_lock:
+        store = _stores.get(root)
+        if store is None:
+            store = _stores[root] = UploadStore(root)
+        return store
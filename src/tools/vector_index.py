@@ -0,0 +1,160 @@
+import math
+import time
+
+import faiss
+import numpy as np
+
+from src import config
+
+# "flat" keeps exact float32 vectors; the others trade a little recall for memory.
+INDEX_MODES = ("flat", "ivf", "ivf_pq", "sq8", "fp16")
+# PQ trains 256 centroids per sub-quantizer, so it needs at least this many vectors.
+_PQ_MIN_VECTORS = 256
+
+
+def resolve_mode(mode: str, ntotal: int) -> str:
+    """Map ``auto`` to flat below ``config.INDEX_AUTO_THRESHOLD`` chunks, else ``config.INDEX_AUTO_MODE``."""
+    mode = (mode or "flat").lower()
+    if mode == "auto":
+        mode = config.INDEX_AUTO_MODE if ntotal >= config.INDEX_AUTO_THRESHOLD else "flat"
+    if mode not in INDEX_MODES:
+        raise ValueError(f"Unknown index mode {mode!r}; expected 'auto' or one of {INDEX_MODES}")
+    if mode == "ivf_pq" and ntotal < _PQ_MIN_VECTORS:
+        return "sq8"
+    return mode
+
+
+def _nlist(ntotal: int) -> int:
+    if config.IVF_NLIST > 0:
+        return min(config.IVF_NLIST, ntotal)
+    # ~4*sqrt(n) lists, with enough vectors per list for k-means to train.
+    return max(1, min(int(4 * math.sqrt(ntotal)), ntotal // 39))
+
+
+def _pq_m(dim: int) -> int:
+    # Largest divisor of the dimension not above the target sub-quantizer count.
+    target = config.PQ_M if config.PQ_M > 0 else max(1, dim // 16)
+    return max(m for m in range(1, min(target, dim) + 1) if dim % m == 0)
+
+
+def configure(index):
+    """Apply query-time settings that are not stored in the index file."""
+    try:
+        faiss.extract_index_ivf(index).nprobe = config.IVF_NPROBE
+    except (RuntimeError, ValueError):
+        pass
+    return index
+
+
+def build_index(vectors: np.ndarray, mode: str):
+    """
+    Build a trained and populated L2 index of the given mode.
+
+    Args:
+        vectors: (n, d) float32 matrix of L2-normalised vectors, in docstore order
+        mode: one of ``INDEX_MODES``
+
+    Returns:
+        faiss index holding ``vectors`` under ids 0..n-1
+    """
+    ntotal, dim = vectors.shape
+    if mode == "flat":
+        index = faiss.IndexFlatL2(dim)
+    elif mode == "sq8":
+        index = faiss.IndexScalarQuantizer(dim, faiss.ScalarQuantizer.QT_8bit, faiss.METRIC_L2)
+    elif mode == "fp16":
+        index = faiss.IndexScalarQuantizer(dim, faiss.ScalarQuantizer.QT_fp16, faiss.METRIC_L2)
+    elif mode == "ivf":
+        index = faiss.IndexIVFFlat(faiss.IndexFlatL2(dim), dim, _nlist(ntotal), faiss.METRIC_L2)
+    elif mode == "ivf_pq":
+        index = faiss.IndexIVFPQ(faiss.IndexFlatL2(dim), dim, _nlist(ntotal), _pq_m(dim), 8)
+    else:
+        raise ValueError(f"Unknown index mode {mode!r}")
+    if not index.is_trained:
+        index.train(vectors)
+    index.add(vectors)
+    return configure(index)
+
+
+def index_nbytes(index) -> int:
+    """Approximate resident size: encoded vectors plus IVF centroids."""
+    nbytes = index.ntotal * getattr(index, "code_size", index.d * 4)
+    try:
+        ivf = faiss.extract_index_ivf(index)
+        nbytes += ivf.nlist * index.d * 4 + ivf.ntotal * 8  # centroids + list ids
+    except (RuntimeError, ValueError):
+        pass
+    return nbytes
+
+
+def recall_at_k(index, vectors: np.ndarray, k: int = 10, sample: int = None, seed: int = 0) -> float:
+    """
+    Recall@k of ``index`` against exact search over ``vectors``.
+
+    Queries are perturbed copies of up to ``sample`` stored vectors, so they
+    land near, but not exactly on, indexed points.
+    """
+    sample = sample or config.INDEX_RECALL_SAMPLE
+    ntotal = vectors.shape[0]
+    k = min(k, ntotal)
+    rng = np.random.default_rng(seed)
+    picks = rng.choice(ntotal, size=min(sample, ntotal), replace=False)
+    queries = vectors[picks] + rng.normal(scale=0.05, size=(len(picks), vectors.shape[1])).astype("float32")
+    faiss.normalize_L2(queries)
+    exact = faiss.IndexFlatL2(vectors.shape[1])
+    exact.add(vectors)
+    _, truth = exact.search(queries, k)
+    _, found = index.search(queries, k)
+    hits = sum(len(set(t) & set(f)) for t, f in zip(truth, found))
+    return hits / float(truth.size)
+
+
+def compact_vectorstore(vectorstore, mode: str = None) -> dict:
+    """
+    Replace a LangChain FAISS vectorstore's flat index with one of ``mode``
+    (``config.INDEX_MODE`` by default), in place.
+
+    Vectors are re-added in docstore order, so ``index_to_docstore_id`` stays valid.
+
+    Returns:
+        report dict with mode, chunks, bytes, flat_bytes, compression, recall_at_10 and build_s
+    """
+    flat = vectorstore.index
+    ntotal = flat.ntotal
+    mode = resolve_mode(mode or config.INDEX_MODE, ntotal)
+    flat_bytes = ntotal * flat.d * 4
+    report = {"mode": mode, "chunks": ntotal, "flat_bytes": flat_bytes}
+    if mode == "flat" or ntotal == 0:
+        report.update(bytes=flat_bytes, compression=1.0, recall_at_10=1.0, build_s=0.0)
+        return report
+    start = time.perf_counter()
+    vectors = flat.reconstruct_n(0, ntotal)
+    index = build_index(vectors, mode)
+    build_s = time.perf_counter() - start
+    nbytes = index_nbytes(index)
+    report.update(
+        bytes=nbytes,
+        compression=round(flat_bytes / max(nbytes, 1), 2),
+        recall_at_10=round(recall_at_k(index, vectors, k=10), 4),
+        build_s=round(build_s, 3),
+    )
+    vectorstore.index = index
+    return report
+
+
+# IO_FLAG_MMAP maps only IVF inverted lists; flat and scalar-quantizer codes
+# would still be copied to the heap. IO_FLAG_MMAP_IFC maps the whole file, for
+# every index type (faiss >= 1.9).
+_MMAP_FLAG = getattr(faiss, "IO_FLAG_MMAP_IFC", faiss.IO_FLAG_MMAP)
+
+
+def read_index(path: str, mmap: bool = None):
+    """
+    Read a saved index, memory-mapped read-only when ``mmap`` (``config.INDEX_MMAP`` by default).
+
+    A mapped index is backed by the file's page cache, so processes that load
+    the same file share one copy of the vectors. It must not be added to.
+    """
+    mmap = config.INDEX_MMAP if mmap is None else mmap
+    flags = _MMAP_FLAG | faiss.IO_FLAG_READ_ONLY if mmap else 0
+    return configure(faiss.read_index(str(path), flags))
@@ -0,0 +1,511 @@
+"""Per-request tracing, process-wide metrics and logging setup.
+
+A trace is opened per question (``trace_request``) and collects spans for
+every graph node (``traced_node``), LLM call (``LLMTracingCallback``) and
+embedding request (``TracedEmbeddings``). The current trace and span live in
+context variables, so spans opened on LangGraph's and the retrievers' worker
+threads attach to the right request as long as the context is copied.
+
+Finished traces are appended to ``config.TRACE_LOG_PATH`` as JSON lines
+(rotated by size, like ``logging.handlers.RotatingFileHandler``) and folded into the metrics registry, which ``render_prometheus`` exposes in the
+Prometheus text format (served by ``start_metrics_server``).
+"""
+import contextvars
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List
+
+from langchain_core.callbacks.base import BaseCallbackHandler
+from langchain_core.embeddings import Embeddings
+
+from src import config
+
+log = logging.getLogger(__name__)
+
+_current_trace = contextvars.ContextVar("rag_trace", default=None)
+_current_span = contextvars.ContextVar("rag_span", default=None)
+
+# Histogram buckets for span durations, in seconds.
+_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _estimate_tokens(text: str) -> int:
+    return -(-len(text) // config.CONTEXT_CHARS_PER_TOKEN) if text else 0
+
+
+# -- logging -----------------------------------------------------------------
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record, with the active trace id when there is one."""
+
+    def format(self, record):
+        payload = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        trace = _current_trace.get()
+        if trace is not None:
+            payload["trace_id"] = trace.trace_id
+        if record.exc_info:
+            payload["exc"] = self.formatException(record.exc_info)
+        return json.dumps(payload, default=str)
+
+
+def configure_logging(level: str = None, fmt: str = None):
+    """Configure the ``src`` loggers once (``config.LOG_LEVEL``, ``config.LOG_FORMAT``: text or json)."""
+    root = logging.getLogger("src")
+    if getattr(root, "_rag_configured", False):
+        return
+    handler = logging.StreamHandler()
+    if (fmt or config.LOG_FORMAT) == "json":
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+    root.addHandler(handler)
+    root.setLevel((level or config.LOG_LEVEL).upper())
+    root.propagate = False
+    root._rag_configured = True
+
+
+# -- metrics -------------------------------------------------------------------
+
+def _label_value(value) -> str:
+    """Escape a label value for the Prometheus text format (backslash, quote, newline)."""
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class MetricsRegistry:
+    """Thread-safe counters and histograms keyed by (metric name, sorted label pairs)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}
+        self._help = {}
+
+    def inc(self, metric: str, value: float = 1, help: str = "", **labels):
+        key = (metric, tuple(sorted(labels.items())))
+        with self._lock:
+            self._help.setdefault(metric, (help, "counter"))
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, metric: str, value: float, help: str = "", **labels):
+        key = (metric, tuple(sorted(labels.items())))
+        with self._lock:
+            self._help.setdefault(metric, (help, "histogram"))
+            hist = self._histograms.get(key)
+            if hist is None:
+                hist = self._histograms[key] = {"buckets": [0] * len(_BUCKETS), "sum": 0.0, "count": 0}
+            for i, bound in enumerate(_BUCKETS):
+                if value <= bound:
+                    hist["buckets"][i] += 1
+            hist["sum"] += value
+            hist["count"] += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "counters": {self._series(n, l): v for (n, l), v in self._counters.items()},
+                "histograms": {self._series(n, l): dict(h, buckets=list(h["buckets"]))
+                               for (n, l), h in self._histograms.items()},
+            }
+
+    @staticmethod
+    def _series(name, labels, extra=()):
+        pairs = list(labels) + list(extra)
+        if not pairs:
+            return name
+        body = ",".join(f'{k}="{_label_value(v)}"' for k, v in pairs)
+        return f"{name}{{{body}}}"
+
+    def render_prometheus(self) -> str:
+        lines = []
+        with self._lock:
+            for name in sorted(self._help):
+                help_text, kind = self._help[name]
+                lines.append(f"# HELP {name} {help_text or name}")
+                lines.append(f"# TYPE {name} {kind}")
+                if kind == "counter":
+                    for (n, labels), value in sorted(self._counters.items()):
+                        if n == name:
+                            lines.append(f"{self._series(name, labels)} {value}")
+                    continue
+                for (n, labels), hist in sorted(self._histograms.items()):
+                    if n != name:
+                        continue
+                    for bound, count in zip(_BUCKETS, hist["buckets"]):
+                        lines.append(f"{self._series(name + '_bucket', labels, [('le', bound)])} {count}")
+                    lines.append(f"{self._series(name + '_bucket', labels, [('le', '+Inf')])} {hist['count']}")
+                    lines.append(f"{self._series(name + '_sum', labels)} {round(hist['sum'], 6)}")
+                    lines.append(f"{self._series(name + '_count', labels)} {hist['count']}")
+        return "\n".join(lines) + "\n"
+
+
+METRICS = MetricsRegistry()
+
+
+def render_prometheus() -> str:
+    return METRICS.render_prometheus()
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?", 1)[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+_server = None
+_server_lock = threading.Lock()
+
+
+def start_metrics_server(port: int = None, host: str = None):
+    """
+    Serve ``/metrics`` on a daemon thread; idempotent per process.
+
+    Returns:
+        the HTTP server, or None when disabled (port 0) or the port is taken
+        (e.g. by another Streamlit worker process)
+    """
+    global _server
+    port = config.METRICS_PORT if port is None else port
+    if not port:
+        return None
+    with _server_lock:
+        if _server is None:
+            try:
+                _server = ThreadingHTTPServer((host or config.METRICS_HOST, port), _MetricsHandler)
+            except OSError as exc:
+                log.warning("metrics endpoint not started on port %s: %s", port, exc)
+                return None
+            threading.Thread(target=_server.serve_forever, name="metrics-http", daemon=True).start()
+            log.info("metrics endpoint on http://%s:%s/metrics", config.METRICS_HOST, port)
+        return _server
+
+
+# -- traces --------------------------------------------------------------------
+
+class Trace:
+    """Spans and counters of one request; span times are relative to the trace start."""
+
+    def __init__(self, name: str, **attrs):
+        self.trace_id = uuid.uuid4().hex[:16]
+        self.name = name
+        self.attrs: Dict[str, Any] = dict(attrs)
+        self.counters: Dict[str, float] = {}
+        self.spans: List[dict] = []
+        self.started_at = time.time()
+        self._start = time.perf_counter()
+        self._lock = threading.Lock()
+        self.duration_ms = None
+
+    def now_ms(self) -> float:
+        return (time.perf_counter() - self._start) * 1000
+
+    def add_span(self, span: dict):
+        with self._lock:
+            self.spans.append(span)
+
+    def count(self, name: str, value: float = 1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            spans = sorted(self.spans, key=lambda s: s["start_ms"])
+            return {
+                "trace_id": self.trace_id,
+                "name": self.name,
+                "started_at": round(self.started_at, 3),
+                "duration_ms": self.duration_ms,
+                "attrs": dict(self.attrs),
+                "counters": dict(self.counters),
+                "spans": spans,
+            }
+
+
+def current_trace():
+    return _current_trace.get()
+
+
+def count(name: str, value: float = 1):
+    """Add to a counter on the current trace (if any) and to the process-wide metrics."""
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.count(name, value)
+    METRICS.inc(f"rag_{name}_total", value)
+
+
+_jsonl_lock = threading.Lock()
+
+
+def _rotate(path: str, backups: int):
+    """Shift ``path`` to ``path.1`` (and ``.1`` to ``.2`` ...), dropping the oldest."""
+    if backups <= 0:
+        os.remove(path)
+        return
+    for i in range(backups - 1, 0, -1):
+        if os.path.exists(f"{path}.{i}"):
+            os.replace(f"{path}.{i}", f"{path}.{i + 1}")
+    os.replace(path, f"{path}.1")
+
+
+def _write_jsonl(record: dict):
+    path = config.TRACE_LOG_PATH
+    if not path:
+        return
+    try:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        line = (json.dumps(record, default=str) + "\n").encode("utf-8")
+        with _jsonl_lock:
+            # Bounded on disk: at most TRACE_LOG_MAX_BYTES per file and TRACE_LOG_BACKUPS old files.
+            max_bytes = config.TRACE_LOG_MAX_BYTES
+            if max_bytes and os.path.exists(path) and os.path.getsize(path) + len(line) > max_bytes:
+                _rotate(path, config.TRACE_LOG_BACKUPS)
+            with open(path, "ab") as f:
+                f.write(line)
+    except OSError as exc:
+        log.warning("could not write trace to %s: %s", path, exc)
+
+
+@contextmanager
+def trace_request(name: str = "query", **attrs):
+    """
+    Open a trace for one request and make it current.
+
+    On exit the trace is finalised, written to the JSON-lines log and
+    recorded in the metrics registry.
+    """
+    trace = Trace(name, **attrs)
+    token = _current_trace.set(trace)
+    span_token = _current_span.set(None)
+    status = "ok"
+    try:
+        yield trace
+    except BaseException:
+        status = "error"
+        raise
+    finally:
+        try:
+            _current_span.reset(span_token)
+            _current_trace.reset(token)
+        except ValueError:
+            # Generator closed from another context (e.g. abandoned by a Streamlit rerun).
+            pass
+        trace.duration_ms = round(trace.now_ms(), 3)
+        trace.attrs["status"] = status
+        METRICS.inc("rag_requests_total", help="Requests traced", name=name, status=status)
+        METRICS.observe("rag_request_seconds", trace.duration_ms / 1000, help="Request wall time", name=name)
+        _write_jsonl(trace.to_dict())
+
+
+@contextmanager
+def span(name: str, kind: str = "internal", **attrs):
+    """
+    Time a block as a span of the current trace; yields its attribute dict
+    so the block can add results. Always feeds the span-duration histogram,
+    even outside a trace.
+    """
+    trace = _current_trace.get()
+    parent = _current_span.get()
+    record = {
+        "name": name,
+        "kind": kind,
+        "parent": parent["name"] if parent else None,
+        "thread": threading.current_thread().name,
+        "attrs": dict(attrs),
+    }
+    token = _current_span.set(record)
+    start = time.perf_counter()
+    record["start_ms"] = round(trace.now_ms(), 3) if trace is not None else 0.0
+    try:
+        yield record["attrs"]
+    except BaseException as exc:
+        record["error"] = repr(exc)
+        raise
+    finally:
+        _current_span.reset(token)
+        seconds = time.perf_counter() - start
+        record["duration_ms"] = round(seconds * 1000, 3)
+        METRICS.observe("rag_span_seconds", seconds, help="Span wall time", name=name, kind=kind)
+        if trace is not None:
+            trace.add_span(record)
+
+
+# State keys summarised onto node spans.
+def _node_attrs(update) -> dict:
+    if not isinstance(update, dict):
+        return {}
+    attrs = {}
+    if isinstance(update.get("documents"), list):
+        attrs["documents"] = len(update["documents"])
+    if "rewrites" in update:
+        attrs["rewrites"] = update["rewrites"]
+    grading = update.get("grading") or {}
+    for key in ("mode", "llm_calls", "llm_calls_saved"):
+        if key in grading:
+            attrs[f"grading_{key}"] = grading[key]
+    context = update.get("context_stats") or {}
+    for key in ("tokens_before", "tokens_after"):
+        if key in context:
+            attrs[f"context_{key}"] = context[key]
+    if update.get("retrieval_timings"):
+        attrs["retrieval_total_ms"] = update["retrieval_timings"].get("total_ms")
+    return attrs
+
+
+def traced_node(name: str, fn, afn=None):
+    """
+    Wrap a LangGraph node so each call is recorded as a ``node`` span.
+
+    With ``afn`` (the node's async variant) a ``RunnableLambda`` carrying
+    both is returned, so the compiled graph runs under ``stream`` and ``astream``.
+    """
+
+    def node(state):
+        with span(name, kind="node") as attrs:
+            update = fn(state)
+            attrs.update(_node_attrs(update))
+        METRICS.inc("rag_node_calls_total", help="Graph node executions", node=name)
+        return update
+
+    node.__name__ = f"traced_{name}"
+    if afn is None:
+        return node
+
+    from langchain_core.runnables import RunnableLambda
+
+    async def anode(state):
+        with span(name, kind="node") as attrs:
+            update = await afn(state)
+            attrs.update(_node_attrs(update))
+        METRICS.inc("rag_node_calls_total", help="Graph node executions", node=name)
+        return update
+
+    return RunnableLambda(node, afunc=anode, name=name)
+
+
+class LLMTracingCallback(BaseCallbackHandler):
+    """
+    Records every LLM call as an ``llm`` span with prompt/completion token
+    counts (Ollama's eval counts when reported, else an estimate). Chains are
+    told apart by the tag set with ``.with_config(tags=[...])``.
+    """
+
+    # Called on the caller's thread (also for async chains), so the context
+    # variables still point at the request's trace and node span.
+    run_inline = True
+
+    def __init__(self):
+        self._runs = {}
+        self._lock = threading.Lock()
+
+    def on_llm_start(self, serialized, prompts, *, run_id, tags=None, **kwargs):
+        trace = _current_trace.get()
+        with self._lock:
+            self._runs[run_id] = {
+                "trace": trace,
+                "parent": _current_span.get(),
+                # Skip LangChain's own "seq:step:N"-style tags.
+                "chain": next((t for t in tags or () if ":" not in t), "llm"),
+                "start": time.perf_counter(),
+                "start_ms": trace.now_ms() if trace is not None else 0.0,
+                "prompt_chars": sum(len(p) for p in prompts),
+            }
+
+    def _finish(self, run_id, completion: str = "", info: dict = None, error=None):
+        with self._lock:
+            run = self._runs.pop(run_id, None)
+        if run is None:
+            return
+        info = info or {}
+        seconds = time.perf_counter() - run["start"]
+        prompt_tokens = info.get("prompt_eval_count") or -(-run["prompt_chars"] // config.CONTEXT_CHARS_PER_TOKEN)
+        completion_tokens = info.get("eval_count") or _estimate_tokens(completion)
+        chain = run["chain"]
+        METRICS.inc("rag_llm_calls_total", help="LLM calls", chain=chain)
+        METRICS.inc("rag_llm_prompt_tokens_total", prompt_tokens, help="LLM prompt tokens", chain=chain)
+        METRICS.inc("rag_llm_completion_tokens_total", completion_tokens, help="LLM completion tokens", chain=chain)
+        METRICS.observe("rag_span_seconds", seconds, name=chain, kind="llm")
+        trace = run["trace"]
+        if trace is None:
+            return
+        trace.count("llm_calls")
+        trace.count("prompt_tokens", prompt_tokens)
+        trace.count("completion_tokens", completion_tokens)
+        record = {
+            "name": chain,
+            "kind": "llm",
+            "parent": run["parent"]["name"] if run["parent"] else None,
+            "thread": threading.current_thread().name,
+            "start_ms": round(run["start_ms"], 3),
+            "duration_ms": round(seconds * 1000, 3),
+            "attrs": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens},
+        }
+        if error is not None:
+            record["error"] = repr(error)
+        trace.add_span(record)
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        text, info = "", {}
+        try:
+            generation = response.generations[0][0]
+            text, info = generation.text, generation.generation_info or {}
+        except (AttributeError, IndexError):
+            pass
+        self._finish(run_id, text, info)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._finish(run_id, error=error)
+
+
+LLM_CALLBACK = LLMTracingCallback()
+
+
+class TracedEmbeddings(Embeddings):
+    """Delegating wrapper that records each embedding request as an ``embedding`` span."""
+
+    def __init__(self, inner):
+        self.inner = inner
+
+    def __getattr__(self, name):
+        if name == "inner":
+            raise AttributeError(name)
+        return getattr(self.inner, name)
+
+    def embed_documents(self, texts):
+        with span("embed_documents", kind="embedding", texts=len(texts)):
+            METRICS.inc("rag_embedding_texts_total", len(texts), help="Texts embedded")
+            return self.inner.embed_documents(texts)
+
+    def embed_query(self, text):
+        with span("embed_query", kind="embedding", texts=1):
+            METRICS.inc("rag_embedding_texts_total", 1, help="Texts embedded")
+            return self.inner.embed_query(text)
+
+    async def aembed_documents(self, texts):
+        with span("embed_documents", kind="embedding", texts=len(texts)):
+            METRICS.inc("rag_embedding_texts_total", len(texts), help="Texts embedded")
+            return await self.inner.aembed_documents(texts)
+
+    async def aembed_query(self, text):
+        with span("embed_query", kind="embedding", texts=1):
+            METRICS.inc("rag_embedding_texts_total", 1, help="Texts embedded")
+            return await self.inner.aembed_query(text)
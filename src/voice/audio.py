@@ -0,0 +1,206 @@
+"""
+Audio sources and voice-activity endpointing for speech input.
+
+Every source delivers 16-bit mono PCM in blocks of a requested number of
+samples, so the recognizer service can run on a live microphone or on a
+WAV file (tests and benchmarks) unchanged.
+"""
+import time
+import wave
+
+import numpy as np
+
+from src import config
+
+
+class AudioSource:
+    """
+    Base class for 16-bit mono PCM sources at ``rate`` Hz.
+
+    ``start``/``stop`` bracket a listening session; ``read`` returns up to
+    ``samples`` samples and ``b""`` once the input is exhausted.
+    """
+
+    rate = 16000
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+    def read(self, samples: int) -> bytes:
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class MicrophoneSource(AudioSource):
+    """
+    Default input device, opened once and kept open between utterances.
+
+    ``stop`` only pauses the stream, so the next ``start`` skips the
+    PyAudio and device setup and does not replay stale buffered audio.
+    """
+
+    def __init__(self, rate: int = None, frames_per_buffer: int = None, device_index: int = None):
+        self.rate = rate or config.STT_SAMPLE_RATE
+        self.frames_per_buffer = frames_per_buffer or self.rate * config.STT_BLOCK_MS // 1000
+        self.device_index = device_index
+        self._audio = None
+        self._stream = None
+
+    def _open(self):
+        if self._stream is not None:
+            return
+        import pyaudio
+
+        self._audio = pyaudio.PyAudio()
+        self._stream = self._audio.open(
+            format=pyaudio.paInt16,
+            channels=1,
+            rate=self.rate,
+            input=True,
+            input_device_index=self.device_index,
+            frames_per_buffer=self.frames_per_buffer,
+            start=False,
+        )
+
+    def start(self):
+        self._open()
+        if not self._stream.is_active():
+            self._stream.start_stream()
+
+    def stop(self):
+        if self._stream is not None and self._stream.is_active():
+            self._stream.stop_stream()
+
+    def read(self, samples: int) -> bytes:
+        return self._stream.read(samples, exception_on_overflow=False)
+
+    def close(self):
+        if self._stream is not None:
+            self.stop()
+            self._stream.close()
+            self._audio.terminate()
+            self._stream = self._audio = None
+
+
+class WavFileSource(AudioSource):
+    """
+    16-bit PCM WAV file as an audio source; stereo is down-mixed to mono.
+
+    With ``realtime`` reads are paced at the file's sample rate, so latency
+    measurements match a live microphone. Otherwise the file is read as fast
+    as the consumer allows.
+    """
+
+    def __init__(self, path: str, realtime: bool = False):
+        self.path = path
+        self.realtime = realtime
+        self._wav = wave.open(path, "rb")
+        if self._wav.getsampwidth() != 2:
+            self._wav.close()
+            raise ValueError(f"{path}: expected 16-bit PCM, got {8 * self._wav.getsampwidth()}-bit")
+        self.rate = self._wav.getframerate()
+        self.channels = self._wav.getnchannels()
+        self._started = None
+        self._delivered = 0
+
+    def start(self):
+        if self._started is None:
+            self._started = time.perf_counter()
+
+    def read(self, samples: int) -> bytes:
+        data = self._wav.readframes(samples)
+        if self.channels > 1 and data:
+            pcm = np.frombuffer(data, dtype="<i2").reshape(-1, self.channels)
+            data = pcm.mean(axis=1).astype("<i2").tobytes()
+        if self.realtime and data:
+            self._delivered += len(data) // 2
+            delay = self._started + self._delivered / self.rate - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        return data
+
+    def close(self):
+        self._wav.close()
+
+
+def block_rms(block: bytes) -> float:
+    """Root-mean-square amplitude of a 16-bit PCM block."""
+    if len(block) < 2:
+        return 0.0
+    pcm = np.frombuffer(block[: len(block) // 2 * 2], dtype="<i2").astype(np.float32)
+    return float(np.sqrt(np.mean(pcm * pcm)))
+
+
+class EnergyVAD:
+    """
+    Energy-based voice-activity endpointer, fed one audio block at a time.
+
+    Blocks whose RMS clears ``max(min_rms, noise floor * noise_ratio)`` count
+    as speech; the noise floor tracks the level of non-speech blocks. An
+    utterance opens after ``start_ms`` of consecutive speech and ends after
+    ``end_silence_ms`` of silence, so pauses between words do not cut it off.
+
+    ``update`` returns one of:
+        "silence": waiting for speech
+        "start": this block opened an utterance
+        "speech": inside an utterance
+        "end": trailing silence reached ``end_silence_ms``
+        "max": the utterance reached ``max_seconds``
+        "timeout": no speech within ``no_speech_seconds``
+    """
+
+    def __init__(self, block_ms: int = None, start_ms: int = None, end_silence_ms: int = None,
+                 min_rms: float = None, noise_ratio: float = None, max_seconds: float = None,
+                 no_speech_seconds: float = None):
+        self.block_ms = block_ms or config.STT_BLOCK_MS
+        self.start_ms = config.VAD_START_MS if start_ms is None else start_ms
+        self.end_silence_ms = end_silence_ms or config.VAD_END_SILENCE_MS
+        self.min_rms = config.VAD_MIN_RMS if min_rms is None else min_rms
+        self.noise_ratio = noise_ratio or config.VAD_NOISE_RATIO
+        self.max_seconds = max_seconds or config.STT_MAX_SECONDS
+        self.no_speech_seconds = no_speech_seconds or config.STT_NO_SPEECH_SECONDS
+        self.noise_floor = None
+        self.reset()
+
+    def reset(self):
+        """Start a new utterance; the learned noise floor is kept."""
+        self.in_speech = False
+        self.voiced_ms = 0
+        self.silence_ms = 0
+        self.waited_ms = 0
+        self.speech_ms = 0
+        self.last_rms = 0.0
+
+    @property
+    def threshold(self) -> float:
+        return max(self.min_rms, (self.noise_floor or 0.0) * self.noise_ratio)
+
+    def update(self, block: bytes) -> str:
+        rms = self.last_rms = block_rms(block)
+        voiced = rms >= self.threshold
+        if not self.in_speech:
+            self.waited_ms += self.block_ms
+            if voiced:
+                self.voiced_ms += self.block_ms
+                if self.voiced_ms >= self.start_ms:
+                    self.in_speech = True
+                    self.speech_ms = self.voiced_ms
+                    return "start"
+            else:
+                self.voiced_ms = 0
+                self.noise_floor = rms if self.noise_floor is None else 0.9 * self.noise_floor + 0.1 * rms
+            if self.waited_ms >= self.no_speech_seconds * 1000:
+                return "timeout"
+            return "silence"
+        self.speech_ms += self.block_ms
+        self.silence_ms = 0 if voiced else self.silence_ms + self.block_ms
+        if self.silence_ms >= self.end_silence_ms:
+            return "end"
+        if self.speech_ms >= self.max_seconds * 1000:
+            return "max"
+        return "speech"
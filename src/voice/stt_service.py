@@ -0,0 +1,224 @@
+import json
+import logging
+import queue
+import threading
+import time
+from collections import deque
+
+from vosk import KaldiRecognizer
+
+from src import config
+from src.voice.audio import EnergyVAD, MicrophoneSource
+
+log = logging.getLogger(__name__)
+
+
+class SpeechService:
+    """
+    Long-lived speech-to-text over one audio source and a reusable recognizer.
+
+    The audio device stays open and the ``KaldiRecognizer`` is reset rather
+    than rebuilt between utterances, so a new recording starts immediately.
+    Utterances are endpointed by ``EnergyVAD`` (trailing silence) instead of
+    Vosk's first result or a fixed window, and partial transcripts are
+    streamed while the user speaks.
+
+    Args:
+        model: loaded ``vosk.Model``.
+        source: ``AudioSource`` to listen on; defaults to the microphone.
+        vad_options: keyword overrides for ``EnergyVAD``.
+    """
+
+    def __init__(self, model, source=None, block_ms: int = None, vad_options: dict = None):
+        self.model = model
+        self.source = source
+        self.block_ms = block_ms or config.STT_BLOCK_MS
+        self.vad_options = dict(vad_options or {})
+        self._recognizers = {}
+        self._vads = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _source(self, source):
+        if source is not None:
+            return source
+        if self.source is None:
+            self.source = MicrophoneSource()
+        return self.source
+
+    def _recognizer(self, rate: int):
+        rec = self._recognizers.get(rate)
+        if rec is None:
+            rec = self._recognizers[rate] = KaldiRecognizer(self.model, rate)
+        return rec
+
+    def _vad(self, source, max_seconds=None):
+        # One VAD per source keeps each device's learned noise floor.
+        vad = self._vads.get(id(source))
+        if vad is None:
+            vad = self._vads[id(source)] = EnergyVAD(block_ms=self.block_ms, **self.vad_options)
+        vad.reset()
+        vad.max_seconds = max_seconds or self.vad_options.get("max_seconds") or config.STT_MAX_SECONDS
+        return vad
+
+    def stream(self, source=None, continuous: bool = False, max_seconds: float = None):
+        """
+        Listen for one utterance and yield its transcript as it forms.
+
+        Yields tuples of:
+            ("partial", text): the transcript so far, whenever it changes
+            ("final", result): ``result`` holds ``text``, ``endpoint``
+                ("end", "max", "timeout" or "eof"), ``speech_seconds`` and
+                ``finalize_ms`` (endpoint to final text)
+
+        With ``continuous`` the source keeps running afterwards, so the next
+        utterance picks up exactly where this one ended. ``max_seconds``
+        caps this utterance's speech.
+
+        Recognition runs on a worker thread that holds the service lock and
+        queues events, so a slow consumer never holds the lock between
+        events. Closing the generator early (``close()``, or dropping it)
+        stops the worker after the current audio block.
+        """
+        events = queue.Queue()
+        cancel = threading.Event()
+
+        def run():
+            try:
+                self._recognize(source, continuous, max_seconds, events.put, cancel)
+            except BaseException as exc:
+                events.put(("error", exc))
+            finally:
+                events.put(None)
+
+        worker = threading.Thread(target=run, name="stt-utterance", daemon=True)
+        worker.start()
+        try:
+            while True:
+                event = events.get()
+                if event is None:
+                    return
+                if event[0] == "error":
+                    raise event[1]
+                yield event
+        finally:
+            cancel.set()
+
+    def _recognize(self, source, continuous, max_seconds, emit, cancel):
+        with self._lock:
+            source = self._source(source)
+            rec = self._recognizer(source.rate)
+            vad = self._vad(source, max_seconds)
+            block = source.rate * self.block_ms // 1000
+            preroll = deque(maxlen=max(1, config.VAD_PREROLL_MS // self.block_ms))
+            segments, partial, endpoint = [], "", "eof"
+            source.start()
+            try:
+                while not self._stop.is_set() and not cancel.is_set():
+                    data = source.read(block)
+                    if not data:
+                        break
+                    state = vad.update(data)
+                    if state == "silence":
+                        preroll.append(data)
+                        continue
+                    if state == "timeout":
+                        endpoint = "timeout"
+                        break
+                    if state == "start":
+                        # Feed the blocks just before the endpoint fired so the first syllable is kept.
+                        for earlier in preroll:
+                            rec.AcceptWaveform(earlier)
+                        preroll.clear()
+                    # Vosk's own endpoints only close a segment; the VAD decides when the user is done.
+                    if rec.AcceptWaveform(data):
+                        text = json.loads(rec.Result()).get("text", "")
+                        if text:
+                            segments.append(text)
+                    else:
+                        text = json.loads(rec.PartialResult()).get("partial", "")
+                        current = " ".join(segments + [text]).strip()
+                        if current and current != partial:
+                            partial = current
+                            emit(("partial", partial))
+                    if state in ("end", "max"):
+                        endpoint = state
+                        break
+                finalize_start = time.perf_counter()
+                tail = json.loads(rec.FinalResult()).get("text", "") if vad.in_speech else ""
+                if tail:
+                    segments.append(tail)
+                finalize_ms = round((time.perf_counter() - finalize_start) * 1000, 2)
+            finally:
+                rec.Reset()
+                if not continuous:
+                    source.stop()
+        result = {
+            "text": " ".join(segments).strip(),
+            "endpoint": endpoint,
+            "speech_seconds": round(vad.speech_ms / 1000, 2),
+            "finalize_ms": finalize_ms,
+        }
+        log.info("stt: %s after %.1fs of speech", endpoint, result["speech_seconds"])
+        emit(("final", result))
+
+    def listen(self, source=None, on_partial=None, max_seconds: float = None) -> dict:
+        """One utterance, blocking; ``on_partial(text)`` gets each partial transcript."""
+        for event in self.stream(source, max_seconds=max_seconds):
+            if event[0] == "partial":
+                if on_partial is not None:
+                    on_partial(event[1])
+            else:
+                return event[1]
+
+    def utterances(self, source=None, on_partial=None):
+        """Yield one result per utterance until the source ends or ``stop`` is called."""
+        source = self._source(source)
+        try:
+            while not self._stop.is_set():
+                result = None
+                for event in self.stream(source, continuous=True):
+                    if event[0] == "partial":
+                        if on_partial is not None:
+                            on_partial(event[1])
+                    else:
+                        result = event[1]
+                if result["endpoint"] == "eof" and not result["text"]:
+                    return
+                if result["text"]:
+                    yield result
+                if result["endpoint"] == "eof":
+                    return
+        finally:
+            source.stop()
+
+    def start(self, on_result, on_partial=None, source=None) -> threading.Thread:
+        """Listen continuously on a background thread, calling ``on_result`` per utterance."""
+        self._stop.clear()
+
+        def run():
+            try:
+                for result in self.utterances(source, on_partial):
+                    on_result(result)
+            except Exception:
+                log.exception("stt: continuous listening failed")
+
+        self._thread = threading.Thread(target=run, name="stt-listener", daemon=True)
+        self._thread.start()
+        return self._thread
+
+    def stop(self, timeout: float = None):
+        """Stop continuous listening after the current audio block."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            if self._thread.is_alive():
+                return
+            self._thread = None
+        self._stop.clear()
+
+    def close(self):
+        self.stop()
+        if self.source is not None:
+            self.source.close()
@@ -0,0 +1,286 @@
+import hashlib
+import io
+import logging
+import os
+import queue
+import re
+import sys
+import tempfile
+import threading
+import time
+import wave
+from concurrent.futures import Future
+from pathlib import Path
+
+from src import config
+
+log = logging.getLogger(__name__)
+
+# A sentence ends at . ! ? (optionally closed by a quote or bracket) followed by
+# whitespace, or at a line break (answers are bullet lists).
+_SENTENCE_END = re.compile(r"(?<=[.!?])[\"')\]]*\s+|\n+")
+_MARKUP = re.compile(r"^\s*(?:[-*•]|\d+[.)])\s+|[*_`#]+")
+
+
+def _speakable(text: str) -> str:
+    """Drop bullet markers and markdown emphasis so they are not read out."""
+    return " ".join(_MARKUP.sub(" ", text).split())
+
+
+class SentenceSplitter:
+    """
+    Incremental sentence splitter for streamed tokens.
+
+    ``feed`` returns the sentences completed by a token; fragments shorter
+    than ``min_chars`` are held back and joined with the next sentence, so
+    the engine is not called for every short bullet.
+    """
+
+    def __init__(self, min_chars: int = None):
+        self.min_chars = config.TTS_MIN_SENTENCE_CHARS if min_chars is None else min_chars
+        self._buffer = ""
+        self._pending = ""
+
+    def feed(self, token: str):
+        self._buffer += token
+        sentences = []
+        while True:
+            match = _SENTENCE_END.search(self._buffer)
+            if match is None:
+                break
+            sentence = _speakable(self._buffer[: match.start()])
+            self._buffer = self._buffer[match.end():]
+            if not sentence:
+                continue
+            self._pending = f"{self._pending} {sentence}".strip()
+            if len(self._pending) >= self.min_chars:
+                sentences.append(self._pending)
+                self._pending = ""
+        return sentences
+
+    def flush(self):
+        rest = f"{self._pending} {_speakable(self._buffer)}".strip()
+        self._buffer = self._pending = ""
+        return [rest] if rest else []
+
+
+class TTSCache:
+    """
+    Content-addressed on-disk cache of synthesized sentences.
+
+    Entries are WAV files named by the SHA-256 of the voice settings and the
+    text, written atomically. The directory is kept under ``max_bytes`` by
+    evicting the least recently used files.
+    """
+
+    def __init__(self, root: str = None, max_bytes: int = None):
+        self.root = Path(root or config.TTS_CACHE_DIR)
+        self.max_bytes = config.TTS_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(text: str, voice: tuple) -> str:
+        return hashlib.sha256(repr((voice, text)).encode("utf-8")).hexdigest()
+
+    def get(self, key: str):
+        path = self.root / f"{key}.wav"
+        try:
+            data = path.read_bytes()
+            os.utime(path)
+            return data
+        except OSError:
+            return None
+
+    def put(self, key: str, data: bytes):
+        with tempfile.NamedTemporaryFile(dir=self.root, suffix=".tmp", delete=False) as tmp:
+            tmp.write(data)
+        os.replace(tmp.name, self.root / f"{key}.wav")
+        self.evict()
+
+    def evict(self):
+        with self._lock:
+            entries = []
+            for path in self.root.glob("*.wav"):
+                try:
+                    st = path.stat()
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, path))
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                try:
+                    path.unlink()
+                    total -= size
+                except OSError:
+                    pass
+
+
+def _default_engine():
+    if sys.platform == "win32":
+        # SAPI5 needs COM initialised on the thread that owns the engine.
+        import comtypes
+
+        comtypes.CoInitialize()
+    import pyttsx3
+
+    engine = pyttsx3.init()
+    engine.setProperty("rate", config.TTS_RATE)
+    engine.setProperty("volume", config.TTS_VOLUME)
+    return engine
+
+
+class TTSWorker:
+    """
+    One TTS engine owned by a dedicated thread.
+
+    pyttsx3 engines are neither thread-safe nor cheap to create, so the
+    engine is created once on the worker thread and every synthesis is queued
+    to it. ``synthesize`` returns a Future with the WAV bytes; results are
+    looked up in and added to ``cache`` by content hash.
+    """
+
+    def __init__(self, engine_factory=None, cache: TTSCache = None):
+        self.engine_factory = engine_factory or _default_engine
+        self.cache = cache if cache is not None else TTSCache()
+        self.voice = (config.TTS_RATE, config.TTS_VOLUME)
+        self.stats = {"synthesized": 0, "cache_hits": 0, "synth_seconds": 0.0}
+        self._jobs = queue.Queue()
+        self._inflight = {}
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def _start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="tts-worker", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        engine = None
+        while True:
+            text, key, future = self._jobs.get()
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                if engine is None:
+                    engine = self.engine_factory()
+                start = time.perf_counter()
+                data = self._render(engine, text)
+                self.stats["synthesized"] += 1
+                self.stats["synth_seconds"] += time.perf_counter() - start
+                if self.cache is not None:
+                    self.cache.put(key, data)
+                future.set_result(data)
+            except Exception as exc:
+                log.warning("tts: synthesis failed: %r", exc)
+                future.set_exception(exc)
+            finally:
+                with self._lock:
+                    self._inflight.pop(key, None)
+
+    @staticmethod
+    def _render(engine, text: str) -> bytes:
+        with tempfile.NamedTemporaryFile(delete=False, suffix=".wav") as tmp:
+            out_path = tmp.name
+        try:
+            engine.save_to_file(text, out_path)
+            engine.runAndWait()
+            with open(out_path, "rb") as f:
+                return f.read()
+        finally:
+            try:
+                Path(out_path).unlink(missing_ok=True)
+            except OSError:
+                pass
+
+    def synthesize(self, text: str) -> Future:
+        key = TTSCache.key(text, self.voice)
+        cached = self.cache.get(key) if self.cache is not None else None
+        future = Future()
+        if cached is not None:
+            self.stats["cache_hits"] += 1
+            future.set_result(cached)
+            return future
+        self._start()
+        with self._lock:
+            # A sentence repeated within an answer is synthesized once.
+            pending = self._inflight.get(key)
+            if pending is not None:
+                return pending
+            self._inflight[key] = future
+        self._jobs.put((text, key, future))
+        return future
+
+    def stream(self) -> "SpeechStream":
+        return SpeechStream(self)
+
+
+class SpeechStream:
+    """
+    Spoken version of one answer, synthesized while the answer streams in.
+
+    ``feed`` tokens as they arrive: each completed sentence goes to the
+    worker straight away. ``close`` after the last token, then iterate
+    ``segments`` for one WAV clip per sentence, in order, each as soon as it
+    is ready. ``stats`` reports ``first_segment_ms`` (first token to the
+    first sentence synthesized, i.e. when a player consuming ``segments``
+    could start), sentence count and cache hits.
+    """
+
+    def __init__(self, worker: TTSWorker):
+        self.worker = worker
+        self._splitter = SentenceSplitter()
+        self._futures = []
+        self._started = None
+        self._closed = False
+        self.stats = {"sentences": 0, "cache_hits": 0, "first_segment_ms": None}
+
+    def _submit(self, sentences):
+        for sentence in sentences:
+            future = self.worker.synthesize(sentence)
+            self.stats["sentences"] += 1
+            if future.done():
+                self.stats["cache_hits"] += 1
+            if not self._futures:
+                future.add_done_callback(self._first_segment)
+            self._futures.append(future)
+
+    def _first_segment(self, future):
+        if self.stats["first_segment_ms"] is None:
+            self.stats["first_segment_ms"] = round((time.perf_counter() - self._started) * 1000, 1)
+
+    def feed(self, token: str):
+        if self._started is None:
+            self._started = time.perf_counter()
+        self._submit(self._splitter.feed(token))
+
+    def close(self):
+        if not self._closed:
+            self._closed = True
+            if self._started is None:
+                self._started = time.perf_counter()
+            self._submit(self._splitter.flush())
+
+    def segments(self):
+        """WAV bytes per sentence, in order; blocks until each is synthesized."""
+        self.close()
+        for future in self._futures:
+            yield future.result()
+
+
+def concat_wav(segments) -> bytes:
+    """Join WAV clips with the same format into one WAV file."""
+    out, writer = io.BytesIO(), None
+    for segment in segments:
+        with wave.open(io.BytesIO(segment), "rb") as clip:
+            if writer is None:
+                writer = wave.open(out, "wb")
+                writer.setparams(clip.getparams())
+            writer.writeframes(clip.readframes(clip.getnframes()))
+    if writer is None:
+        return b""
+    writer.close()
+    return out.getvalue()
@@ -1,61 +1,79 @@
-from vosk import Model, KaldiRecognizer
-import pyaudio
+import threading
 from pathlib import Path
-import json
-import pyttsx3
-import tempfile
-
-MODEL_PATH = Path(r"C:\Users\Prabha\Downloads\vosk-model-small-en-us-0.15\vosk-model-small-en-us-0.15")
-_model = Model(str(MODEL_PATH))
-
-
-def transcribe_once(max_seconds: int = 10) -> str:
-    rec = KaldiRecognizer(_model, 16000)
-    p = pyaudio.PyAudio()
-    stream = p.open(
-        format=pyaudio.paInt16,
-        channels=1,
-        rate=16000,
-        input=True,
-        frames_per_buffer=4096,
-    )
-    stream.start_stream()
-    frames_needed = int(16000 / 4096 * max_seconds)
-    text = ""
-    try:
-        for _ in range(frames_needed):
-            data = stream.read(4096, exception_on_overflow=False)
-            if rec.AcceptWaveform(data):
-                result = json.loads(rec.Result())
-                text = result.get("text", "")
-                break
-        if not text:
-            result = json.loads(rec.FinalResult())
-            text = result.get("text", "")
-    finally:
-        stream.stop_stream()
-        stream.close()
-        p.terminate()
-    return text
+
+from src import config
+
+# Vosk, PyAudio and pyttsx3 are imported on first use, so text-only sessions
+# never load them and a missing model only fails the recording that needs it.
+_lock = threading.Lock()
+_model = None
+_stt = None
+_tts_worker = None
+
+
+def get_stt_model():
+    """Process-wide Vosk ``Model`` from ``config.VOSK_MODEL_PATH``, loaded on first call."""
+    global _model
+    with _lock:
+        if _model is None:
+            path = Path(config.VOSK_MODEL_PATH)
+            if not path.is_dir():
+                raise FileNotFoundError(
+                    f"Vosk model not found at {path}; download one and set RAG_VOSK_MODEL_PATH"
+                )
+            from vosk import Model
+
+            _model = Model(str(path))
+        return _model
+
+
+def get_stt_service():
+    """Process-wide ``SpeechService``: keeps the microphone open and the recognizer warm between recordings."""
+    global _stt
+    model = get_stt_model()
+    with _lock:
+        if _stt is None:
+            from src.voice.stt_service import SpeechService
+
+            _stt = SpeechService(model)
+        return _stt
+
+
+def get_tts_worker():
+    """Process-wide ``TTSWorker``; its thread creates the pyttsx3 engine on the first synthesis."""
+    global _tts_worker
+    with _lock:
+        if _tts_worker is None:
+            from src.voice.tts_service import TTSWorker
+
+            _tts_worker = TTSWorker()
+        return _tts_worker
+
+
+def speech_stream():
+    """New ``SpeechStream``: feed it answer tokens, then play its ``segments()``."""
+    return get_tts_worker().stream()
+
+
+def transcribe_once(max_seconds: float = None, on_partial=None) -> str:
+    """
+    Record one utterance from the microphone and return its transcript.
+
+    Recording ends after a pause (voice-activity endpointing), after
+    ``max_seconds`` of speech, or when nobody speaks. ``on_partial(text)``
+    receives the transcript while the user is still speaking.
+    """
+    return get_stt_service().listen(on_partial=on_partial, max_seconds=max_seconds)["text"]
 
 
 def tts_to_bytes(text: str) -> bytes:
-    engine = pyttsx3.init()
-    engine.setProperty("rate", 150)
-    engine.setProperty("volume", 1.0)
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".wav") as tmp:
-        out_path = tmp.name
-    try:
-        engine.save_to_file(text, out_path)
-        engine.runAndWait()
-        with open(out_path, "rb") as f:
-            return f.read()
-    finally:
-        try:
-            Path(out_path).unlink(missing_ok=True)
-        except OSError:
-            pass
+    """Whole ``text`` as one WAV clip, built from cached or freshly synthesized sentences."""
+    from src.voice.tts_service import concat_wav
+
+    stream = speech_stream()
+    stream.feed(text)
+    return concat_wav(stream.segments())
 
 
 if __name__ == "__main__":
-    print(transcribe_once())
\ No newline at end of file
+    print(transcribe_once())
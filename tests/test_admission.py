@@ -0,0 +1,83 @@
+import asyncio
+
+import pytest
+
+from src.api.server import AdmissionQueue, QueueFull, _AdmittedStream
+
+
+def test_slots_queue_and_reject():
+    async def scenario():
+        admission = AdmissionQueue(workers=1, max_waiting=1, timeout=5)
+        await admission.acquire()
+        waiter = asyncio.ensure_future(admission.acquire())
+        await asyncio.sleep(0)
+        assert admission.stats["waiting"] == 1
+        with pytest.raises(QueueFull):
+            await admission.acquire()
+        admission.release()
+        await waiter
+        assert admission.stats["running"] == 1
+        admission.release()
+        return admission.stats
+
+    stats = asyncio.run(scenario())
+    assert stats == {"running": 0, "waiting": 0, "admitted": 2, "rejected": 1, "timed_out": 0}
+
+
+def test_wait_times_out():
+    async def scenario():
+        admission = AdmissionQueue(workers=1, max_waiting=4, timeout=0.05)
+        async with admission.slot():
+            with pytest.raises(QueueFull):
+                await admission.acquire()
+        return admission
+
+    admission = asyncio.run(scenario())
+    assert admission.stats["timed_out"] == 1
+    assert admission.stats["running"] == 0 and admission.stats["waiting"] == 0
+
+
+def _run_stream(send_fails: bool):
+    async def scenario():
+        admission = AdmissionQueue(workers=1, max_waiting=0, timeout=1)
+        await admission.acquire()
+        started = []
+
+        async def body():
+            started.append(True)
+            try:
+                yield "event: done\ndata: {}\n\n"
+            finally:
+                response.release()
+
+        async def send(message):
+            if send_fails:
+                raise OSError("client went away")
+
+        async def receive():
+            await asyncio.sleep(10)
+            return {"type": "http.disconnect"}
+
+        response = _AdmittedStream(body(), admission, media_type="text/event-stream")
+        scope = {"type": "http", "asgi": {"spec_version": "2.4"}}
+        try:
+            await response(scope, receive, send)
+        except Exception:
+            pass
+        # The slot is free again: a new request is admitted without waiting.
+        await asyncio.wait_for(admission.acquire(), 0.5)
+        return started, admission.stats
+
+    return asyncio.run(scenario())
+
+
+def test_stream_releases_slot_when_body_never_starts():
+    started, stats = _run_stream(send_fails=True)
+    assert not started
+    assert stats["running"] == 1
+
+
+def test_stream_releases_slot_once_after_body():
+    started, stats = _run_stream(send_fails=False)
+    assert started
+    assert stats["running"] == 1
@@ -0,0 +1,85 @@
+import pytest
+from langchain_core.documents import Document
+
+from src.Nodes.conversation import ConversationMemory, classify_follow_up, condense_history, route_question
+
+
+def _history():
+    return [{
+        "question": "What is the torque value for the front brake caliper bolts?",
+        "answer": "- Tighten the front brake caliper bolts to 35 Nm.\n- Use a new locking compound.",
+        "documents": [
+            Document(page_content="Front brake caliper bolts: 35 Nm. Rear brake caliper bolts: 28 Nm. "
+                                  "Apply locking compound to the threads before installation."),
+        ],
+    }]
+
+
+@pytest.mark.parametrize("question", [
+    "Tell me more",
+    "Can you elaborate on that?",
+    "Explain the second point",
+    "And the rear ones?",
+    "What about the rear caliper?",
+    "Why is that?",
+])
+def test_follow_up_covered_by_previous_documents_is_reused(question):
+    assert classify_follow_up(question, _history()) == "reuse"
+
+
+@pytest.mark.parametrize("question", [
+    "What about the parking brake?",
+    "And the nuts?",
+])
+def test_follow_up_with_new_terms_extends(question):
+    assert classify_follow_up(question, _history()) == "extend"
+
+
+@pytest.mark.parametrize("question", [
+    # Standalone questions that only happen to open with a conjunction.
+    "Why does the hydraulic pump overheat in winter?",
+    "Also, how do I reset the infotainment system?",
+    "So what is the warranty period?",
+    "So what is the warranty period for the battery pack?",
+    "Then how often should the coolant be replaced?",
+    "But where is the spare tyre stored?",
+    # A reference word with a whole new subject.
+    "How do I pair it with the infotainment bluetooth module?",
+    # No continuation cue at all.
+    "What is the tyre pressure?",
+])
+def test_standalone_question_is_new(question):
+    assert classify_follow_up(question, _history()) == "new"
+
+
+def test_no_history_or_no_documents_is_new():
+    assert classify_follow_up("Tell me more", []) == "new"
+    history = _history()
+    history[-1]["documents"] = []
+    assert classify_follow_up("Tell me more", history) == "new"
+
+
+def test_route_question_uses_precomputed_mode():
+    state = {"question": "Also, how do I reset the infotainment system?", "history": _history()}
+    assert route_question(state) == "retrive"
+    assert route_question(dict(state, follow_up="reuse")) == "follow_up"
+
+
+def test_condense_history_keeps_newest_turns_within_budget():
+    history = [{"question": f"Question {i}?", "answer": "word " * 200} for i in range(5)]
+    text = condense_history(history, max_tokens=120)
+    assert "Question 4?" in text
+    assert "Question 0?" not in text
+    assert text.endswith("...")
+
+
+def test_memory_inputs_and_record():
+    memory = ConversationMemory(max_turns=2)
+    assert memory.inputs("What is the torque value?")["follow_up"] == "new"
+    documents = _history()[0]["documents"]
+    for i in range(3):
+        memory.record({"question": f"Question {i}?", "generation": "35 Nm.", "documents": documents})
+    memory.record({"question": "Tell me more", "generation": "35 Nm.", "documents": documents,
+                   "conversation": {"mode": "reuse", "reused_documents": 1, "retrieval_avoided": True}})
+    assert [t["question"] for t in memory.turns] == ["Question 2?", "Tell me more"]
+    assert memory.stats == {"turns": 4, "follow_ups": 1, "retrievals_avoided": 1, "grades_avoided": 1}
@@ -0,0 +1,76 @@
+import asyncio
+
+import pytest
+from langchain_core.documents import Document
+from langchain_core.runnables import RunnableLambda
+
+from src.Nodes.chat_with_pdf import _parse_batch_verdicts, _prefilter_by_score, agrade_docs, grade_docs
+
+
+def _doc(text, **metadata):
+    return Document(page_content=text, metadata=metadata)
+
+
+def _grader(calls):
+    def grade(inputs):
+        calls.append(inputs["document"])
+        return "yes" if "relevant" in inputs["document"] else "no"
+    return RunnableLambda(grade)
+
+
+def _docs():
+    return [
+        _doc("clear hit", score=0.95),
+        _doc("clear miss", score=0.1),
+        _doc("lexical match", score=0.1, bm25_score=4.2),
+        _doc("relevant but ambiguous", score=0.6),
+        _doc("ambiguous noise", score=0.6),
+        _doc("relevant without a score"),
+    ]
+
+
+def test_prefilter_decides_clear_hits_and_misses():
+    verdicts, ambiguous = _prefilter_by_score(_docs(), accept_score=0.85, reject_score=0.3)
+    assert verdicts == {0: True, 1: False}
+    # Lexical hits and unscored chunks always go to the grader.
+    assert ambiguous == [2, 3, 4, 5]
+
+
+@pytest.mark.parametrize("mode", ["sequential", "concurrent"])
+def test_grade_docs_only_grades_the_ambiguous_band(mode):
+    calls = []
+    state = {"question": "q", "documents": _docs()}
+    update = grade_docs(state, _grader(calls), mode=mode, accept_score=0.85, reject_score=0.3)
+    assert sorted(calls) == sorted(["lexical match", "relevant but ambiguous", "ambiguous noise",
+                                    "relevant without a score"])
+    assert [d.page_content for d in update["documents"]] == [
+        "clear hit", "relevant but ambiguous", "relevant without a score"]
+    grading = update["grading"]
+    assert grading["llm_calls"] == 4 and grading["llm_calls_saved"] == 2
+    assert grading["prefiltered_accept"] == 1 and grading["prefiltered_reject"] == 1
+
+
+def test_thresholds_outside_the_score_range_grade_everything():
+    calls = []
+    update = grade_docs({"question": "q", "documents": _docs()}, _grader(calls), mode="sequential",
+                        accept_score=2.0, reject_score=-1.0)
+    assert len(calls) == 6 and update["grading"]["llm_calls_saved"] == 0
+
+
+def test_async_grading_matches_sync():
+    state = {"question": "q", "documents": _docs()}
+    sync = grade_docs(state, _grader([]), mode="concurrent", accept_score=0.85, reject_score=0.3)
+    async_ = asyncio.run(agrade_docs(state, _grader([]), mode="concurrent", accept_score=0.85, reject_score=0.3))
+    assert [d.page_content for d in async_["documents"]] == [d.page_content for d in sync["documents"]]
+
+
+def test_failed_pass_counts_wasted_calls():
+    state = {"question": "q", "documents": [_doc("noise", score=0.5), _doc("more noise", score=0.5)]}
+    update = grade_docs(state, _grader([]), mode="sequential", accept_score=0.85, reject_score=0.3)
+    assert update["documents"] == []
+    assert update["loop_stats"]["wasted_llm_calls"] == 2
+
+
+def test_single_prompt_verdict_parsing():
+    reply = "1: yes\n[2] - no\n3) YES\n9: yes\n1: no"
+    assert _parse_batch_verdicts(reply, 3) == {0: True, 1: False, 2: True}
@@ -0,0 +1,79 @@
+import pytest
+
+from src import config
+from src.graph import graph_cache
+
+
+class _FakeTool:
+    def __init__(self, digest):
+        self.digest = digest
+        self.index_key = f"index-{digest}"
+        self.embedding = None
+
+
+class _FakeBuilder:
+    def __init__(self, pdf_path=None, components=None, digest=None, retriever=None):
+        self.digest = digest
+
+    def build(self):
+        return f"graph-{self.digest}"
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    for name in ("_graphs", "_answer_caches"):
+        monkeypatch.setattr(graph_cache, name, graph_cache.OrderedDict())
+    for name in ("_key_locks", "_verifiers", "_components"):
+        monkeypatch.setattr(graph_cache, name, {})
+    monkeypatch.setattr(config, "GRAPH_CACHE_SIZE", 2)
+    monkeypatch.setattr(graph_cache, "build_pdf_tool", lambda path, digest=None: _FakeTool(digest))
+    monkeypatch.setattr(graph_cache, "SemanticAnswerCache", lambda digest, index_key, embedding: (digest, index_key))
+    monkeypatch.setattr(graph_cache, "Graph_builder", _FakeBuilder)
+    monkeypatch.setattr(graph_cache, "get_components", lambda: None)
+    return graph_cache
+
+
+def test_answer_caches_are_evicted_with_their_graph(cache):
+    for digest in ("a", "b"):
+        cache.get_graph(f"{digest}.pdf", digest=digest)
+        assert cache.get_answer_cache(f"{digest}.pdf", digest=digest) == (digest, f"index-{digest}")
+    cache.get_graph("c.pdf", digest="c")
+    cache.get_answer_cache("c.pdf", digest="c")
+
+    digests = [key[1] for key in cache._answer_caches]
+    assert digests == ["b", "c"]
+    assert [key[1] for key in cache._graphs] == ["b", "c"]
+    # No lock is kept for anything that was evicted.
+    assert not [k for k in cache._key_locks if "a" in k]
+
+
+def test_answer_caches_without_graphs_are_bounded(cache):
+    for digest in "abcde":
+        cache.get_answer_cache(f"{digest}.pdf", digest=digest)
+    assert len(cache._answer_caches) == 2
+    assert len([k for k in cache._key_locks if k[0] == "answers"]) <= 2
+
+
+def test_one_verifier_per_process(cache, monkeypatch):
+    closed = []
+
+    class _Verifier:
+        def __init__(self, *args):
+            pass
+
+        def close(self):
+            closed.append(self)
+
+    import src.Nodes.grounding as grounding
+    import src.tools.PDF_tool as PDF_tool
+
+    monkeypatch.setattr(grounding, "GroundingVerifier", _Verifier)
+    monkeypatch.setattr(PDF_tool, "make_embeddings", lambda: None)
+    monkeypatch.setattr(cache, "get_components", lambda: (None,) * 6)
+    monkeypatch.setattr(config, "GROUNDING_VERIFY", True)
+    first = cache.get_verifier()
+    assert cache.get_verifier() is first
+    monkeypatch.setattr(config, "LLM_MODEL", "another-model")
+    second = cache.get_verifier()
+    assert second is not first and closed == [first]
+    assert list(cache._verifiers.values()) == [second]
@@ -0,0 +1,64 @@
+import pytest
+from langchain_core.documents import Document
+
+from benchmarks.fake_ollama import FakeOllamaEmbeddings
+from src import config
+from src.tools.index_cache import IndexCache
+from src.tools.library import DocumentLibrary
+
+# Per shard: (dense hits as (cosine, chunk id), lexical hits as (BM25 score, chunk id)).
+# The tiny document's BM25 scores are inflated by its own small-corpus IDF.
+_SHARDS = {
+    "big": ([(0.80, "big2"), (0.79, "big1")], [(3.0, "big1"), (2.5, "big2")]),
+    "tiny": ([(0.30, "tiny1"), (0.20, "tiny2")], [(12.0, "tiny1"), (11.0, "tiny2")]),
+}
+
+
+@pytest.fixture
+def library(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "HYBRID_SEARCH", True)
+    monkeypatch.setattr(config, "HYBRID_RRF_K", 60)
+    library = DocumentLibrary(str(tmp_path / "library"), index_cache=IndexCache(tmp_path / "indexes"),
+                              embedding=FakeOllamaEmbeddings(dim=16))
+    library.manifest["documents"] = {doc_id: {"name": f"{doc_id}.pdf"} for doc_id in _SHARDS}
+
+    def search_shard(doc_id, entry, query, vector, fetch_k):
+        dense, lexical = _SHARDS[doc_id]
+        doc = lambda chunk_id: Document(id=chunk_id, page_content=chunk_id, metadata={})
+        return ([(s, c, doc_id, doc(c)) for s, c in dense], [(s, c, doc_id, doc(c)) for s, c in lexical],
+                entry["name"], None)
+
+    monkeypatch.setattr(library, "_search_shard", search_shard)
+    return library
+
+
+def test_bm25_scores_are_not_compared_across_shards(library):
+    docs, timings = library.search_with_timings("query", k=2, fetch_k=4)
+    # Each big-manual chunk tops one list and is second in the other; ranking raw BM25
+    # globally would have let the tiny document's inflated scores push one of them out.
+    assert {d.id for d in docs} == {"big1", "big2"}
+    assert timings["shards"] == 2
+
+
+def test_hits_keep_their_shard_tags_and_scores(library):
+    docs, _ = library.search_with_timings("query", k=4, fetch_k=4)
+    by_id = {d.id: d.metadata for d in docs}
+    assert by_id["tiny1"]["library_name"] == "tiny.pdf"
+    assert by_id["tiny1"]["bm25_score"] == 12.0 and by_id["big1"]["score"] == 0.79
+    assert [d.metadata["rrf_score"] for d in docs] == sorted((d.metadata["rrf_score"] for d in docs), reverse=True)
+
+
+def test_manifest_is_read_once_per_search(library):
+    seen = []
+    original = library._search_shard
+
+    def search_shard(doc_id, entry, *args):
+        # A document removed mid-search is still searched with its snapshot entry.
+        library.manifest["documents"].pop("tiny", None)
+        seen.append(entry["name"])
+        return original(doc_id, entry, *args)
+
+    library._search_shard = search_shard
+    library._pool = type("Serial", (), {"map": staticmethod(lambda fn, items: [fn(i) for i in items])})()
+    docs, _ = library.search_with_timings("query", k=4, fetch_k=4)
+    assert sorted(seen) == ["big.pdf", "tiny.pdf"] and len(docs) == 4
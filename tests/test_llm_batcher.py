@@ -0,0 +1,103 @@
+import threading
+import time
+
+import pytest
+
+from src import config
+from src.tools.llm_batcher import _END, BatchingLLM, MicroBatcher
+
+
+class _SlowLLM:
+    """Echoes prompts after ``delay`` seconds and records how many calls overlap."""
+
+    def __init__(self, delay=0.05, fail_on=None):
+        self.delay = delay
+        self.fail_on = fail_on
+        self.prompts = []
+        self.running = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def invoke(self, prompt, stop=None):
+        with self._lock:
+            self.prompts.append(prompt)
+            self.running += 1
+            self.peak = max(self.peak, self.running)
+        try:
+            time.sleep(self.delay)
+            if prompt == self.fail_on:
+                raise RuntimeError("model failed")
+            return f"echo {prompt}"
+        finally:
+            with self._lock:
+                self.running -= 1
+
+    def stream(self, prompt, stop=None):
+        yield from self.invoke(prompt, stop).split(" ")
+
+
+def _results(batcher, prompts):
+    calls = [batcher.submit(p) for p in prompts]
+    return [c.future.result(timeout=10) for c in calls]
+
+
+def test_identical_prompts_are_sent_once():
+    llm = _SlowLLM()
+    batcher = MicroBatcher(llm, window_ms=50, max_batch=4, max_in_flight=4)
+    results = _results(batcher, ["grade a", "grade a", "grade b", "grade a"])
+    assert results == ["echo grade a", "echo grade a", "echo grade b", "echo grade a"]
+    assert sorted(llm.prompts) == ["grade a", "grade b"]
+    assert batcher.stats["calls"] == 4
+    assert batcher.stats["dispatched"] == 2
+    assert batcher.stats["coalesced"] == 2
+
+
+def test_max_in_flight_caps_concurrent_calls():
+    llm = _SlowLLM()
+    batcher = MicroBatcher(llm, window_ms=20, max_batch=8, max_in_flight=2)
+    results = _results(batcher, [f"p{i}" for i in range(6)])
+    assert results == [f"echo p{i}" for i in range(6)]
+    assert llm.peak <= 2
+    assert batcher.stats["largest_batch"] <= 2
+
+
+def test_max_batch_caps_batch_size_not_concurrency():
+    llm = _SlowLLM(delay=0.2)
+    batcher = MicroBatcher(llm, window_ms=20, max_batch=2, max_in_flight=6)
+    results = _results(batcher, [f"p{i}" for i in range(6)])
+    assert results == [f"echo p{i}" for i in range(6)]
+    assert batcher.stats["largest_batch"] == 2
+    # Later batches start while earlier ones still run.
+    assert llm.peak > 2
+
+
+def test_failure_reaches_every_coalesced_caller():
+    batcher = MicroBatcher(_SlowLLM(fail_on="bad"), window_ms=30, max_batch=4, max_in_flight=4)
+    calls = [batcher.submit("bad"), batcher.submit("bad"), batcher.submit("good")]
+    for call in calls[:2]:
+        with pytest.raises(RuntimeError):
+            call.future.result(timeout=10)
+    assert calls[2].future.result(timeout=10) == "echo good"
+
+
+def test_streamed_chunks_are_fanned_out():
+    batcher = MicroBatcher(_SlowLLM(), window_ms=30, max_batch=4, max_in_flight=4)
+    received = {0: [], 1: []}
+    calls = [batcher.submit("hello", emit=received[i].append) for i in range(2)]
+    for call in calls:
+        assert call.future.result(timeout=10) == "echohello"
+    assert received[0] == received[1] == ["echo", "hello", _END]
+
+
+def test_batching_llm_is_a_drop_in_llm():
+    llm = BatchingLLM(inner=_SlowLLM(delay=0), window_ms=0, max_batch=2, max_in_flight=2)
+    assert llm.invoke("question") == "echo question"
+    assert "".join(llm.stream("question")) == "echoquestion"
+    assert llm.batcher.max_batch == 2 and llm.batcher.max_in_flight == 2
+
+
+def test_batching_llm_defaults_come_from_config():
+    llm = BatchingLLM(inner=_SlowLLM(delay=0), window_ms=None, max_batch=None, max_in_flight=None)
+    assert llm.batcher.window_s == config.LLM_BATCH_WINDOW_MS / 1000
+    assert llm.batcher.max_batch == config.LLM_BATCH_MAX_SIZE
+    assert llm.batcher.max_in_flight == config.LLM_MAX_IN_FLIGHT
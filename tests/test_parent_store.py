@@ -0,0 +1,97 @@
+from langchain_core.documents import Document
+
+from benchmarks.fake_ollama import FakeOllamaEmbeddings
+from benchmarks.synthetic_pdf import make_pdf
+from src.tools.ingestion import StreamingIngestor
+from src.tools.parent_store import ParentStore, expand_parents
+from src.tools.retrievers import ParentRetriever
+
+
+def _store():
+    store = ParentStore()
+    store.add("p1", "Page one: brakes, calipers and pads.", {"page": 0})
+    store.add("p2", "Page two: coolant and the radiator.", {"page": 1})
+    for child, parent in [("c1", "p1"), ("c2", "p1"), ("c3", "p2")]:
+        store.link(child, parent)
+    return store
+
+
+def _child(child_id, **metadata):
+    return Document(id=child_id, page_content=f"text of {child_id}", metadata=metadata)
+
+
+def test_children_collapse_into_parents_in_rank_order():
+    children = [_child("c3", score=0.7), _child("c1", score=0.6, bm25_score=2.0), _child("c2", score=0.9)]
+    parents = expand_parents(children, lambda _child: _store())
+    assert [p.id for p in parents] == ["p2", "p1"]
+    p1 = parents[1]
+    assert p1.page_content == "Page one: brakes, calipers and pads."
+    assert p1.metadata["child_hits"] == 2
+    # Best score of the merged children, not the first one's.
+    assert p1.metadata["score"] == 0.9
+    assert p1.metadata["bm25_score"] == 2.0
+    assert p1.metadata["page"] == 0
+
+
+def test_unknown_children_pass_through_and_k_limits():
+    store = _store()
+    stray = _child("unknown", score=0.5)
+    parents = store.expand([_child("c1"), stray, _child("c3")], k=2)
+    assert [d.id for d in parents] == ["p1", "unknown"]
+    assert expand_parents([stray], lambda _child: None) == [stray]
+
+
+def test_extra_child_metadata_is_carried_per_store():
+    other = ParentStore()
+    other.add("q1", "Another manual's page.", {"page": 0})
+    other.link("d1", "q1")
+    stores = {"a": _store(), "b": other}
+    children = [_child("c1", library_doc_id="a", library_name="a.pdf", score=0.8),
+                _child("d1", library_doc_id="b", library_name="b.pdf", score=0.7),
+                _child("c2", library_doc_id="a", library_name="a.pdf", score=0.6)]
+    parents = expand_parents(children, lambda d: stores[d.metadata["library_doc_id"]])
+    assert [(p.id, p.metadata["library_name"], p.metadata["child_hits"]) for p in parents] == [
+        ("p1", "a.pdf", 2), ("q1", "b.pdf", 1)]
+
+
+def test_parent_documents_are_copies():
+    store = _store()
+    store.parent_of("c1").metadata["page"] = 99
+    assert store.parent_of("c1").metadata["page"] == 0
+
+
+def test_save_and_load_round_trip(tmp_path):
+    store = _store()
+    path = tmp_path / "parents.json"
+    store.save(path)
+    loaded = ParentStore.load(path)
+    assert loaded.ids == store.ids and loaded.child_parent == store.child_parent
+    assert loaded.parent_of("c3").page_content == store.parent_of("c3").page_content
+    assert ParentStore.load(tmp_path / "missing.json") is None
+    (tmp_path / "broken.json").write_text("{")
+    assert ParentStore.load(tmp_path / "broken.json") is None
+
+
+def test_ingestion_links_every_chunk_to_a_page_parent(tmp_path):
+    path = make_pdf(str(tmp_path / "manual.pdf"), 3)
+    ingestor = StreamingIngestor(FakeOllamaEmbeddings(dim=32), parent_child=True)
+    vectorstore, bm25 = ingestor.ingest(path)
+    parents = ingestor.parents
+    ids = list(vectorstore.index_to_docstore_id.values())
+    assert len(parents) >= 3 and ingestor.stats["parents"] == len(parents)
+    assert set(parents.child_parent) == set(ids)
+    for chunk_id in ids:
+        chunk = vectorstore.docstore.search(chunk_id)
+        parent = parents.parent_of(chunk_id)
+        assert "parent_id" not in chunk.metadata
+        assert chunk.page_content in parent.page_content
+        assert chunk.metadata["page"] == parent.metadata["page"]
+
+    class _Child:
+        def invoke(self, query):
+            return [Document(id=i, page_content="", metadata={}) for i in ids[:6]]
+
+    docs, timings = ParentRetriever(child=_Child(), parents=parents, k=2).search_with_timings("q")
+    assert len(docs) <= 2 and timings["children"] == 6
+    assert all(d.id in parents.ids for d in docs)
+
@@ -0,0 +1,29 @@
+import pypdf
+
+from benchmarks.synthetic_pdf import make_pdf
+from src.tools import pdf_extract
+
+
+def test_page_labels_are_computed_once(tmp_path, monkeypatch):
+    path = str(tmp_path / "doc.pdf")
+    make_pdf(path, pages=9, lines_per_page=5)
+    calls = []
+    page_labels = pypdf.PdfReader.page_labels
+
+    def counting(reader):
+        calls.append(1)
+        return page_labels.fget(reader)
+
+    monkeypatch.setattr(pypdf.PdfReader, "page_labels", property(counting))
+    docs = list(pdf_extract.extract_pages(path, workers=1, pages_per_task=2, strip_repeated=False))
+
+    assert len(calls) == 1
+    assert [d.metadata["page"] for d in docs] == list(range(9))
+    assert [d.metadata["page_label"] for d in docs] == [str(i + 1) for i in range(9)]
+
+
+def test_extract_range_uses_the_labels_it_is_given(tmp_path):
+    path = str(tmp_path / "doc.pdf")
+    make_pdf(path, pages=4, lines_per_page=5)
+    pages = pdf_extract._extract_range(path, 2, 4, ["iii", "iv"])
+    assert [(i, label) for i, label, _ in pages] == [(2, "iii"), (3, "iv")]
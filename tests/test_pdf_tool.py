@@ -0,0 +1,45 @@
+import pytest
+
+from src import config
+from src.tools import PDF_tool
+
+
+class _FakeTool:
+    def __init__(self, pdf_path, on_progress=None, digest=None):
+        self.pdf_path = pdf_path
+        self.digest = digest
+
+
+@pytest.fixture
+def tools(monkeypatch):
+    monkeypatch.setattr(PDF_tool, "PDFTool", _FakeTool)
+    monkeypatch.setattr(PDF_tool, "_tools", PDF_tool.OrderedDict())
+    monkeypatch.setattr(PDF_tool, "_tool_locks", {})
+    monkeypatch.setattr(config, "PDF_TOOL_CACHE_SIZE", 2)
+    return PDF_tool
+
+
+def test_tools_are_shared_per_digest(tools):
+    first = tools.build_pdf_tool("a.pdf", digest="aa")
+    assert tools.build_pdf_tool("copy-of-a.pdf", digest="aa") is first
+
+
+def test_tool_cache_is_lru_bounded(tools):
+    a = tools.build_pdf_tool("a.pdf", digest="aa")
+    tools.build_pdf_tool("b.pdf", digest="bb")
+    assert tools.build_pdf_tool("a.pdf", digest="aa") is a  # a is now the most recent
+    tools.build_pdf_tool("c.pdf", digest="cc")
+    assert list(tools._tools) == [("sha256", "aa"), ("sha256", "cc")]
+    assert set(tools._tool_locks) <= set(tools._tools)
+    assert tools.build_pdf_tool("b.pdf", digest="bb") is not None
+    assert ("sha256", "aa") not in tools._tools
+
+
+def test_path_keys_drop_older_versions(tools, tmp_path):
+    path = tmp_path / "manual.pdf"
+    path.write_bytes(b"v1")
+    first = tools.build_pdf_tool(str(path))
+    path.write_bytes(b"version 2")
+    second = tools.build_pdf_tool(str(path))
+    assert second is not first
+    assert len(tools._tools) == 1 and len(tools._tool_locks) == 1
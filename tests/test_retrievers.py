@@ -0,0 +1,53 @@
+import pytest
+from langchain_community.vectorstores import FAISS
+
+from benchmarks.fake_ollama import FakeOllamaEmbeddings
+from src.tools.bm25 import BM25Index
+from src.tools.retrievers import HybridRetriever, reciprocal_rank_fusion
+
+
+def test_rrf_sums_reciprocal_ranks():
+    fused = dict(reciprocal_rank_fusion([["a", "b", "c"], ["c", "a"]], rrf_k=60))
+    assert fused["a"] == pytest.approx(1 / 61 + 1 / 62)
+    assert fused["b"] == pytest.approx(1 / 62)
+    assert fused["c"] == pytest.approx(1 / 63 + 1 / 61)
+
+
+def test_rrf_orders_best_first_and_rewards_agreement():
+    fused = reciprocal_rank_fusion([["a", "b", "c"], ["c", "a"]], rrf_k=60)
+    assert [doc_id for doc_id, _ in fused] == ["a", "c", "b"]
+    # An id found by both lists beats one ranked first by a single list.
+    fused = reciprocal_rank_fusion([["x", "y"], ["z", "y"]], rrf_k=1)
+    assert fused[0][0] == "y"
+
+
+def test_rrf_handles_empty_and_single_rankings():
+    assert reciprocal_rank_fusion([]) == []
+    assert reciprocal_rank_fusion([[], []]) == []
+    assert [doc_id for doc_id, _ in reciprocal_rank_fusion([["b", "a"]])] == ["b", "a"]
+
+
+def test_bm25_ranks_exact_terms_and_round_trips(tmp_path):
+    index = BM25Index()
+    index.add(["torque for clause 4.2 is 35 Nm", "brake fluid dot 4", "clause 7.1 wiring"], ["t", "f", "w"])
+    hits = index.search("clause 4.2 torque", k=2)
+    assert hits[0][0] == "t"
+    path = tmp_path / "bm25.json"
+    index.save(path)
+    assert BM25Index.load(path).search("clause 4.2 torque", k=2) == hits
+    assert BM25Index.load(tmp_path / "missing.json") is None
+
+
+def test_hybrid_retriever_merges_dense_and_lexical_hits():
+    texts = [f"Section {i}: general maintenance notes about part {i}." for i in range(20)]
+    texts[7] = "Clause 9.4.1 sets the caliper bolt torque to 35 Nm."
+    vectorstore = FAISS.from_texts(texts, FakeOllamaEmbeddings(dim=64), ids=[f"c{i}" for i in range(20)],
+                                   normalize_L2=True)
+    retriever = HybridRetriever(vectorstore=vectorstore, bm25=BM25Index.from_vectorstore(vectorstore),
+                                k=4, fetch_k=8, rrf_k=60)
+    docs, timings = retriever.search_with_timings("clause 9.4.1 caliper torque")
+    assert len(docs) == 4
+    assert docs[0].id == "c7"
+    assert "bm25_score" in docs[0].metadata and "rrf_score" in docs[0].metadata
+    assert [d.metadata["rrf_score"] for d in docs] == sorted((d.metadata["rrf_score"] for d in docs), reverse=True)
+    assert set(timings) == {"dense_ms", "lexical_ms", "fusion_ms", "total_ms"}
@@ -0,0 +1,81 @@
+from langchain_core.documents import Document
+from langchain_core.runnables import RunnableLambda
+
+from benchmarks.fake_ollama import FakeOllamaLLM
+from src import config
+from src.graph.graph_builder import Graph_builder
+from src.Nodes.chat_with_pdf import decide_to_generate, init_components, not_found, retrieve, transform_query
+from src.Nodes.retrieval_memo import RetrievalMemo, doc_key, normalize_query
+
+_OFF_TOPIC = [Document(id=f"c{i}", page_content=f"Wiper blade replacement, section {i}.") for i in range(3)]
+
+
+def test_normalize_query_ignores_case_punctuation_and_spacing():
+    assert normalize_query("  What's the TORQUE,  value? ") == normalize_query("what s the torque value")
+
+
+def test_doc_key_prefers_id_then_content_and_page():
+    assert doc_key(Document(id="abc", page_content="x")) == "abc"
+    a = Document(page_content="same text", metadata={"page": 1})
+    b = Document(page_content="same text", metadata={"page": 2})
+    assert doc_key(a) != doc_key(b)
+    assert doc_key(a) == doc_key(Document(page_content="same text", metadata={"page": 1}))
+
+
+def test_memo_is_lru_bounded():
+    memo = RetrievalMemo(max_entries=2)
+    for q in ("one", "two", "three"):
+        memo.put_retrieval(q, [Document(page_content=q)])
+    assert memo.get_retrieval("one") is None
+    assert memo.get_retrieval("Three?")[0].page_content == "three"
+    memo.put_grade("Question", _OFF_TOPIC[0], False)
+    assert memo.get_grade("question", _OFF_TOPIC[0]) is False
+    assert memo.get_grade("question", _OFF_TOPIC[1]) is None
+
+
+def test_retrieve_uses_memo_for_a_repeated_query():
+    calls = []
+    retriever = RunnableLambda(lambda q: calls.append(q) or list(_OFF_TOPIC))
+    memo = RetrievalMemo()
+    first = retrieve({"question": "Torque value?"}, retriever, memo)
+    second = retrieve({"question": "torque value", "loop_stats": first["loop_stats"]}, retriever, memo)
+    assert len(calls) == 1
+    assert second["loop_stats"]["retrievals"] == 1 and second["loop_stats"]["retrievals_memoized"] == 1
+    assert [d.id for d in second["documents"]] == [d.id for d in _OFF_TOPIC]
+
+
+def test_decide_stops_after_max_rewrites(monkeypatch):
+    monkeypatch.setattr(config, "MAX_REWRITES", 2)
+    assert decide_to_generate({"question": "q", "documents": _OFF_TOPIC}) == "generate"
+    assert decide_to_generate({"question": "q", "documents": [], "rewrites": 1}) == "transform_query"
+    assert decide_to_generate({"question": "q", "documents": [], "rewrites": 2}) == "not_found"
+
+
+def test_graph_gives_up_after_max_rewrites_without_regrading(monkeypatch):
+    monkeypatch.setattr(config, "MAX_REWRITES", 2)
+    monkeypatch.setattr(config, "GRADING_MODE", "concurrent")
+    llm = FakeOllamaLLM()
+    retriever = RunnableLambda(lambda q: list(_OFF_TOPIC))
+    graph = Graph_builder(retriever=retriever, components=init_components(llm)).build()
+
+    state = graph.invoke({"question": "What is the torque value for the caliper bolts?"})
+
+    assert state["generation"] == config.NOT_FOUND_ANSWER
+    assert llm.calls["rewrite"] == 2
+    # The same chunks come back after every rewrite; only the first pass asks the grader.
+    assert llm.calls["grade"] == len(_OFF_TOPIC)
+    assert state["loop_stats"]["grades_memoized"] == 2 * len(_OFF_TOPIC)
+    # The failed first grading pass plus both rewrites, each counted once.
+    assert state["loop_stats"]["rewrite_llm_calls"] == 2
+    assert state["loop_stats"]["wasted_llm_calls"] == len(_OFF_TOPIC) + 2
+    assert "generate" not in llm.calls
+
+
+def test_rewrites_are_wasted_only_when_the_loop_gives_up():
+    rewriter = RunnableLambda(lambda inputs: inputs["question"] + " (rewritten)")
+    state = {"question": "q", "documents": [], "loop_stats": {"wasted_llm_calls": 3}}
+    update = transform_query(state, rewriter)
+    assert update["loop_stats"]["rewrite_llm_calls"] == 1
+    # A rewrite that leads to relevant chunks was not wasted.
+    assert update["loop_stats"]["wasted_llm_calls"] == 3
+    assert not_found({**state, **update})["loop_stats"]["wasted_llm_calls"] == 4
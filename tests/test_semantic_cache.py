@@ -0,0 +1,75 @@
+import os
+
+import numpy as np
+from langchain_core.documents import Document
+
+from benchmarks.fake_ollama import FakeOllamaEmbeddings
+from src.tools.semantic_cache import SemanticAnswerCache
+
+_DOCS = [Document(page_content="Caliper bolts: 35 Nm.", metadata={"page": 3})]
+
+
+def _cache(root, index_key="index-1", **kwargs):
+    return SemanticAnswerCache("digest", index_key, FakeOllamaEmbeddings(dim=64), root=str(root), **kwargs)
+
+
+def test_hit_returns_stored_answer_and_chunks(tmp_path):
+    cache = _cache(tmp_path, threshold=0.95)
+    cache.put("What is the caliper bolt torque?", "35 Nm.", _DOCS)
+    hit, _ = cache.lookup("What is the caliper bolt torque?")
+    assert hit["generation"] == "35 Nm."
+    assert hit["documents"][0].metadata == {"page": 3}
+    miss, _ = cache.lookup("How do I bleed the brakes?")
+    assert miss is None
+
+
+def test_entries_and_hits_survive_a_restart(tmp_path):
+    cache = _cache(tmp_path, max_entries=2)
+    cache.put("first question about torque", "a", _DOCS)
+    cache.put("second question about fluid", "b", _DOCS)
+    cache.lookup("first question about torque")  # first is now the most recently used
+    cache.close()
+
+    reopened = _cache(tmp_path, max_entries=2)
+    assert [e["hits"] for e in reopened._entries] == [1, 0]
+    reopened.put("third question about pads", "c", _DOCS)
+    # The persisted hit kept "first" ahead of "second" in LRU order.
+    assert sorted(e["generation"] for e in reopened._entries) == ["a", "c"]
+    reopened.close()
+    assert sorted(e["generation"] for e in _cache(tmp_path, max_entries=2)._entries) == ["a", "c"]
+
+
+def test_put_appends_a_row_instead_of_rewriting_the_file(tmp_path):
+    cache = _cache(tmp_path)
+    cache.put("question zero", "answer", _DOCS)
+    rows_before = cache._conn.execute("SELECT id FROM entries").fetchall()
+    cache.put("question one", "answer", _DOCS)
+    rows_after = cache._conn.execute("SELECT id FROM entries").fetchall()
+    assert rows_after[: len(rows_before)] == rows_before and len(rows_after) == 2
+    assert isinstance(cache._entries[0]["vector"], np.ndarray)
+
+
+def test_reindexed_document_drops_answers(tmp_path):
+    cache = _cache(tmp_path)
+    cache.put("question", "answer", _DOCS)
+    cache.close()
+    assert len(_cache(tmp_path)._entries) == 1
+    assert _cache(tmp_path, index_key="index-2")._entries == []
+    assert _cache(tmp_path, index_key="index-2")._entries == []
+
+
+def test_expired_entries_are_purged(tmp_path):
+    cache = _cache(tmp_path, ttl_seconds=1)
+    cache.put("question", "answer", _DOCS)
+    cache._entries[0]["created"] -= 10
+    assert cache.lookup("question")[0] is None
+    assert cache._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0] == 0
+
+
+def test_clear_and_legacy_json_file(tmp_path):
+    (tmp_path / "digest.json").write_text("{}")
+    cache = _cache(tmp_path)
+    assert not os.path.exists(tmp_path / "digest.json")
+    cache.put("question", "answer", _DOCS)
+    cache.clear()
+    assert cache.lookup("question")[0] is None and _cache(tmp_path)._entries == []
@@ -0,0 +1,64 @@
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+
+from src.api.server import create_app
+
+
+def test_create_app_with_default_config(tmp_path, monkeypatch):
+    # Default LLM, embeddings, batch window, admission queue and upload store.
+    monkeypatch.chdir(tmp_path)
+    app = create_app()
+    with TestClient(app) as client:
+        health = client.get("/health").json()
+    assert health["status"] == "ok"
+    assert health["documents"] == 0
+    assert health["queue"]["running"] == 0
+    assert (tmp_path / "uploaded_pdfs").is_dir()
+
+
+class _FakeTool:
+    built = []
+
+    def __init__(self, pdf_path, embedding=None, digest=None):
+        _FakeTool.built.append(digest)
+        self.digest = digest
+        self.index_key = f"index-{digest}"
+        self.embedding = embedding
+        self.vectorstore = type("VS", (), {"index": type("I", (), {"ntotal": 3})()})()
+
+    def get_retriever(self):
+        return None
+
+
+class _FakeBuilder:
+    def __init__(self, retriever=None, components=None):
+        pass
+
+    def build(self):
+        return "graph"
+
+
+def test_registry_skips_index_work_for_known_documents(tmp_path, monkeypatch):
+    from src.api import server
+
+    monkeypatch.setattr(server, "PDFTool", _FakeTool)
+    monkeypatch.setattr(server, "Graph_builder", _FakeBuilder)
+    monkeypatch.setattr(server, "SemanticAnswerCache", lambda *args: None)
+    _FakeTool.built = []
+    registry = server.DocumentRegistry(components=None, embedding=object(), max_documents=2)
+    pdf = tmp_path / "a.pdf"
+    pdf.write_bytes(b"%PDF a")
+
+    first = registry.add(str(pdf), "a.pdf")
+    assert registry.add(str(pdf), "copy.pdf") is first
+    assert registry.add(str(pdf), "a.pdf", digest=_FakeTool.built[0]) is first
+    assert len(_FakeTool.built) == 1
+
+    registry.add("b.pdf", "b.pdf", digest="b" * 64)
+    registry.get(first["document_id"])  # a is now the most recent
+    registry.add("c.pdf", "c.pdf", digest="c" * 64)
+    assert len(registry) == 2
+    registry.get(first["document_id"])
+    with pytest.raises(HTTPException):
+        registry.get("b" * 16)
@@ -0,0 +1,91 @@
+import sys
+import threading
+import types
+
+import numpy as np
+import pytest
+
+from src.voice.audio import AudioSource
+
+BLOCK_MS = 100
+RATE = 16000
+LOUD = (np.full(RATE * BLOCK_MS // 1000, 3000, dtype="<i2")).tobytes()
+QUIET = bytes(len(LOUD))
+
+
+class FakeRecognizer:
+    """KaldiRecognizer stand-in: every accepted block adds one word to the partial transcript."""
+
+    def __init__(self, model, rate):
+        self.words = []
+
+    def AcceptWaveform(self, data):
+        self.words.append(f"w{len(self.words)}")
+        return False
+
+    def PartialResult(self):
+        return '{"partial": "%s"}' % " ".join(self.words)
+
+    def FinalResult(self):
+        return '{"text": "%s"}' % " ".join(self.words)
+
+    def Reset(self):
+        self.words = []
+
+
+class BlockSource(AudioSource):
+    """Speech blocks, then silence; ``endless`` keeps speaking forever."""
+
+    rate = RATE
+
+    def __init__(self, speech_blocks=6, endless=False):
+        self.blocks = [QUIET] * 3 + [LOUD] * speech_blocks + [QUIET] * 10
+        self.endless = endless
+        self.reads = 0
+        self.stopped = threading.Event()
+
+    def read(self, samples):
+        self.reads += 1
+        if self.endless:
+            return LOUD
+        return self.blocks.pop(0) if self.blocks else b""
+
+    def stop(self):
+        self.stopped.set()
+
+
+@pytest.fixture
+def service(monkeypatch):
+    monkeypatch.setitem(sys.modules, "vosk", types.SimpleNamespace(KaldiRecognizer=FakeRecognizer))
+    monkeypatch.delitem(sys.modules, "src.voice.stt_service", raising=False)
+    from src.voice.stt_service import SpeechService
+
+    return SpeechService(model=None, block_ms=BLOCK_MS)
+
+
+def test_stream_yields_partials_then_final(service):
+    events = list(service.stream(BlockSource()))
+    assert events[0][0] == "partial"
+    kind, result = events[-1]
+    assert kind == "final"
+    assert result["endpoint"] == "end"
+    assert result["text"]
+
+
+def test_lock_is_free_while_consumer_holds_a_partial(service):
+    stream = service.stream(BlockSource())
+    assert next(stream)[0] == "partial"
+    # The consumer sits on the first partial; recognition still finishes and releases the lock.
+    assert service._lock.acquire(timeout=5)
+    service._lock.release()
+    assert [kind for kind, _ in stream][-1] == "final"
+
+
+def test_closing_the_stream_stops_recognition(service):
+    source = BlockSource(endless=True)
+    stream = service.stream(source, max_seconds=600)
+    assert next(stream)[0] == "partial"
+    stream.close()
+    assert source.stopped.wait(5)
+    assert service._lock.acquire(timeout=5)
+    service._lock.release()
@@ -0,0 +1,39 @@
+import json
+import os
+
+from src import config, tracing
+
+
+def test_prometheus_label_values_are_escaped():
+    registry = tracing.MetricsRegistry()
+    registry.inc("rag_test_total", name='say "hi"\\now\nnext')
+    text = registry.render_prometheus()
+    assert 'rag_test_total{name="say \\"hi\\"\\\\now\\nnext"} 1' in text
+    # Every series stays on one line.
+    assert all(line.startswith(("#", "rag_test_total")) for line in text.strip().splitlines())
+
+
+def test_trace_log_rotates_by_size(tmp_path, monkeypatch):
+    path = str(tmp_path / "traces.jsonl")
+    monkeypatch.setattr(config, "TRACE_LOG_PATH", path)
+    monkeypatch.setattr(config, "TRACE_LOG_MAX_BYTES", 300)
+    monkeypatch.setattr(config, "TRACE_LOG_BACKUPS", 2)
+    for i in range(40):
+        tracing._write_jsonl({"trace_id": i, "pad": "x" * 50})
+
+    files = sorted(os.listdir(tmp_path))
+    assert files == ["traces.jsonl", "traces.jsonl.1", "traces.jsonl.2"]
+    assert all(os.path.getsize(tmp_path / f) <= 300 for f in files)
+    with open(path, encoding="utf-8") as f:
+        assert json.loads(f.readlines()[-1])["trace_id"] == 39
+
+
+def test_trace_log_without_backups_starts_over(tmp_path, monkeypatch):
+    path = str(tmp_path / "traces.jsonl")
+    monkeypatch.setattr(config, "TRACE_LOG_PATH", path)
+    monkeypatch.setattr(config, "TRACE_LOG_MAX_BYTES", 200)
+    monkeypatch.setattr(config, "TRACE_LOG_BACKUPS", 0)
+    for i in range(20):
+        tracing._write_jsonl({"trace_id": i, "pad": "x" * 50})
+    assert os.listdir(tmp_path) == ["traces.jsonl"]
+    assert os.path.getsize(path) <= 200
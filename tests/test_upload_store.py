@@ -0,0 +1,66 @@
+import hashlib
+import io
+import os
+
+import pytest
+
+from src.tools import upload_store
+from src.tools.upload_store import UploadStore, get_upload_store
+
+_PDF = b"%PDF-1.4\n" + os.urandom(3 * upload_store._BLOCK_SIZE // 2)
+
+
+def _stored_files(root):
+    return sorted(n for n in os.listdir(root) if n.endswith(".pdf"))
+
+
+def test_same_bytes_are_stored_once_under_every_name(tmp_path):
+    store = UploadStore(str(tmp_path))
+    first = store.put_bytes(_PDF, "manual.pdf")
+    again = store.put_stream(io.BytesIO(_PDF), "manual (copy).pdf")
+    assert first["digest"] == again["digest"] == hashlib.sha256(_PDF).hexdigest()
+    assert _stored_files(tmp_path) == [f"{first['digest']}.pdf"]
+    assert again["names"] == ["manual.pdf", "manual (copy).pdf"]
+    assert again["size"] == len(_PDF)
+    # No temporary files are left behind by the duplicate upload.
+    assert not [n for n in os.listdir(tmp_path) if n.startswith(".")]
+
+
+def test_existing_file_is_not_rewritten(tmp_path):
+    store = UploadStore(str(tmp_path))
+    path = store.put_bytes(memoryview(_PDF), "a.pdf")["path"]
+    mtime = os.stat(path).st_mtime_ns
+    store.put_bytes(_PDF, "b.pdf")
+    assert os.stat(path).st_mtime_ns == mtime
+
+
+def test_distinct_files_get_distinct_digests(tmp_path):
+    store = UploadStore(str(tmp_path))
+    a = store.put_bytes(b"%PDF one", "same-name.pdf")
+    b = store.put_stream(io.BytesIO(b"%PDF two"), "same-name.pdf")
+    assert a["digest"] != b["digest"]
+    assert len(_stored_files(tmp_path)) == 2
+
+
+def test_manifest_survives_a_new_store(tmp_path):
+    digest = UploadStore(str(tmp_path)).put_bytes(_PDF, "manual.pdf")["digest"]
+    entry = UploadStore(str(tmp_path)).get(digest)
+    assert entry["names"] == ["manual.pdf"]
+    assert entry["path"] == os.path.join(str(tmp_path), f"{digest}.pdf")
+    assert UploadStore(str(tmp_path)).get("0" * 64) is None
+
+
+def test_failed_stream_leaves_no_partial_file(tmp_path):
+    class _Broken(io.BytesIO):
+        def read(self, size=-1):
+            raise OSError("connection reset")
+
+    store = UploadStore(str(tmp_path))
+    with pytest.raises(OSError):
+        store.put_stream(_Broken(), "broken.pdf")
+    assert [n for n in os.listdir(tmp_path) if n != upload_store.MANIFEST_FILE] == []
+
+
+def test_process_wide_store_per_root(tmp_path):
+    assert get_upload_store(str(tmp_path)) is get_upload_store(str(tmp_path / "."))
+    assert get_upload_store(str(tmp_path)) is not get_upload_store(str(tmp_path / "other"))
@@ -0,0 +1,46 @@
+import os
+
+import faiss
+import numpy as np
+import pytest
+
+from src.tools.vector_index import INDEX_MODES, build_index, read_index
+
+
+def _vectors(n=3000, dim=32, seed=0):
+    vectors = np.random.default_rng(seed).random((n, dim), dtype=np.float32)
+    faiss.normalize_L2(vectors)
+    return vectors
+
+
+def _mapped(path) -> bool:
+    with open("/proc/self/maps", "r", encoding="utf-8") as f:
+        return str(path) in f.read()
+
+
+@pytest.mark.skipif(not hasattr(faiss, "IO_FLAG_MMAP_IFC"), reason="faiss without IO_FLAG_MMAP_IFC")
+@pytest.mark.skipif(not os.path.exists("/proc/self/maps"), reason="needs /proc/self/maps")
+@pytest.mark.parametrize("mode", INDEX_MODES)
+def test_read_index_memory_maps_every_mode(tmp_path, mode):
+    vectors = _vectors()
+    path = tmp_path / f"{mode}.faiss"
+    faiss.write_index(build_index(vectors, mode), str(path))
+
+    index = read_index(path, mmap=True)
+
+    assert _mapped(path)
+    assert index.ntotal == len(vectors)
+    _, ids = index.search(vectors[:5], 1)
+    assert list(ids[:, 0]) == [0, 1, 2, 3, 4]
+
+
+def test_read_index_without_mmap_loads_into_memory(tmp_path):
+    vectors = _vectors(n=200)
+    path = tmp_path / "flat.faiss"
+    faiss.write_index(build_index(vectors, "flat"), str(path))
+
+    index = read_index(path, mmap=False)
+
+    assert not _mapped(path)
+    index.add(vectors[:1])
+    assert index.ntotal == 201